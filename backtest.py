@@ -0,0 +1,320 @@
+import argparse
+import json
+import os
+import time
+from datetime import datetime, timezone
+from functools import partial
+
+import numpy as np
+
+import crypto_signal_bot as bot
+from indicator_engine import IndicatorEngine
+from indicator_cache import INTERVAL_SECONDS
+from records import INDICATOR_FIELDS
+from scoring import SIGNAL_NAMES, entry_sl_prices, score_batch
+from snapshot_store import NO_SCORE, SnapshotStore
+
+# ==========================================
+# BACKTEST V4.1 (REPLAY SCORING + EXIT LADDER)
+# ==========================================
+# Data historis disimpan per timeframe sebagai file .npy terpisah
+# (history/<interval>/{open_time,high,low,close,volume}.npy + symbols.json),
+# fitur indikator yang sudah disejajarkan ke grid 1H disimpan di
+# history/features/ sehingga bisa dibaca ulang lewat np.load(mmap_mode='r').
+HISTORY_DIR = 'history'
+BACKTEST_OUTPUT_FILE = 'backtest_trade_history.json'
+OHLCV_FIELDS = ('high', 'low', 'close', 'volume')
+
+
+def interval_ms(interval):
+    return INTERVAL_SECONDS[interval] * 1000
+
+# ==========================================
+# DOWNLOAD & PENYIMPANAN OHLCV
+# ==========================================
+def download_history(pairs, interval, days, data_dir=HISTORY_DIR):
+    step = interval_ms(interval)
+    now_ms = int(time.time() * 1000)
+    end = now_ms // step * step                 # Candle berjalan tidak ikut
+    start = end - days * 86400 * 1000
+    grid = np.arange(start, end, step, dtype=np.int64)
+    arrays = {field: np.full((len(pairs), len(grid)), np.nan) for field in OHLCV_FIELDS}
+
+    for i, pair in enumerate(pairs):
+        cursor = start
+        while cursor < end:
+            try:
+                klines = bot.FETCH_ENGINE.call(bot.BINANCE_HOST, partial(bot.fetch_klines, pair, interval, cursor))
+            except Exception as e:
+                print(f"⚠️ Gagal unduh {pair} {interval}: {e}")
+                break
+            klines = [k for k in klines if k[0] < end]
+            if not klines:
+                break
+            for k in klines:
+                j = (k[0] - start) // step
+                for offset, field in enumerate(OHLCV_FIELDS, start=2):
+                    arrays[field][i, j] = float(k[offset])
+            cursor = klines[-1][0] + step
+        print(f"  📥 {pair} {interval}: {int(np.sum(~np.isnan(arrays['close'][i])))} candle")
+
+    save_ohlcv(data_dir, interval, pairs, grid, arrays)
+
+def save_ohlcv(data_dir, interval, symbols, open_time, arrays):
+    path = os.path.join(data_dir, interval)
+    os.makedirs(path, exist_ok=True)
+    with open(os.path.join(path, 'symbols.json'), 'w') as f:
+        json.dump(list(symbols), f, indent=4)
+    np.save(os.path.join(path, 'open_time.npy'), np.asarray(open_time, dtype=np.int64))
+    for field in OHLCV_FIELDS:
+        np.save(os.path.join(path, f'{field}.npy'), np.asarray(arrays[field], dtype=float))
+
+def load_ohlcv(data_dir, interval, symbols=None, mmap_mode=None):
+    path = os.path.join(data_dir, interval)
+    with open(os.path.join(path, 'symbols.json'), 'r') as f:
+        stored = json.load(f)
+    open_time = np.load(os.path.join(path, 'open_time.npy'), mmap_mode=mmap_mode)
+    arrays = {field: np.load(os.path.join(path, f'{field}.npy'), mmap_mode=mmap_mode) for field in OHLCV_FIELDS}
+    if symbols is not None and list(symbols) != stored:
+        rows = [stored.index(s) for s in symbols]
+        arrays = {field: np.asarray(a)[rows] for field, a in arrays.items()}
+        stored = list(symbols)
+    return stored, open_time, arrays
+
+# ==========================================
+# FITUR INDIKATOR (DISEJAJARKAN KE GRID 1H)
+# ==========================================
+def build_features(data_dir=HISTORY_DIR):
+    # Nilai 1D/4H yang dipakai di candle 1H = candle 1D/4H terakhir yang sudah
+    # ditutup saat candle 1H itu ditutup (tanpa lookahead).
+    symbols, times, _ = load_ohlcv(data_dir, bot.TF_ENTRY)
+    close_time = times + interval_ms(bot.TF_ENTRY)
+    out_dir = os.path.join(data_dir, 'features')
+    os.makedirs(out_dir, exist_ok=True)
+
+    for interval in bot.TIMEFRAMES:
+        _, tf_times, ohlcv = load_ohlcv(data_dir, interval, symbols=symbols)
+        history = IndicatorEngine(symbols).run(ohlcv['high'], ohlcv['low'], ohlcv['close'], ohlcv['volume'],
+                                               keep_history=True)
+        if interval == bot.TF_ENTRY:
+            aligned = history
+        else:
+            idx = np.searchsorted(tf_times + interval_ms(interval), close_time, side='right') - 1
+            valid = idx >= 0
+            aligned = {
+                field: np.where(valid, values[:, np.clip(idx, 0, None)], np.nan)
+                for field, values in history.items()
+            }
+        for field in INDICATOR_FIELDS:
+            np.save(os.path.join(out_dir, f'{interval}.{field}.npy'), aligned[field])
+
+    np.save(os.path.join(out_dir, 'open_time.npy'), times)
+    with open(os.path.join(out_dir, 'symbols.json'), 'w') as f:
+        json.dump(symbols, f, indent=4)
+    print(f"✅ Fitur {len(symbols)} pair x {len(times)} candle disimpan di {out_dir}")
+
+def load_features(data_dir=HISTORY_DIR, mmap_mode='r'):
+    path = os.path.join(data_dir, 'features')
+    with open(os.path.join(path, 'symbols.json'), 'r') as f:
+        symbols = json.load(f)
+    features = {
+        interval: {field: np.load(os.path.join(path, f'{interval}.{field}.npy'), mmap_mode=mmap_mode)
+                   for field in INDICATOR_FIELDS}
+        for interval in bot.TIMEFRAMES
+    }
+    return symbols, np.load(os.path.join(path, 'open_time.npy')), features
+
+# ==========================================
+# SIMULASI BAR PER BAR (VEKTOR ANTAR SIMBOL)
+# ==========================================
+def simulate(symbols, times, features, cfg=None):
+    cfg = cfg or bot.STRATEGY
+    d1, h4, h1 = (features[tf] for tf in bot.TIMEFRAMES)
+    price = np.asarray(h1['close'])
+    atr = np.asarray(h1['atr'])
+    sl_price = entry_sl_prices(price, atr, cfg)
+
+    scores = score_batch(d1, h4, h1, price, sl_price, cfg)
+    ready = np.ones(price.shape, dtype=bool)
+    for data in (d1, h4, h1):
+        for field in INDICATOR_FIELDS:
+            ready &= ~np.isnan(data[field])
+    buy = ready & (scores['vetoes'] == 0) & (scores['score'] >= cfg.score_buy) & (price > 0)
+
+    ema10, ema20 = np.asarray(h1['ema10']), np.asarray(h1['ema20'])
+    macd, macd_signal = np.asarray(h1['macd']), np.asarray(h1['macd_signal'])
+    close_time = times + interval_ms(bot.TF_ENTRY)
+
+    n, n_bars = price.shape
+    active = np.zeros(n, dtype=bool)
+    entry = np.zeros(n)
+    stop = np.zeros(n)
+    entry_atr = np.zeros(n)
+    highest = np.zeros(n)
+    break_even = np.zeros(n, dtype=bool)
+    trailing = np.zeros(n, dtype=bool)
+    entry_bar = np.zeros(n, dtype=np.int64)
+    cooldown_until = np.zeros(n, dtype=np.int64)
+    trades = []
+
+    def iso(bar):
+        return datetime.fromtimestamp(close_time[bar] / 1000, bot.UTC7).isoformat()
+
+    for t in range(n_bars):
+        p = price[:, t]
+        was_active = active.copy()
+        held = active & ~np.isnan(p)
+        if held.any():
+            profit_amount = p - entry
+            with np.errstate(divide='ignore', invalid='ignore'):
+                profit_pct = (profit_amount / entry) * 100
+
+            # 1. Stop loss
+            stop_hit = held & (p <= stop)
+            open_ = held & ~stop_hit
+
+            # 2. Break even
+            to_break_even = open_ & (profit_amount >= (cfg.break_even_atr_multiplier * entry_atr)) & ~break_even
+            stop = np.where(to_break_even, entry, stop)
+            break_even |= to_break_even
+
+            # 3. Trailing ATR
+            in_trail_zone = open_ & (profit_amount >= (cfg.atr_trail_activation * entry_atr))
+            highest = np.where(in_trail_zone & (p > highest), p, highest)
+            trailing |= in_trail_zone
+            trail_hit = in_trail_zone & (p <= highest - (cfg.atr_trail_distance * entry_atr))
+            open_ &= ~trail_hit
+
+            # 4. Pembalikan arah 1H
+            ema_macd = open_ & (ema10[:, t] < ema20[:, t]) & (macd[:, t] < macd_signal[:, t]) & \
+                ((profit_pct > 1) | (profit_pct < -1))
+            open_ &= ~ema_macd
+            close_ema = open_ & (p < ema20[:, t]) & ((profit_pct > 0) | (profit_pct < -2))
+
+            for reason, mask in (("STOP_LOSS", stop_hit), ("TRAILING_STOP", trail_hit),
+                                 ("SELL_EMA_MACD", ema_macd), ("SELL_CLOSE_EMA", close_ema)):
+                for i in np.flatnonzero(mask):
+                    trades.append({
+                        'pair': symbols[i], 'entry_price': float(entry[i]),
+                        'exit_price': float(p[i]), 'profit_pct': float(profit_pct[i]),
+                        'exit_reason': reason, 'entry_date': iso(entry_bar[i]),
+                        'exit_date': iso(t)
+                    })
+            cooldown_until = np.where(stop_hit, t + cfg.cooldown_hours, cooldown_until)
+            active &= ~(stop_hit | trail_hit | ema_macd | close_ema)
+
+        # Entry hanya untuk pair yang tidak memegang posisi di awal bar ini
+        enter = buy[:, t] & ~was_active & (t >= cooldown_until)
+        if enter.any():
+            active |= enter
+            entry = np.where(enter, p, entry)
+            stop = np.where(enter, sl_price[:, t], stop)
+            entry_atr = np.where(enter, atr[:, t], entry_atr)
+            highest = np.where(enter, p, highest)
+            break_even &= ~enter
+            trailing &= ~enter
+            entry_bar = np.where(enter, t, entry_bar)
+
+    open_positions = [symbols[i] for i in np.flatnonzero(active)]
+    return trades, open_positions
+
+def print_report(trades, open_positions):
+    summary = bot.summarize_trades(trades)
+    print("=" * 60)
+    print("📊 HASIL BACKTEST:")
+    print(f"   📈 Total Trade: {summary['total_trades']} | ✅ Win: {summary['wins']} | ❌ Loss: {summary['losses']}")
+    print(f"   🎯 Win Rate: {summary['win_rate']:.1f}% | 💰 Total PnL: {summary['total_profit']:+.2f}%"
+          f" | 📏 Rata-rata/Trade: {summary['avg_profit']:+.2f}%")
+    reasons = {}
+    for t in trades:
+        reasons[t['exit_reason']] = reasons.get(t['exit_reason'], 0) + 1
+    print(f"   🚪 Exit: {', '.join(f'{k}={v}' for k, v in sorted(reasons.items())) or '-'}")
+    print(f"   ⏸️ Posisi masih terbuka: {len(open_positions)}")
+    print("=" * 60)
+
+# ==========================================
+# REPLAY ARSIP SNAPSHOT (SKOR ULANG DENGAN STRATEGI SEKARANG)
+# ==========================================
+def parse_day(text, end_of_day=False):
+    # "YYYY-MM-DD" (UTC) -> epoch detik; None = tanpa batas
+    if not text:
+        return None
+    ts = datetime.strptime(text, '%Y-%m-%d').replace(tzinfo=timezone.utc).timestamp()
+    return int(ts) + (86399 if end_of_day else 0)
+
+def replay_snapshots(store, pairs=None, start=None, end=None, cfg=None):
+    # Baris yang dulu di-scoring dihitung ulang dari indikator tersimpan, lalu
+    # dibandingkan dengan sinyal yang tercatat saat itu
+    cfg = cfg or bot.STRATEGY
+    columns = [f"{interval}.{field}" for interval in bot.TIMEFRAMES for field in INDICATOR_FIELDS]
+    rows = store.query(pairs, start, end, columns + ['price', 'sl_price', 'score', 'signal'])
+    scored = rows['score'] != NO_SCORE
+    d1, h4, h1 = ({field: rows[f"{interval}.{field}"][scored] for field in INDICATOR_FIELDS} for interval in bot.TIMEFRAMES)
+    price = rows['price'][scored]
+    sl_price = entry_sl_prices(price, h1['atr'], cfg)
+    replayed = score_batch(d1, h4, h1, price, sl_price, cfg)
+    return {
+        'ts': rows['ts'][scored], 'pair': rows['pair'][scored],
+        'stored_score': rows['score'][scored], 'stored_signal': rows['signal'][scored],
+        'score': replayed['score'], 'signal': replayed['signal'], 'rows': len(rows['ts']),
+    }
+
+def print_replay_report(result):
+    stored, replayed = result['stored_signal'], result['signal']
+    changed = np.flatnonzero(stored != replayed)
+    print("=" * 60)
+    print("📊 HASIL REPLAY SNAPSHOT:")
+    print(f"   🗂️ Baris: {result['rows']} | 🧮 Di-scoring: {len(stored)} | "
+          f"🕒 Siklus: {len(np.unique(result['ts']))} | 🪙 Pair: {len(set(result['pair']))}")
+    for code, name in enumerate(SIGNAL_NAMES):
+        if name:
+            print(f"   {name}: tercatat {int(np.sum(stored == code))} -> replay {int(np.sum(replayed == code))}")
+    print(f"   🔁 Sinyal berubah: {len(changed)}")
+    for i in changed[:20]:
+        when = datetime.fromtimestamp(int(result['ts'][i]), bot.UTC7).strftime('%Y-%m-%d %H:%M')
+        print(f"      {when} {result['pair'][i]}: {SIGNAL_NAMES[result['stored_signal'][i]]} "
+              f"({result['stored_score'][i]}) -> {SIGNAL_NAMES[result['signal'][i]]} ({result['score'][i]})")
+    print("=" * 60)
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest strategi V4.1 atas data OHLCV historis")
+    parser.add_argument('--data-dir', default=HISTORY_DIR)
+    parser.add_argument('--download', action='store_true', help="Unduh ulang OHLCV dari Binance")
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--output', default=BACKTEST_OUTPUT_FILE)
+    parser.add_argument('--snapshots', metavar='DIR', help="Replay arsip snapshot bot (mis. snapshots/), bukan OHLCV")
+    parser.add_argument('--since', help="Awal replay snapshot, YYYY-MM-DD (UTC)")
+    parser.add_argument('--until', help="Akhir replay snapshot, YYYY-MM-DD (UTC)")
+    parser.add_argument('--pairs', nargs='+', help="Batasi replay snapshot ke pair tertentu")
+    args = parser.parse_args()
+
+    if args.snapshots:
+        store = SnapshotStore(args.snapshots, bot.TIMEFRAMES, INDICATOR_FIELDS)
+        started = time.perf_counter()
+        result = replay_snapshots(store, args.pairs, parse_day(args.since), parse_day(args.until, end_of_day=True))
+        print(f"⏱️ Replay {result['rows']} baris snapshot: {time.perf_counter() - started:.2f} detik")
+        print_replay_report(result)
+        return
+
+    if args.download:
+        pairs = bot.get_pairs_from_file()
+        for interval in bot.TIMEFRAMES:
+            # 1D & 4H butuh warmup EMA200 lebih panjang dari periode uji
+            days = args.days + (200 if interval == bot.TF_TREND else 40)
+            download_history(pairs, interval, days, args.data_dir)
+        build_features(args.data_dir)
+    elif not os.path.exists(os.path.join(args.data_dir, 'features')):
+        build_features(args.data_dir)
+
+    symbols, times, features = load_features(args.data_dir)
+    started = time.perf_counter()
+    trades, open_positions = simulate(symbols, times, features)
+    print(f"⏱️ Replay {len(symbols)} pair x {len(times)} candle: {time.perf_counter() - started:.2f} detik")
+
+    with open(args.output, 'w') as f:
+        json.dump(trades, f, indent=4)
+    print_report(trades, open_positions)
+    print(f"✅ {len(trades)} trade disimpan ke {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,313 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta
+
+import requests
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# ==========================================
+# BENCHMARK SKALABILITAS SIKLUS (OFFLINE)
+# ==========================================
+# main() dijalankan penuh tanpa jaringan: scanner TradingView dan API Telegram
+# diganti FakeBackend (latensi & tingkat gagal bisa diatur), universe berisi
+# pair sintetis dengan indikator acak tapi deterministik per simbol.
+# Tiap ukuran universe jalan di proses terpisah supaya state modul bot dan
+# peak RSS tidak saling mempengaruhi. Hasil bisa dibandingkan dengan baseline.
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_FILE = os.path.join(BENCH_DIR, 'baseline.json')
+RESULTS_FILE = os.path.join(BENCH_DIR, 'results', 'latest.json')
+DEFAULT_SIZES = (10, 100, 1000, 10000)
+DEFAULT_CYCLES = 2            # Siklus 1 cache dingin, siklus 2 cache 1D/4H hangat
+DEFAULT_POSITION_RATIO = 0.05 # Porsi universe yang punya posisi aktif (jalur exit check)
+REGRESSION_TOLERANCE = 0.25   # Throughput turun / memori naik > 25% dianggap regresi
+
+
+class FakeResponse:
+    def __init__(self, status_code, payload, headers=None):
+        self.status_code = status_code
+        self.payload = payload
+        self.headers = headers or {}
+
+    def json(self):
+        return self.payload
+
+
+class FakeBackend(requests.Session):
+    # Pengganti HTTP_SESSION & session outbox Telegram. Semua request lain ditolak
+    # supaya benchmark tidak pernah menyentuh jaringan.
+    def __init__(self, latency=0.0, jitter=0.0, failure_rate=0.0, telegram_latency=0.0, seed=0):
+        super().__init__()
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.telegram_latency = telegram_latency
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.calls = {'scan': 0, 'scan_failed': 0, 'telegram': 0}
+
+    def _count(self, key):
+        with self.lock:
+            self.calls[key] += 1
+
+    def _sleep(self, base):
+        with self.lock:
+            delay = base + self.rng.uniform(0, self.jitter) if base > 0 else 0
+            failed = self.rng.random() < self.failure_rate
+        if delay > 0:
+            time.sleep(delay)
+        return failed
+
+    def request(self, method, url, **kwargs):
+        if 'scanner.tradingview.com' in url:
+            self._count('scan')
+            if self._sleep(self.latency):
+                self._count('scan_failed')
+                return FakeResponse(503, {})
+            body = kwargs['json']
+            rows = [{'s': symbol, 'd': fake_indicators(symbol, body['columns'])}
+                    for symbol in body['symbols']['tickers']]
+            return FakeResponse(200, {'data': rows, 'totalCount': len(rows)})
+        if 'api.telegram.org' in url:
+            self._count('telegram')
+            self._sleep(self.telegram_latency)
+            return FakeResponse(200, {'ok': True})
+        raise RuntimeError(f"Benchmark tidak boleh mengakses jaringan: {url}")
+
+
+def fake_indicators(symbol, columns):
+    # Nilai indikator deterministik per (simbol, kolom, timeframe); sekitar separuh
+    # pair uptrend di 1D supaya jalur 4H/1H, scoring & alert ikut terukur
+    base = 1 + zlib.crc32(symbol.encode()) % 5000 / 10
+    trend = 1.0 if zlib.crc32(symbol.encode()) % 2 else -1.0
+    values = []
+    for column in columns:
+        name = column.split('|')[0]
+        rng = random.Random(zlib.crc32(f"{symbol}{column}".encode()))
+        if name in ('close', 'open', 'high', 'low'):
+            value = base * (1 + trend * 0.02 + rng.uniform(-0.005, 0.005))
+        elif name.startswith('EMA') or name.startswith('SMA'):
+            period = int(''.join(ch for ch in name if ch.isdigit()) or 20)
+            value = base * (1 - trend * period / 5000 + rng.uniform(-0.002, 0.002))
+        elif name.startswith('RSI'):
+            value = rng.uniform(35, 80)
+        elif name.startswith('ADX'):
+            value = rng.uniform(10, 45)
+        elif name.startswith('MACD'):
+            value = base * rng.uniform(-0.003, 0.004)
+        elif name == 'ATR':
+            value = base * rng.uniform(0.005, 0.03)
+        elif name.startswith('Rec'):
+            value = rng.choice((-1, 0, 1))
+        else:
+            value = rng.uniform(0, 100)
+        values.append(value)
+    return values
+
+def synthetic_pairs(size):
+    return [f"SYN{index:05d}USDT" for index in range(size)]
+
+def seed_positions(bot, pairs, ratio):
+    # Posisi aktif sintetis: entry sedikit di atas harga supaya sebagian kena SL/hold
+    now = datetime.now(bot.UTC7) - timedelta(hours=6)
+    positions = {}
+    for pair in pairs[:int(len(pairs) * ratio)]:
+        price = 1 + zlib.crc32(pair.encode()) % 5000 / 10
+        positions[pair] = {
+            'price': price, 'time': now.isoformat(), 'stop_loss': price * 0.97,
+            'entry_atr': price * 0.01, 'trailing_active': False, 'highest_price': price,
+            'entry_score': 85, 'break_even_active': False,
+        }
+    return positions
+
+# ==========================================
+# SATU UKURAN UNIVERSE (PROSES WORKER)
+# ==========================================
+def run_size(size, cycles, args):
+    # Konfigurasi fetch lewat env yang sama dengan produksi, sebelum bot di-import
+    os.environ.update({
+        'DATA_SOURCE': 'tradingview',
+        'FETCH_MAX_WORKERS': str(args.workers),
+        'FETCH_RATE_PER_SEC': str(args.rate),
+        'FETCH_BURST': str(args.burst),
+        'BATCH_CHUNK_SIZE': str(args.chunk),
+        'TELEGRAM_DIGEST': 'true' if args.digest else 'false',
+        'UNIVERSE_AUTO': 'false',
+    })
+    sys.path.insert(0, REPO_DIR)
+    workdir = tempfile.mkdtemp(prefix='bench_cycle_')
+    os.chdir(workdir)
+
+    import crypto_signal_bot as bot
+    from fetch_engine import FetchEngine
+
+    backend = FakeBackend(args.latency, args.jitter, args.failure_rate, args.telegram_latency, args.seed)
+    bot.HTTP_SESSION = backend
+    bot.TELEGRAM.session = backend
+    # Backoff dipercepat: yang diukur jalur kode bot, bukan jeda retry
+    bot.FETCH_ENGINE = FetchEngine(
+        max_workers=args.workers, rate=args.rate, burst=args.burst, max_retries=bot.FETCH_MAX_RETRIES,
+        backoff_base=0.01, backoff_max=0.1, breaker_threshold=bot.BREAKER_FAILURE_THRESHOLD, breaker_cooldown=0.5
+    )
+
+    pairs = synthetic_pairs(size)
+    with open(bot.PAIRS_FILE, 'w') as f:
+        json.dump(pairs, f)
+    with open(bot.ACTIVE_BUYS_FILE, 'w') as f:
+        json.dump(seed_positions(bot, pairs, args.positions), f)
+
+    results = []
+    for cycle in range(cycles):
+        output = io.StringIO()
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(output):
+            bot.main()
+        elapsed = time.perf_counter() - started
+        summary = json.load(open(bot.METRICS_JSON_FILE))
+        results.append({
+            'cycle': cycle + 1,
+            'seconds': elapsed,
+            'pairs_per_sec': size / elapsed if elapsed > 0 else 0.0,
+            'output_lines': output.getvalue().count('\n'),
+            'stages': {stage: {key: s[key] for key in ('count', 'total', 'p50', 'p95', 'max')}
+                       for stage, s in summary['stages'].items()},
+            'counters': summary['counters'],
+        })
+    return {
+        'size': size,
+        'cycles': results,
+        'backend_calls': backend.calls,
+        # ru_maxrss dalam KB di Linux
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+def run_isolated(size, args):
+    # Tiap ukuran di proses baru: state global bot & peak RSS bersih
+    command = [sys.executable, os.path.abspath(__file__), '--worker', str(size),
+               '--cycles', str(args.cycles), '--latency', str(args.latency), '--jitter', str(args.jitter),
+               '--failure-rate', str(args.failure_rate), '--telegram-latency', str(args.telegram_latency),
+               '--workers', str(args.workers), '--rate', str(args.rate), '--burst', str(args.burst),
+               '--chunk', str(args.chunk), '--positions', str(args.positions), '--seed', str(args.seed)]
+    if args.digest:
+        command.append('--digest')
+    completed = subprocess.run(command, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise SystemExit(f"❌ Benchmark {size} pair gagal:\n{completed.stderr}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+# ==========================================
+# LAPORAN & PERBANDINGAN BASELINE
+# ==========================================
+def print_report(results):
+    print(f"\n{'pair':>7} {'siklus':>6} {'detik':>8} {'pair/s':>9} {'RSS MB':>8}  tahap terlama")
+    for result in results:
+        for cycle in result['cycles']:
+            stages = {k: v for k, v in cycle['stages'].items() if k != 'cycle'}
+            top = sorted(stages.items(), key=lambda item: item[1]['total'], reverse=True)[:3]
+            top_str = ', '.join(f"{stage} {s['total']:.2f}s" for stage, s in top)
+            print(f"{result['size']:>7} {cycle['cycle']:>6} {cycle['seconds']:>8.2f} "
+                  f"{cycle['pairs_per_sec']:>9.0f} {result['peak_rss_mb']:>8.1f}  {top_str}")
+
+def compare(results, baseline, tolerance):
+    # Return daftar regresi: throughput per siklus turun atau peak RSS naik melebihi toleransi
+    regressions = []
+    base_by_size = {entry['size']: entry for entry in baseline.get('results', [])}
+    for result in results:
+        base = base_by_size.get(result['size'])
+        if base is None:
+            continue
+        for cycle, base_cycle in zip(result['cycles'], base['cycles']):
+            floor = base_cycle['pairs_per_sec'] * (1 - tolerance)
+            if cycle['pairs_per_sec'] < floor:
+                regressions.append(f"{result['size']} pair siklus {cycle['cycle']}: "
+                                   f"{cycle['pairs_per_sec']:.0f} pair/s < {floor:.0f} "
+                                   f"(baseline {base_cycle['pairs_per_sec']:.0f})")
+        ceiling = base['peak_rss_mb'] * (1 + tolerance)
+        if result['peak_rss_mb'] > ceiling:
+            regressions.append(f"{result['size']} pair: peak RSS {result['peak_rss_mb']:.1f} MB > {ceiling:.1f} MB "
+                               f"(baseline {base['peak_rss_mb']:.1f} MB)")
+    return regressions
+
+def write_json(path, payload):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(payload, f, indent=2)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark skalabilitas siklus bot (offline, backend palsu)")
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES), help="Ukuran universe pair")
+    parser.add_argument('--cycles', type=int, default=DEFAULT_CYCLES, help="Jumlah siklus main() per ukuran")
+    parser.add_argument('--latency', type=float, default=0.05, help="Latensi scanner palsu per request (detik)")
+    parser.add_argument('--jitter', type=float, default=0.02, help="Tambahan latensi acak maksimal (detik)")
+    parser.add_argument('--failure-rate', type=float, default=0.0, help="Peluang request scanner dibalas 503")
+    parser.add_argument('--telegram-latency', type=float, default=0.01, help="Latensi Telegram palsu (detik)")
+    parser.add_argument('--workers', type=int, default=4, help="FETCH_MAX_WORKERS")
+    parser.add_argument('--rate', type=float, default=1000, help="FETCH_RATE_PER_SEC (default tanpa throttle)")
+    parser.add_argument('--burst', type=int, default=1000, help="FETCH_BURST")
+    parser.add_argument('--chunk', type=int, default=50, help="BATCH_CHUNK_SIZE")
+    parser.add_argument('--positions', type=float, default=DEFAULT_POSITION_RATIO,
+                        help="Porsi pair yang diberi posisi aktif")
+    parser.add_argument('--digest', action='store_true', help="Aktifkan TELEGRAM_DIGEST")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=RESULTS_FILE, help="File hasil JSON")
+    parser.add_argument('--baseline', default=BASELINE_FILE, help="Baseline pembanding")
+    parser.add_argument('--save-baseline', action='store_true', help="Simpan hasil sebagai baseline baru")
+    parser.add_argument('--tolerance', type=float, default=REGRESSION_TOLERANCE)
+    parser.add_argument('--worker', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker is not None:
+        print(json.dumps(run_size(args.worker, args.cycles, args)))
+        return
+
+    results = []
+    for size in args.sizes:
+        print(f"⏱️ Benchmark {size} pair...", flush=True)
+        results.append(run_isolated(size, args))
+    print_report(results)
+
+    payload = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'python': sys.version.split()[0],
+        'config': {key: value for key, value in vars(args).items()
+                   if key not in ('output', 'baseline', 'save_baseline', 'worker')},
+        'results': results,
+    }
+    write_json(args.output, payload)
+    print(f"\n💾 Hasil disimpan ke {args.output}")
+    if args.save_baseline:
+        write_json(args.baseline, payload)
+        print(f"📌 Baseline diperbarui: {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print("ℹ️ Belum ada baseline, jalankan dengan --save-baseline.")
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    # Ukuran universe boleh berbeda; yang dibandingkan hanya ukuran yang ada di keduanya
+    config = {key: value for key, value in payload['config'].items() if key != 'sizes'}
+    base_config = {key: value for key, value in baseline.get('config', {}).items() if key != 'sizes'}
+    if config != base_config:
+        print("⚠️ Konfigurasi berbeda dengan baseline, perbandingan hanya indikatif.")
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"\n❌ {len(regressions)} regresi dibanding baseline:")
+        for line in regressions:
+            print(f"   - {line}")
+        sys.exit(1)
+    print(f"\n✅ Tidak ada regresi dibanding baseline (toleransi {args.tolerance:.0%}).")
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,35 @@
 import os
+import signal as os_signal
+import threading
+import time
+import argparse
+import cProfile
+import pstats
 import requests
 import json
+from dataclasses import dataclass, replace
 from datetime import datetime, timedelta, timezone
-from tradingview_ta import TA_Handler, Interval
+from functools import partial
+from urllib.parse import urlparse
+from tradingview_ta import Interval, TradingView, __version__ as TV_VERSION
+from tradingview_ta.main import calculate as tv_calculate
+from eval_cache import EvaluationCache, cached_score_batch
+from eventlog import DEBUG, INFO, EventLog, parse_level
+from exit_rules import EVENT_ACTIVATE_TRAIL, EVENT_BREAK_EVEN, indicator_exit, price_exit
+from fetch_engine import FetchEngine, FetchError
+from indicator_cache import INTERVAL_SECONDS, IndicatorCache, candle_open_time
+from metrics import Metrics
+from notifier import TelegramOutbox
+from records import INDICATOR_FIELDS, Cooldown, IndicatorSnapshot, Position, merge_positions
+from risk import CorrelationTracker, ExposureLimits, review_entries
+from scheduler import TIER_UNIVERSE, ScanSchedule, waves
+from shadow import ShadowStrategy, load_variants
+from scoring import DAILY_DOWNTREND_VETO, SIGNAL_BUY, SIGNAL_NAMES, entry_sl_prices, render_reasons, render_vetoes, score_batch, to_columns
+from sharding import owns, parse_shard
+from snapshot_store import SnapshotStore
+from state_store import JsonStateFile, TradeLog, atomic_write_json
+from trade_stats import TradeStats, summarize_counter
+from universe import ExchangeSnapshot, UniverseFilter, diff_pairs, missing_listing, select_pairs
 
 # ==========================================
 # KONFIGURASI DASAR
@@ -13,18 +40,166 @@ TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID', 'YOUR_TELEGRAM_CHAT_ID')
 PAIRS_FILE = 'pairs_cache.json'
 ACTIVE_BUYS_FILE = 'active_buys.json'
 COOLDOWNS_FILE = 'cooldowns.json'
-TRADE_HISTORY_FILE = 'trade_history.json'
+TRADE_HISTORY_FILE = 'trade_history.jsonl'          # Append-only, satu trade per baris
+LEGACY_TRADE_HISTORY_FILE = 'trade_history.json'    # Format lama, dimigrasi otomatis
 RECAP_SENT_FILE = 'recap_sent.json'
+TRADE_STATS_FILE = 'trade_stats.json'
+INDICATOR_CACHE_FILE = 'indicator_cache.json'
+TELEGRAM_OUTBOX_FILE = 'telegram_outbox.json'
+SCAN_SCHEDULE_FILE = 'scan_schedule.json'
+EXCHANGE_SNAPSHOT_FILE = 'exchange_snapshot.json'
+SHADOW_STRATEGIES_FILE = os.getenv('SHADOW_STRATEGIES_FILE', 'shadow_strategies.json')
+SNAPSHOT_DIR = os.getenv('SNAPSHOT_DIR', 'snapshots')
+SNAPSHOT_ARCHIVE = os.getenv('SNAPSHOT_ARCHIVE', 'true').lower() in ('1', 'true', 'yes')
+SNAPSHOT_RETENTION_DAYS = int(os.getenv('SNAPSHOT_RETENTION_DAYS', '30'))
+
+# Notifikasi: digest = semua alert satu siklus dikirim sebagai satu pesan
+TELEGRAM_DIGEST = os.getenv('TELEGRAM_DIGEST', 'false').lower() in ('1', 'true', 'yes')
+TELEGRAM_FLUSH_TIMEOUT = 30    # Detik maksimal menunggu outbox kosong di akhir run
+
+# Instrumentasi: metrics per tahap ditulis tiap siklus (Prometheus text + JSON)
+METRICS_DIR = os.getenv('METRICS_DIR', 'metrics')
+METRICS_PROM_FILE = os.path.join(METRICS_DIR, 'metrics.prom')
+METRICS_JSON_FILE = os.path.join(METRICS_DIR, 'metrics.json')
+PROFILE_FILE = os.path.join(METRICS_DIR, 'cycle.pstats')
+PROFILE_TOP = 25               # Jumlah fungsi teratas yang dicetak saat --profile
+METRICS_TOP_STAGES = 5         # Tahap terlama yang ditampilkan di ringkasan siklus
+METRICS = Metrics()
+
+# Log per pair & ringkasan siklus lewat EventLog (buffer + thread penulis).
+# LOG_LEVEL=debug menambah dump indikator mentah; LOG_FORMAT=json menulis satu
+# objek JSON per baris (event, pair, stage, nilai) untuk dashboard; stdout lalu
+# hanya berisi event, output print() lain (banner, progres, error) ke stderr.
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'info')
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'text')
+LOG = EventLog(parse_level(LOG_LEVEL), LOG_FORMAT)
+
+# Mode daemon: siklus dijalankan beberapa detik setelah candle 1H/4H/1D ditutup
+DAEMON_CLOSE_DELAY = float(os.getenv('DAEMON_CLOSE_DELAY', '10'))
+
+# Penjadwal: budget waktu satu siklus (job GitHub Actions dimatikan di 10 menit,
+# termasuk setup, flush Telegram & commit). Pair yang tidak sempat diproses ditunda.
+CYCLE_BUDGET_SECONDS = float(os.getenv('CYCLE_BUDGET_SECONDS', '420'))
+SCHEDULER_WAVE_SIZE = int(os.getenv('SCHEDULER_WAVE_SIZE', '200'))
+WATCH_PRIORITY_HOURS = 24      # Pair WATCH diprioritaskan selama sekian jam
+DEFERRED_PRINT_LIMIT = 10      # Contoh pair tertunda yang dicetak di ringkasan
+
+# Universe otomatis: pairs_cache.json dibangun ulang dari snapshot exchange Binance
+# setiap UNIVERSE_REFRESH_HOURS. UNIVERSE_FIXTURE = file JSON pengganti API
+# ({"exchangeInfo": ..., "ticker24hr": [...], "listedAt": {simbol: ms}}) untuk uji offline.
+UNIVERSE_AUTO = os.getenv('UNIVERSE_AUTO', 'true').lower() in ('1', 'true', 'yes')
+UNIVERSE_REFRESH_HOURS = float(os.getenv('UNIVERSE_REFRESH_HOURS', '24'))
+UNIVERSE_FIXTURE = os.getenv('UNIVERSE_FIXTURE')
+UNIVERSE_LISTING_LOOKUPS = 60  # Maks. simbol yang dicari tanggal listing-nya per refresh
+UNIVERSE_PRINT_LIMIT = 20      # Pair ditambah/dibuang yang dicetak di laporan
+UNIVERSE_FILTER = UniverseFilter(
+    min_quote_volume=float(os.getenv('UNIVERSE_MIN_QUOTE_VOLUME', '10000000')),
+    min_volatility_pct=float(os.getenv('UNIVERSE_MIN_VOLATILITY_PCT', '1.5')),
+    max_volatility_pct=float(os.getenv('UNIVERSE_MAX_VOLATILITY_PCT', '60')),
+    min_listing_days=int(os.getenv('UNIVERSE_MIN_LISTING_DAYS', '30')),
+    max_pairs=int(os.getenv('UNIVERSE_MAX_PAIRS', '50')),
+)
+EXCHANGE_SNAPSHOT = ExchangeSnapshot(EXCHANGE_SNAPSHOT_FILE, refresh_hours=UNIVERSE_REFRESH_HOURS)
+
+# Sharding: SHARD_COUNT > 1 berarti proses ini hanya memegang pair dengan
+# shard_of(pair) == SHARD_INDEX. Rekap & outbox lama diurus langkah merge (shard_merge.py).
+SHARD_INDEX = int(os.getenv('SHARD_INDEX', '0'))
+SHARD_COUNT = int(os.getenv('SHARD_COUNT', '1'))
 
 ACTIVE_BUYS = {}
 COOLDOWNS = {}
 
+ACTIVE_BUYS_STORE = JsonStateFile(ACTIVE_BUYS_FILE)
+COOLDOWNS_STORE = JsonStateFile(COOLDOWNS_FILE)
+TRADE_LOG = TradeLog(TRADE_HISTORY_FILE, legacy_path=LEGACY_TRADE_HISTORY_FILE)
+TRADE_STATS = TradeStats(TRADE_STATS_FILE, UTC7)
+SCAN_SCHEDULE = ScanSchedule(SCAN_SCHEDULE_FILE, watch_hours=WATCH_PRIORITY_HOURS)
+TELEGRAM = TelegramOutbox(TELEGRAM_OUTBOX_FILE, TELEGRAM_TOKEN, TELEGRAM_CHAT_ID, digest=TELEGRAM_DIGEST,
+                          metrics=METRICS)
+
 # ==========================================
 # TIMEFRAME
 # ==========================================
 TF_TREND = Interval.INTERVAL_1_DAY
 TF_SETUP = Interval.INTERVAL_4_HOURS
 TF_ENTRY = Interval.INTERVAL_1_HOUR
+TIMEFRAMES = (TF_TREND, TF_SETUP, TF_ENTRY)
+
+# ==========================================
+# BATCH FETCH TRADINGVIEW
+# ==========================================
+TV_EXCHANGE = "BINANCE"
+TV_SCREENER = "CRYPTO"
+TV_SCAN_URL = f"{TradingView.scan_url}{TV_SCREENER.lower()}/scan"
+TV_HOST = urlparse(TV_SCAN_URL).netloc
+BATCH_CHUNK_SIZE = int(os.getenv('BATCH_CHUNK_SIZE', '50'))  # Jumlah simbol per request scanner
+FETCH_TIMEOUT = 15
+
+# Concurrency, rate limit (token bucket), retry & circuit breaker
+FETCH_MAX_WORKERS = int(os.getenv('FETCH_MAX_WORKERS', '4'))
+FETCH_RATE_PER_SEC = float(os.getenv('FETCH_RATE_PER_SEC', '2'))
+FETCH_BURST = int(os.getenv('FETCH_BURST', '4'))
+FETCH_MAX_RETRIES = 4
+FETCH_BACKOFF_BASE = 1.0       # Detik, digandakan tiap retry (dengan jitter)
+FETCH_BACKOFF_MAX = 30.0
+BREAKER_FAILURE_THRESHOLD = 5  # Kegagalan beruntun sebelum host diblokir sementara
+BREAKER_COOLDOWN = 60.0
+
+# Cache indikator per candle: 1D & 4H cukup diambil sekali per candle,
+# 1H selalu diambil ulang karena menjadi sumber harga entry/exit.
+CACHED_TIMEFRAMES = (TF_TREND, TF_SETUP)
+INDICATOR_CACHE_MAX_ENTRIES = 2000
+INDICATOR_CACHE = IndicatorCache(INDICATOR_CACHE_FILE, max_entries=INDICATOR_CACHE_MAX_ENTRIES)
+
+# Cache hasil evaluasi: pair yang input indikatornya identik dengan evaluasi
+# sebelumnya tidak di-scoring & dicetak ulang (lihat eval_cache.py)
+EVALUATION_CACHE_FILE = 'evaluation_cache.json'
+EVALUATION_CACHE_MAX_AGE_HOURS = 24
+EVAL_CACHE = EvaluationCache(EVALUATION_CACHE_FILE, max_age_hours=EVALUATION_CACHE_MAX_AGE_HOURS)
+SNAPSHOT_STORE = SnapshotStore(SNAPSHOT_DIR, TIMEFRAMES, INDICATOR_FIELDS, retention_days=SNAPSHOT_RETENTION_DAYS)
+
+# Risiko portofolio: korelasi & volatilitas return 1H (EWMA) seluruh universe,
+# dipakai membatasi eksposur sebelum posisi baru dibuka. Di mode shard harga
+# siklus ditulis ke RISK_PRICES_FILE dan korelasi di-update langkah merge
+# (satu-satunya proses yang melihat semua pair).
+PORTFOLIO_RISK_FILE = 'portfolio_risk.npz'
+RISK_PRICES_FILE = 'risk_prices.json'
+RISK_LIMITS = os.getenv('RISK_LIMITS', 'true').lower() in ('1', 'true', 'yes')
+EXPOSURE_LIMITS = ExposureLimits(
+    max_positions=int(os.getenv('RISK_MAX_POSITIONS', '10')),
+    max_cluster_positions=int(os.getenv('RISK_MAX_CLUSTER_POSITIONS', '3')),
+    cluster_correlation=float(os.getenv('RISK_CLUSTER_CORRELATION', '0.7')),
+    max_portfolio_correlation=float(os.getenv('RISK_MAX_PORTFOLIO_CORRELATION', '0.85')),
+)
+CORRELATIONS = CorrelationTracker(
+    bar_seconds=INTERVAL_SECONDS[TF_ENTRY],
+    halflife_bars=int(os.getenv('RISK_HALFLIFE_BARS', '72')),
+    min_samples=int(os.getenv('RISK_MIN_SAMPLES', '24')),
+)
+CYCLE_PRICES = {}          # Harga 1H siklus ini untuk update korelasi
+PORTFOLIO_OTHERS = set()   # Mode shard: posisi milik shard lain (per merge terakhir)
+RISK_SHARD_SLOTS = None    # Mode shard: jatah posisi baru shard ini per siklus
+
+# Sumber data: 'tradingview' (scanner) atau 'native' (klines Binance + indicator_engine)
+DATA_SOURCE = os.getenv('DATA_SOURCE', 'tradingview')
+BINANCE_KLINES_URL = "https://api.binance.com/api/v3/klines"
+BINANCE_EXCHANGE_INFO_URL = "https://api.binance.com/api/v3/exchangeInfo"
+BINANCE_TICKER_24H_URL = "https://api.binance.com/api/v3/ticker/24hr"
+BINANCE_HOST = urlparse(BINANCE_KLINES_URL).netloc
+KLINES_LIMIT = 1000            # Cukup untuk warmup EMA200
+NATIVE_STATE_DIR = 'indicator_state'
+# Resampling: hanya kline timeframe dasar yang diambil (satu request per pair), 4H/1D
+# disusun lokal. Kosongkan / 'off' untuk mengambil kline tiap timeframe sendiri.
+NATIVE_BASE_INTERVAL = os.getenv('NATIVE_BASE_INTERVAL', TF_ENTRY)
+NATIVE_BASE_INTERVAL = None if NATIVE_BASE_INTERVAL.lower() in ('', 'off', 'false') else NATIVE_BASE_INTERVAL
+RESAMPLE_BUFFER_BUCKETS = 2    # Isi ring buffer = 2 candle timeframe terbesar
+
+HTTP_SESSION = requests.Session()
+FETCH_ENGINE = FetchEngine(
+    max_workers=FETCH_MAX_WORKERS, rate=FETCH_RATE_PER_SEC, burst=FETCH_BURST,
+    max_retries=FETCH_MAX_RETRIES, backoff_base=FETCH_BACKOFF_BASE, backoff_max=FETCH_BACKOFF_MAX,
+    breaker_threshold=BREAKER_FAILURE_THRESHOLD, breaker_cooldown=BREAKER_COOLDOWN
+)
 
 # ==========================================
 # PARAMETER STRATEGI (V4.1 - Tanpa Filter BTC)
@@ -43,6 +218,35 @@ SCORE_BUY_STRONG = 90
 SCORE_BUY = 80
 SCORE_WATCH = 60
 
+# Veto volatilitas & RR
+MIN_ATR_PCT = 0.008            # ATR minimal 0.8% dari harga
+RR_TARGET_ATR = 3.0            # Target benchmark RR = 3x ATR
+MIN_RR_RATIO = 2.0
+
+# Semua parameter di atas dibungkus dalam satu objek konfigurasi yang bisa
+# diinjeksi (backtest / optimizer menjalankan banyak konfigurasi sekaligus
+# tanpa mengubah variabel global).
+@dataclass(frozen=True)
+class StrategyConfig:
+    atr_sl_multiplier: float = ATR_SL_MULTIPLIER
+    max_distance_from_ema20_pct: float = MAX_DISTANCE_FROM_EMA20_PCT
+    rsi_overbought_veto: float = RSI_OVERBOUGHT_VETO
+    cooldown_hours: int = COOLDOWN_HOURS
+    atr_trail_activation: float = ATR_TRAIL_ACTIVATION
+    atr_trail_distance: float = ATR_TRAIL_DISTANCE
+    break_even_atr_multiplier: float = BREAK_EVEN_ATR_MULTIPLIER
+    score_buy_strong: int = SCORE_BUY_STRONG
+    score_buy: int = SCORE_BUY
+    score_watch: int = SCORE_WATCH
+    min_atr_pct: float = MIN_ATR_PCT
+    rr_target_atr: float = RR_TARGET_ATR
+    min_rr_ratio: float = MIN_RR_RATIO
+
+STRATEGY = StrategyConfig()
+
+# Varian shadow dari SHADOW_STRATEGIES_FILE (lihat shadow_strategies.example.json)
+SHADOWS = []
+
 # ==========================================
 # FUNGSI UTILITY: LOAD & SAVE
 # ==========================================
@@ -50,21 +254,8 @@ def load_active_buys():
     global ACTIVE_BUYS
     if os.path.exists(ACTIVE_BUYS_FILE):
         try:
-            with open(ACTIVE_BUYS_FILE, 'r') as f:
-                data = json.load(f)
-                ACTIVE_BUYS = {
-                    pair: {
-                        'price': float(d['price']),
-                        'time': datetime.fromisoformat(d['time']),
-                        'stop_loss': float(d['stop_loss']),
-                        'entry_atr': float(d.get('entry_atr', d['price'] * 0.02)),
-                        'trailing_active': d.get('trailing_active', False),
-                        'highest_price': float(d.get('highest_price', d['price'])),
-                        'entry_score': int(d.get('entry_score', 0)),
-                        'break_even_active': d.get('break_even_active', False)
-                    }
-                    for pair, d in data.items()
-                }
+            data = ACTIVE_BUYS_STORE.load()
+            ACTIVE_BUYS = {pair: Position.from_json(d) for pair, d in data.items()}
             print(f"✅ Dimuat {len(ACTIVE_BUYS)} posisi aktif.")
         except Exception as e:
             print(f"❌ Gagal memuat posisi aktif: {e}")
@@ -72,18 +263,29 @@ def load_active_buys():
     else:
         ACTIVE_BUYS = {}
 
+def sync_active_buys():
+    # File diubah proses lain (exit_monitor / --daemon / run terjadwal) sejak terakhir
+    # dibaca/ditulis: gabungkan ke memori supaya posisi yang sudah ditutup di sana
+    # tidak ditutup ulang atau dihidupkan kembali oleh salinan lama di sini.
+    if not ACTIVE_BUYS_STORE.changed_on_disk() or not os.path.exists(ACTIVE_BUYS_FILE):
+        return
+    try:
+        base = json.loads(ACTIVE_BUYS_STORE.last_written or '{}')
+        theirs = ACTIVE_BUYS_STORE.load()
+        merged = merge_positions(
+            {pair: Position.from_json(d) for pair, d in base.items()}, ACTIVE_BUYS,
+            {pair: Position.from_json(d) for pair, d in theirs.items()})
+    except Exception as e:
+        print(f"❌ Gagal sinkron posisi aktif: {e}")
+        return
+    ACTIVE_BUYS.clear()
+    ACTIVE_BUYS.update(merged)
+
 def save_active_buys():
     try:
-        data = {}
-        for pair, d in ACTIVE_BUYS.items():
-            data[pair] = {
-                'price': d['price'], 'time': d['time'].isoformat(),
-                'stop_loss': d['stop_loss'], 'entry_atr': d['entry_atr'], 
-                'trailing_active': d['trailing_active'], 'highest_price': d['highest_price'],
-                'entry_score': d['entry_score'], 'break_even_active': d['break_even_active']
-            }
-        with open(ACTIVE_BUYS_FILE, 'w') as f:
-            json.dump(data, f, indent=4)
+        sync_active_buys()
+        with METRICS.timer('persist_active_buys'):
+            ACTIVE_BUYS_STORE.save({pair: position.to_json() for pair, position in ACTIVE_BUYS.items()})
     except Exception as e:
         print(f"❌ Gagal menyimpan posisi aktif: {e}")
 
@@ -91,54 +293,149 @@ def load_cooldowns():
     global COOLDOWNS
     if os.path.exists(COOLDOWNS_FILE):
         try:
-            with open(COOLDOWNS_FILE, 'r') as f:
-                data = json.load(f)
-                COOLDOWNS = {k: datetime.fromisoformat(v) for k, v in data.items()}
+            data = COOLDOWNS_STORE.load()
+            COOLDOWNS = {k: Cooldown.from_json(v) for k, v in data.items()}
         except:
             COOLDOWNS = {}
 
+def sync_cooldowns():
+    # Cooldown hanya bertambah panjang: gabungkan isi disk dengan memori, ambil yang terlama
+    if not COOLDOWNS_STORE.changed_on_disk():
+        return
+    ours = dict(COOLDOWNS)
+    load_cooldowns()
+    for pair, cooldown in ours.items():
+        if pair not in COOLDOWNS or COOLDOWNS[pair].until < cooldown.until:
+            COOLDOWNS[pair] = cooldown
+
 def save_cooldowns():
     try:
-        data = {k: v.isoformat() for k, v in COOLDOWNS.items()}
-        with open(COOLDOWNS_FILE, 'w') as f:
-            json.dump(data, f, indent=4)
+        sync_cooldowns()
+        with METRICS.timer('persist_cooldowns'):
+            COOLDOWNS_STORE.save({k: v.to_json() for k, v in COOLDOWNS.items()})
     except Exception as e:
         print(f"❌ Gagal simpan cooldown: {e}")
 
-def load_trade_history():
-    if os.path.exists(TRADE_HISTORY_FILE):
+def load_shadow_strategies():
+    global SHADOWS
+    shadows = []
+    try:
+        variants = load_variants(SHADOW_STRATEGIES_FILE)
+    except Exception as e:
+        print(f"❌ Gagal membaca {SHADOW_STRATEGIES_FILE}: {e}")
+        variants = []
+    fields = set(StrategyConfig.__dataclass_fields__)
+    for variant in variants:
+        name, params = variant.get('name'), variant.get('params', {})
+        unknown = sorted(set(params) - fields)
+        if not name or unknown:
+            print(f"❌ Varian shadow {name!r} dilewati: parameter tidak dikenal {unknown}" if name
+                  else "❌ Varian shadow tanpa nama dilewati.")
+            continue
+        shadow = ShadowStrategy(name, replace(STRATEGY, **params), TIMEFRAMES, UTC7)
         try:
-            with open(TRADE_HISTORY_FILE, 'r') as f:
-                return json.load(f)
-        except:
-            return []
-    return []
+            shadow.load()
+        except Exception as e:
+            print(f"❌ Gagal memuat state shadow {name}: {e}")
+        if SHARD_COUNT > 1:
+            shadow.positions = {pair: p for pair, p in shadow.positions.items() if owns(pair, SHARD_INDEX, SHARD_COUNT)}
+            shadow.cooldowns = {pair: c for pair, c in shadow.cooldowns.items() if owns(pair, SHARD_INDEX, SHARD_COUNT)}
+        shadows.append(shadow)
+    SHADOWS = shadows
+    if SHADOWS:
+        print(f"👻 {len(SHADOWS)} strategi shadow: {', '.join(shadow.name for shadow in SHADOWS)}")
+
+def save_shadow_strategies():
+    for shadow in SHADOWS:
+        try:
+            shadow.save()
+        except Exception as e:
+            print(f"❌ Gagal simpan state shadow {shadow.name}: {e}")
+
+def run_shadow_strategies(pairs, market_data, prefiltered):
+    # Data yang sama dengan siklus live, tanpa fetch & alert. Yang dicatat ke metrics
+    # adalah waktu CPU thread per varian (bukan wall time).
+    for shadow in SHADOWS:
+        try:
+            cpu = shadow.evaluate(pairs, market_data, prefiltered)
+        except Exception as e:
+            print(f"❌ Strategi shadow {shadow.name} gagal: {e}")
+            continue
+        METRICS.observe(f'shadow_{shadow.name}', cpu)
+
+def shadow_summary():
+    # Ringkasan per varian untuk event cycle_summary
+    summary = []
+    for shadow in SHADOWS:
+        cycle, totals = shadow.cycle, shadow.totals
+        summary.append({
+            'name': shadow.name, 'positions': len(shadow.positions), 'buy': cycle['BUY'], 'exit': cycle['EXIT'],
+            'pnl_pct': round(cycle['pnl'], 4), 'trades': totals['count'],
+            'win_rate_pct': round(totals['wins'] / totals['count'] * 100 if totals['count'] else 0, 2),
+            'total_pnl_pct': round(totals['pnl'], 4), 'cpu_ms': round(cycle['cpu'] * 1000, 3),
+        })
+    return summary
 
-def save_trade_history(history):
+def migrate_trade_history():
     try:
-        with open(TRADE_HISTORY_FILE, 'w') as f:
-            json.dump(history, f, indent=4)
+        TRADE_LOG.migrate()
     except Exception as e:
-        print(f"❌ Gagal simpan riwayat trade: {e}")
+        print(f"❌ Gagal migrasi riwayat trade: {e}")
+
+def load_trade_history():
+    try:
+        return TRADE_LOG.load()
+    except:
+        return []
 
-def load_recap_sent():
+def load_trade_stats():
+    TRADE_STATS.load()
+    if not TRADE_STATS.exists():
+        # Pertama kali: bangun agregat dari riwayat yang sudah ada
+        TRADE_STATS.rebuild(load_trade_history())
+        try:
+            TRADE_STATS.save()
+        except Exception as e:
+            print(f"❌ Gagal simpan statistik trade: {e}")
+
+def record_trade(trade):
+    # Hanya satu baris yang ditambahkan, riwayat lama tidak dibaca/ditulis ulang
+    with METRICS.timer('persist_trade', trade['pair']):
+        try:
+            TRADE_LOG.append(trade)
+        except Exception as e:
+            print(f"❌ Gagal simpan riwayat trade: {e}")
+        try:
+            TRADE_STATS.add(trade)
+            TRADE_STATS.save()
+        except Exception as e:
+            print(f"❌ Gagal update statistik trade: {e}")
+
+def load_recap_sent(key='last_sent_date'):
     if os.path.exists(RECAP_SENT_FILE):
         try:
             with open(RECAP_SENT_FILE, 'r') as f:
-                return json.load(f).get('last_sent_date', '')
+                return json.load(f).get(key, '')
         except:
             return ''
     return ''
 
-def save_recap_sent(date_str):
+def save_recap_sent(date_str, key='last_sent_date'):
     try:
-        with open(RECAP_SENT_FILE, 'w') as f:
-            json.dump({'last_sent_date': date_str}, f)
+        data = {}
+        if os.path.exists(RECAP_SENT_FILE):
+            with open(RECAP_SENT_FILE, 'r') as f:
+                data = json.load(f)
+        data[key] = date_str
+        atomic_write_json(RECAP_SENT_FILE, data)
     except:
         pass
 
 def get_pairs_from_file():
     default_pairs = ["BTCUSDT", "ETHUSDT", "SOLUSDT", "BNBUSDT", "XRPUSDT"]
+    if not os.path.exists(PAIRS_FILE) and UNIVERSE_AUTO:
+        print(f"ℹ️ File {PAIRS_FILE} tidak ditemukan. Membangun universe dari Binance...")
+        refresh_universe(force=True)
     if not os.path.exists(PAIRS_FILE):
         print(f"ℹ️ File {PAIRS_FILE} tidak ditemukan. Membuat default...")
         with open(PAIRS_FILE, 'w') as f:
@@ -154,19 +451,119 @@ def get_pairs_from_file():
         return default_pairs
 
 # ==========================================
-# FUNGSI ANALISIS TRADINGVIEW
+# UNIVERSE PAIR (SNAPSHOT EXCHANGE BINANCE)
 # ==========================================
-def get_analysis(pair, interval):
+def response_json(response, source):
+    # Status selain 200 jadi FetchError (retryable untuk 429/5xx, Retry-After ikut dibawa)
+    if response.status_code != 200:
+        METRICS.incr('upstream_errors')
+        retry_after = response.headers.get('Retry-After', '')
+        raise FetchError(
+            f"HTTP {response.status_code} dari {source}", status=response.status_code,
+            retry_after=float(retry_after) if retry_after.isdigit() else None
+        )
+    return response.json()
+
+def binance_get(url, params=None):
+    with METRICS.timer('fetch_universe'):
+        response = HTTP_SESSION.get(url, params=params, timeout=FETCH_TIMEOUT)
+    return response_json(response, urlparse(url).path)
+
+def fetch_exchange_snapshot():
+    # Return (exchangeInfo, ticker 24 jam, {simbol: listing ms} atau None)
+    if UNIVERSE_FIXTURE:
+        with open(UNIVERSE_FIXTURE, 'r') as f:
+            fixture = json.load(f)
+        return fixture['exchangeInfo'], fixture['ticker24hr'], fixture.get('listedAt', {})
+    exchange_info = FETCH_ENGINE.call(BINANCE_HOST, partial(binance_get, BINANCE_EXCHANGE_INFO_URL))
+    tickers = FETCH_ENGINE.call(BINANCE_HOST, partial(binance_get, BINANCE_TICKER_24H_URL))
+    return exchange_info, tickers, None
+
+def lookup_listing_dates(listed=None):
+    # Tanggal listing = open time candle 1D pertama. Hanya untuk kandidat yang belum
+    # diketahui (volume terbesar dulu), hasilnya disimpan di snapshot selamanya.
+    symbols = missing_listing(EXCHANGE_SNAPSHOT.symbols, UNIVERSE_FILTER, UNIVERSE_LISTING_LOOKUPS)
+    if listed is not None:
+        found = {symbol: listed[symbol] for symbol in symbols if symbol in listed}
+    else:
+        params = {'interval': '1d', 'startTime': 0, 'limit': 1}
+        results = FETCH_ENGINE.map({
+            symbol: (BINANCE_HOST, partial(binance_get, BINANCE_KLINES_URL, dict(params, symbol=symbol)))
+            for symbol in symbols
+        })
+        found = {symbol: rows[0][0] for symbol, rows in results.items()
+                 if not isinstance(rows, Exception) and rows}
+    for symbol, listed_ms in found.items():
+        EXCHANGE_SNAPSHOT.set_listed(symbol, listed_ms // 1000)
+    return len(found), len(symbols)
+
+def refresh_universe(force=False):
+    # Bangun ulang pairs_cache.json jika snapshot exchange sudah kedaluwarsa (atau force).
+    # Return (ditambah, dibuang) atau None jika universe tidak berubah / gagal diambil.
+    now = time.time()
+    EXCHANGE_SNAPSHOT.load()
+    if not force and not EXCHANGE_SNAPSHOT.is_stale(now):
+        return None
     try:
-        handler = TA_Handler(symbol=pair, exchange="BINANCE", screener="CRYPTO", interval=interval)
-        return handler.get_analysis()
+        with METRICS.timer('universe_refresh'):
+            exchange_info, tickers, listed = fetch_exchange_snapshot()
+            EXCHANGE_SNAPSHOT.update(exchange_info, tickers, now)
+            found, missing = lookup_listing_dates(listed)
     except Exception as e:
-        print(f"⚠️ Gagal menganalisis {pair} pada {interval}: {e}")
+        print(f"⚠️ Snapshot exchange gagal diambil, universe tidak diubah: {e}")
+        EXCHANGE_SNAPSHOT.mark_attempt(now)
+        EXCHANGE_SNAPSHOT.save()
         return None
+    EXCHANGE_SNAPSHOT.save()
+
+    pairs, rejected, held = select_pairs(EXCHANGE_SNAPSHOT.symbols, UNIVERSE_FILTER, now, pinned=ACTIVE_BUYS)
+    if not pairs:
+        print("⚠️ Tidak ada pair yang lolos filter universe, daftar lama dipertahankan.")
+        return None
+    current = []
+    if os.path.exists(PAIRS_FILE):
+        try:
+            with open(PAIRS_FILE, 'r') as f:
+                current = json.load(f)
+        except Exception as e:
+            print(f"⚠️ {PAIRS_FILE} lama tidak bisa dibaca: {e}")
+    added, removed = diff_pairs(current, pairs)
+    atomic_write_json(PAIRS_FILE, pairs, indent=4)
+
+    print(f"🌐 Universe diperbarui: {len(pairs)} pair dari {len(EXCHANGE_SNAPSHOT.symbols)} simbol USDT"
+          + (f" (termasuk {len(held)} posisi aktif di luar filter)" if held else ""))
+    if missing:
+        print(f"   📅 Tanggal listing ditemukan: {found}/{missing}")
+    print(f"   🚫 Tersaring: {', '.join(f'{k}={v}' for k, v in sorted(rejected.items())) or '-'}")
+    for label, changed in (("➕ Ditambah", added), ("➖ Dibuang", removed)):
+        if changed:
+            more = f" (+{len(changed) - UNIVERSE_PRINT_LIMIT} lagi)" if len(changed) > UNIVERSE_PRINT_LIMIT else ""
+            print(f"   {label} {len(changed)}: {', '.join(changed[:UNIVERSE_PRINT_LIMIT])}{more}")
+    return added, removed
+
+# ==========================================
+# FUNGSI ANALISIS TRADINGVIEW
+# ==========================================
+def scan_symbols(symbols, interval):
+    # Request scanner setara get_multiple_analysis, lewat session yang dipakai ulang
+    indicators_key = TradingView.indicators
+    with METRICS.timer(f'fetch_{interval}'):
+        response = HTTP_SESSION.post(
+            TV_SCAN_URL, json=TradingView.data(symbols, interval, indicators_key),
+            headers={"User-Agent": f"tradingview_ta/{TV_VERSION}"}, timeout=FETCH_TIMEOUT
+        )
+    analyses = {}
+    for row in response_json(response, 'TradingView scanner').get('data', []):
+        exchange, symbol = row['s'].split(':')
+        analyses[row['s']] = tv_calculate(
+            indicators=dict(zip(indicators_key, row['d'])), indicators_key=indicators_key,
+            screener=TV_SCREENER, symbol=symbol, exchange=exchange, interval=interval
+        )
+    return analyses
 
 def extract_indicators(analysis):
     if not analysis or not analysis.indicators:
-        return {}
+        return None
     ind = analysis.indicators
     
     def safe_float(value, default=0):
@@ -174,89 +571,402 @@ def extract_indicators(analysis):
         try: return float(value)
         except (TypeError, ValueError): return default
     
-    return {
-        'close': safe_float(ind.get('close')),
-        'ema10': safe_float(ind.get('EMA10')),
-        'ema20': safe_float(ind.get('EMA20')),
-        'ema50': safe_float(ind.get('EMA50')),
-        'ema200': safe_float(ind.get('EMA200')),
-        'macd': safe_float(ind.get('MACD.macd')),
-        'macd_signal': safe_float(ind.get('MACD.signal')),
-        'rsi': safe_float(ind.get('RSI'), 50),
-        'adx': safe_float(ind.get('ADX')),
-        'atr': safe_float(ind.get('ATR')),
-        'volume': safe_float(ind.get('Volume')),
-        'average_volume': safe_float(ind.get('average_volume')),
+    return IndicatorSnapshot(
+        close=safe_float(ind.get('close')),
+        ema10=safe_float(ind.get('EMA10')),
+        ema20=safe_float(ind.get('EMA20')),
+        ema50=safe_float(ind.get('EMA50')),
+        ema200=safe_float(ind.get('EMA200')),
+        macd=safe_float(ind.get('MACD.macd')),
+        macd_signal=safe_float(ind.get('MACD.signal')),
+        rsi=safe_float(ind.get('RSI'), 50),
+        adx=safe_float(ind.get('ADX')),
+        atr=safe_float(ind.get('ATR')),
+        volume=safe_float(ind.get('Volume')),
+        average_volume=safe_float(ind.get('average_volume')),
+    )
+
+def fetch_all_timeframes(pairs, intervals=TIMEFRAMES, chunk_size=None):
+    # Satu request scanner per (timeframe, chunk), dijalankan paralel lewat FETCH_ENGINE.
+    # Return: ({pair: {interval: indikator}}, {pair: [interval gagal]})
+    chunk_size = chunk_size or BATCH_CHUNK_SIZE
+    data = {pair: {} for pair in pairs}
+    failures = {}
+    chunks = {}
+    tasks = {}
+    for interval in intervals:
+        # Hanya pair yang tidak ada di cache yang diambil ulang
+        missing = []
+        for pair in pairs:
+            cached = INDICATOR_CACHE.get(pair, interval) if interval in CACHED_TIMEFRAMES else None
+            if cached:
+                data[pair][interval] = IndicatorSnapshot.from_dict(cached)
+            else:
+                missing.append(pair)
+
+        for index in range(0, len(missing), chunk_size):
+            chunk = missing[index:index + chunk_size]
+            symbols = [f"{TV_EXCHANGE}:{pair}".upper() for pair in chunk]
+            chunks[(interval, index)] = chunk
+            tasks[(interval, index)] = (TV_HOST, partial(scan_symbols, symbols, interval))
+
+    for (interval, index), result in FETCH_ENGINE.map(tasks).items():
+        chunk = chunks[(interval, index)]
+        if isinstance(result, Exception):
+            print(f"⚠️ Gagal mengambil batch {interval} ({len(chunk)} pair): {result}")
+            for pair in chunk:
+                failures.setdefault(pair, []).append(interval)
+            continue
+
+        for pair in chunk:
+            with METRICS.timer('extract', pair):
+                indicators = extract_indicators(result.get(f"{TV_EXCHANGE}:{pair}".upper()))
+            if indicators:
+                data[pair][interval] = indicators
+                if interval in CACHED_TIMEFRAMES:
+                    INDICATOR_CACHE.put(pair, interval, indicators.to_dict())
+            else:
+                failures.setdefault(pair, []).append(interval)
+
+    if failures:
+        print(f"⚠️ Gagal mengambil data untuk {len(failures)} pair:")
+        for pair, failed_intervals in failures.items():
+            print(f"   - {pair}: {', '.join(failed_intervals)}")
+    return data, failures
+
+# ==========================================
+# SUMBER DATA NATIVE (KLINES BINANCE + INDICATOR ENGINE)
+# ==========================================
+def fetch_klines(pair, interval, start_time=None):
+    params = {'symbol': pair, 'interval': interval, 'limit': KLINES_LIMIT}
+    if start_time is not None:
+        params['startTime'] = start_time
+    with METRICS.timer(f'fetch_{interval}', pair):
+        response = HTTP_SESSION.get(BINANCE_KLINES_URL, params=params, timeout=FETCH_TIMEOUT)
+    return response_json(response, 'Binance klines')
+
+def split_klines(klines, now_ms):
+    # Format kline: [open_time, open, high, low, close, volume, close_time, ...]
+    closed = [k for k in klines if k[6] < now_ms]
+    forming = klines[-1] if klines and klines[-1][6] >= now_ms else None
+    return closed, forming
+
+def native_symbols(state_path, pairs):
+    # Pair yang tidak diambil run ini (mis. tersaring di tahap 1D) tetap disimpan
+    # state-nya, baris NaN membuatnya tidak ter-update. Pair shard lain tidak
+    # ikut dihitung; merge mengambilnya dari state utama.
+    import numpy as np
+
+    symbols = list(pairs)
+    if os.path.exists(state_path):
+        with np.load(state_path) as saved:
+            requested = set(pairs)
+            symbols += [str(s) for s in saved['symbols']
+                        if str(s) not in requested and owns(str(s), SHARD_INDEX, SHARD_COUNT)]
+    return symbols
+
+def load_native_engine(interval, pairs):
+    from indicator_engine import IndicatorEngine
+
+    state_path = os.path.join(NATIVE_STATE_DIR, f"{interval}.npz")
+    symbols = native_symbols(state_path, pairs)
+    if os.path.exists(state_path):
+        return IndicatorEngine.load(state_path, symbols), state_path
+    return IndicatorEngine(symbols), state_path
+
+def apply_native_klines(interval, engine, state_path, pairs, closed, forming, data):
+    # Candle tertutup -> state engine (disimpan), candle berjalan -> hanya preview
+    import numpy as np
+    from indicator_engine import snapshot_dicts
+
+    symbols = engine.symbols
+    # Candle tertutup disusun per kolom waktu; simbol tanpa candle di kolom itu = NaN
+    times = sorted({k[0] for klines in closed.values() for k in klines})
+    column = {t: j for j, t in enumerate(times)}
+    shape = (len(symbols), len(times))
+    high, low, close, volume = (np.full(shape, np.nan) for _ in range(4))
+    for i, pair in enumerate(pairs):
+        for k in closed.get(pair, []):
+            j = column[k[0]]
+            high[i, j], low[i, j], close[i, j], volume[i, j] = float(k[2]), float(k[3]), float(k[4]), float(k[5])
+    with METRICS.timer(f'indicators_{interval}'):
+        engine.run(high, low, close, volume, open_times=times)
+    with METRICS.timer('persist_indicator_state'):
+        engine.save(state_path)
+
+    # Candle yang masih berjalan ikut dihitung (seperti TradingView) tanpa disimpan ke state
+    live = [np.full(len(symbols), np.nan) for _ in range(4)]
+    for i, pair in enumerate(pairs):
+        if pair in forming:
+            k = forming[pair]
+            live[0][i], live[1][i], live[2][i], live[3][i] = float(k[2]), float(k[3]), float(k[4]), float(k[5])
+    with METRICS.timer('extract'):
+        snapshots = snapshot_dicts(symbols, engine.preview(*live))
+
+    for pair in pairs:
+        if pair in closed or pair in forming:
+            data[pair][interval] = IndicatorSnapshot.from_dict(snapshots[pair])
+
+def fetch_native_interval(engine, pairs, interval, now_ms, failures):
+    # Satu request kline per pair untuk timeframe ini, mulai setelah candle tertutup terakhir di state
+    index = {pair: i for i, pair in enumerate(engine.symbols)}
+    tasks = {}
+    for pair in pairs:
+        last_time = int(engine.last_time[index[pair]])
+        start_time = last_time + 1 if last_time >= 0 else None
+        tasks[pair] = (BINANCE_HOST, partial(fetch_klines, pair, interval, start_time))
+
+    closed, forming = {}, {}
+    for pair, result in FETCH_ENGINE.map(tasks).items():
+        if isinstance(result, Exception) or not result:
+            failures.setdefault(pair, []).append(interval)
+            continue
+        closed[pair], bar = split_klines(result, now_ms)
+        if bar is not None:
+            forming[pair] = bar
+    return closed, forming
+
+def print_native_failures(failures):
+    if failures:
+        print(f"⚠️ Gagal mengambil data untuk {len(failures)} pair:")
+        for pair, failed_intervals in failures.items():
+            print(f"   - {pair}: {', '.join(failed_intervals)}")
+
+def fetch_all_timeframes_native(pairs, intervals=TIMEFRAMES):
+    # Indikator dihitung lokal dari OHLCV. State smoothing (EMA/Wilder) per timeframe
+    # disimpan, jadi run berikutnya hanya mengambil & memproses candle baru.
+    if NATIVE_BASE_INTERVAL:
+        return fetch_all_timeframes_resampled(pairs, intervals)
+
+    data = {pair: {} for pair in pairs}
+    failures = {}
+    os.makedirs(NATIVE_STATE_DIR, exist_ok=True)
+    now_ms = int(time.time() * 1000)
+
+    for interval in intervals:
+        engine, state_path = load_native_engine(interval, pairs)
+        closed, forming = fetch_native_interval(engine, pairs, interval, now_ms, failures)
+        apply_native_klines(interval, engine, state_path, pairs, closed, forming, data)
+
+    print_native_failures(failures)
+    return data, failures
+
+def resampled_from_base(interval):
+    # Timeframe yang bisa disusun dari candle dasar (kelipatan, bucket sejajar epoch)
+    seconds, base = INTERVAL_SECONDS[interval], INTERVAL_SECONDS[NATIVE_BASE_INTERVAL]
+    return interval != '1W' and seconds >= base and seconds % base == 0
+
+def fetch_all_timeframes_resampled(pairs, intervals=TIMEFRAMES):
+    # Satu request kline per pair (timeframe dasar); timeframe lain disusun lokal
+    # dari ring buffer candle dasar. Engine timeframe yang belum punya state, atau
+    # tertinggal lebih jauh dari isi buffer, diisi sekali dari kline timeframe itu sendiri.
+    from resampler import CandleBuffer, first_full_bucket, resample
+
+    data = {pair: {} for pair in pairs}
+    failures = {}
+    os.makedirs(NATIVE_STATE_DIR, exist_ok=True)
+    now_ms = int(time.time() * 1000)
+    base = NATIVE_BASE_INTERVAL
+    base_ms = INTERVAL_SECONDS[base] * 1000
+
+    buffer_path = os.path.join(NATIVE_STATE_DIR, f"base_{base}.npz")
+    symbols = native_symbols(buffer_path, pairs)
+    derived = [interval for interval in intervals if resampled_from_base(interval)]
+    capacity = RESAMPLE_BUFFER_BUCKETS * max([INTERVAL_SECONDS[i] for i in derived] + [INTERVAL_SECONDS[base]]) \
+        // INTERVAL_SECONDS[base]
+    if os.path.exists(buffer_path):
+        buffer = CandleBuffer.load(buffer_path, symbols, capacity)
+    else:
+        buffer = CandleBuffer(symbols, capacity)
+
+    tasks, fresh = {}, set()
+    for i, pair in enumerate(pairs):
+        last_time = int(buffer.last_time[i])
+        if last_time < 0:
+            fresh.add(pair)
+        tasks[pair] = (BINANCE_HOST, partial(fetch_klines, pair, base, last_time + 1 if last_time >= 0 else None))
+
+    # Stream dasar per pair: isi buffer + candle tertutup baru (+ candle yang masih berjalan)
+    streams = {}
+    results = FETCH_ENGINE.map(tasks)
+    with METRICS.timer('resample'):
+        for i, pair in enumerate(pairs):
+            result = results[pair]
+            if isinstance(result, Exception) or not result:
+                failures.setdefault(pair, []).append(base)
+                continue
+            closed, forming = split_klines(result, now_ms)
+            rows = buffer.rows(i, base_ms) + [k for k in closed if k[0] > buffer.last_time[i]]
+            streams[pair] = rows + ([forming] if forming is not None else [])
+            buffer.extend(i, closed)
+    with METRICS.timer('persist_indicator_state'):
+        buffer.save(buffer_path)
+
+    for interval in intervals:
+        engine, state_path = load_native_engine(interval, pairs)
+        if interval not in derived:
+            closed, forming = fetch_native_interval(engine, pairs, interval, now_ms, failures)
+            apply_native_klines(interval, engine, state_path, pairs, closed, forming, data)
+            continue
+
+        target_ms = INTERVAL_SECONDS[interval] * 1000
+        closed, forming, catch_up = {}, {}, []
+        with METRICS.timer('resample'):
+            for i, pair in enumerate(pairs):
+                rows = streams.get(pair)
+                if not rows:
+                    continue
+                last_time = int(engine.last_time[i])
+                if last_time < 0:
+                    # Warmup penuh hanya tersedia dari fetch awal timeframe dasar itu sendiri
+                    behind = not (interval == base and pair in fresh)
+                else:
+                    behind = last_time + target_ms < first_full_bucket(rows[0][0], target_ms)
+                if behind:
+                    catch_up.append(pair)
+                    continue
+                closed[pair], bar = resample(rows, target_ms, now_ms, after=last_time)
+                if bar is not None:
+                    forming[pair] = bar
+        if catch_up:
+            extra_closed, extra_forming = fetch_native_interval(engine, catch_up, interval, now_ms, failures)
+            closed.update(extra_closed)
+            forming.update(extra_forming)
+        apply_native_klines(interval, engine, state_path, pairs, closed, forming, data)
+
+    print_native_failures(failures)
+    return data, failures
+
+def shadow_held_pairs():
+    return {pair for shadow in SHADOWS for pair in shadow.positions}
+
+def fetch_staged(pairs):
+    # Tahap 1: 1D untuk semua pair. Pair tanpa posisi yang gagal quick filter 1D
+    # (downtrend jelas) berhenti di sini, jadi 4H & 1H-nya tidak pernah diambil.
+    # Return: (data, {pair yang tersaring}, {nama tahap: jumlah pair lolos})
+    fetch = fetch_all_timeframes_native if DATA_SOURCE == 'native' else fetch_all_timeframes
+    resampled = DATA_SOURCE == 'native' and NATIVE_BASE_INTERVAL
+    shadow_held = shadow_held_pairs()
+    if pairs and (resampled or all(pair in ACTIVE_BUYS or pair in shadow_held for pair in pairs)):
+        # Gelombang posisi (semua pasti lolos tahap 1D) atau mode resampling (1D berasal
+        # dari request yang sama dengan 4H & 1H): cukup satu putaran fetch
+        data, _ = fetch(pairs, TIMEFRAMES)
+        filtered = {pair for pair in pairs if pair not in ACTIVE_BUYS
+                    and data[pair].get(TF_TREND) and is_daily_downtrend(data[pair][TF_TREND])}
+        survivors = [pair for pair in pairs if pair not in filtered]
+        stages = {'universe': len(pairs), '1d': sum(1 for pair in pairs if data[pair].get(TF_TREND)),
+                  'prefilter': len(survivors),
+                  'complete': sum(1 for pair in survivors if all(data[pair].get(tf) for tf in TIMEFRAMES))}
+        return data, filtered, stages
+
+    data, _ = fetch(pairs, (TF_TREND,))
+
+    survivors, filtered = [], set()
+    for pair in pairs:
+        data_1d = data[pair].get(TF_TREND)
+        if pair in ACTIVE_BUYS:
+            survivors.append(pair)
+        elif data_1d and not is_daily_downtrend(data_1d):
+            survivors.append(pair)
+        elif data_1d:
+            filtered.add(pair)
+
+    # Tahap 2: 4H & 1H diambil bersamaan untuk pair yang lolos. Posisi shadow ikut
+    # diambil walau ditolak filter 1D live, supaya SL/trailing-nya tetap dicek.
+    passed = set(survivors)
+    stage2 = survivors + [pair for pair in pairs if pair in shadow_held and pair not in passed]
+    rest, _ = fetch(stage2, (TF_SETUP, TF_ENTRY))
+    for pair in stage2:
+        data[pair].update(rest[pair])
+
+    stages = {
+        'universe': len(pairs),
+        '1d': sum(1 for pair in pairs if data[pair].get(TF_TREND)),
+        'prefilter': len(survivors),
+        'complete': sum(1 for pair in survivors if all(data[pair].get(tf) for tf in TIMEFRAMES)),
     }
+    return data, filtered, stages
 
 # ==========================================
 # DEBUG: TAMPILKAN INDIKATOR MENTAH (DETAIL)
 # ==========================================
-def print_raw_indicators(pair, data_1d, data_4h, data_1h, current_price):
-    print(f"  📊 Indikator Mentah:")
-    print(f"      💲 Harga: ${current_price:.6f}")
-    print(f"      📈 1D: EMA50={data_1d['ema50']:.4f} EMA200={data_1d['ema200']:.4f} ADX={data_1d['adx']:.1f}")
-    print(f"      📈 4H: EMA20={data_4h['ema20']:.4f} EMA50={data_4h['ema50']:.4f} RSI={data_4h['rsi']:.1f}")
-    print(f"      📈 1H: EMA10={data_1h['ema10']:.4f} EMA20={data_1h['ema20']:.4f} RSI={data_1h['rsi']:.1f}")
-    print(f"      📈 1H: MACD={data_1h['macd']:.6f} Signal={data_1h['macd_signal']:.6f} ATR={data_1h['atr']:.6f}")
+RAW_INDICATORS_TEXT = (
+    "  📊 Indikator Mentah:\n"
+    "      💲 Harga: ${price:.6f}\n"
+    "      📈 1D: EMA50={d1[ema50]:.4f} EMA200={d1[ema200]:.4f} ADX={d1[adx]:.1f}\n"
+    "      📈 4H: EMA20={h4[ema20]:.4f} EMA50={h4[ema50]:.4f} RSI={h4[rsi]:.1f}\n"
+    "      📈 1H: EMA10={h1[ema10]:.4f} EMA20={h1[ema20]:.4f} RSI={h1[rsi]:.1f}\n"
+    "      📈 1H: MACD={h1[macd]:.6f} Signal={h1[macd_signal]:.6f} ATR={h1[atr]:.6f}"
+)
+
+def log_raw_indicators(pair, data_1d, data_4h, data_1h, current_price):
+    # Hanya di level debug; di level lain dict indikator tidak dibangun sama sekali
+    if not LOG.enabled(DEBUG):
+        return
+    LOG.debug('raw_indicators', RAW_INDICATORS_TEXT, pair=pair, stage='entry', price=current_price,
+              d1=data_1d.to_dict(), h4=data_4h.to_dict(), h1=data_1h.to_dict())
 
 # ==========================================
 # SCORING SYSTEM (Weighted V4.1)
 # ==========================================
-def calculate_entry_score(data_1d, data_4h, data_1h, current_price, sl_price):
+def is_daily_downtrend(data_1d):
+    return data_1d.ema50 < data_1d.ema200 and data_1d.close < data_1d.ema50
+
+def calculate_entry_score(data_1d, data_4h, data_1h, current_price, sl_price, cfg=None):
+    cfg = cfg or STRATEGY
     score = 0
     reasons = []
     vetoes = []
 
     # Quick Filter: Downtrend 1D Jelas
-    if data_1d['ema50'] < data_1d['ema200'] and data_1d['close'] < data_1d['ema50']:
-        vetoes.append("1D Downtrend jelas (Close<EMA50<EMA200)")
+    if is_daily_downtrend(data_1d):
+        vetoes.append(DAILY_DOWNTREND_VETO)
         return 0, reasons, vetoes
 
     # VETO CONDITIONS
-    if data_1h['rsi'] > RSI_OVERBOUGHT_VETO:
-        vetoes.append(f"RSI 1H OB ({data_1h['rsi']:.1f})")
+    if data_1h.rsi > cfg.rsi_overbought_veto:
+        vetoes.append(f"RSI 1H OB ({data_1h.rsi:.1f})")
 
-    if data_4h['ema20'] > 0:
-        dist = ((current_price - data_4h['ema20']) / data_4h['ema20']) * 100
-        if dist > MAX_DISTANCE_FROM_EMA20_PCT:
+    if data_4h.ema20 > 0:
+        dist = ((current_price - data_4h.ema20) / data_4h.ema20) * 100
+        if dist > cfg.max_distance_from_ema20_pct:
             vetoes.append(f"Jauh dari EMA20 4H ({dist:.1f}%)")
 
-    atr = data_1h.get('atr', 0)
-    if atr > 0 and (atr / current_price) < 0.008:
+    atr = data_1h.atr
+    if atr > 0 and (atr / current_price) < cfg.min_atr_pct:
         vetoes.append(f"ATR terlalu kecil ({(atr/current_price)*100:.2f}%)")
 
     # Perhitungan RR Target (3x ATR murni sebagai benchmark target)
     risk = current_price - sl_price
     if risk > 0 and atr > 0:
-        target_price = current_price + (3.0 * atr)
+        target_price = current_price + (cfg.rr_target_atr * atr)
         reward = target_price - current_price
         rr_ratio = reward / risk
-        if rr_ratio < 2.0:
-            vetoes.append(f"RR kecil (1:{rr_ratio:.1f} < 1:2.0)")
+        if rr_ratio < cfg.min_rr_ratio:
+            vetoes.append(f"RR kecil (1:{rr_ratio:.1f} < 1:{cfg.min_rr_ratio:.1f})")
 
     if vetoes:
         return 0, reasons, vetoes
 
     # 1. TREND (40%)
-    if data_1d['ema20'] > data_1d['ema50'] > data_1d['ema200'] and data_1d['close'] > data_1d['ema20']:
+    if data_1d.ema20 > data_1d.ema50 > data_1d.ema200 and data_1d.close > data_1d.ema20:
         score += 25
         reasons.append("✅ 1D Strong Trend (EMA20>50>200) [+25]")
-    elif data_1d['ema50'] > data_1d['ema200'] and data_1d['close'] > data_1d['ema50']:
+    elif data_1d.ema50 > data_1d.ema200 and data_1d.close > data_1d.ema50:
         score += 20
         reasons.append("✅ 1D Uptrend (Close>EMA50>200) [+20]")
     else:
         reasons.append("❌ 1D Trend Lemah [+0]")
 
-    if data_1d['adx'] > 25:
+    if data_1d.adx > 25:
         score += 15
-        reasons.append(f"✅ 1D ADX Kuat ({data_1d['adx']:.1f}) [+15]")
+        reasons.append(f"✅ 1D ADX Kuat ({data_1d.adx:.1f}) [+15]")
     else:
-        reasons.append(f"❌ 1D ADX Lemah ({data_1d['adx']:.1f}) [+0]")
+        reasons.append(f"❌ 1D ADX Lemah ({data_1d.adx:.1f}) [+0]")
 
     # 2. PULLBACK (15%)
-    if data_4h['ema20'] > data_4h['ema50']:
-        dist_4h = abs(current_price - data_4h['ema20']) / data_4h['ema20'] * 100
+    if data_4h.ema20 > data_4h.ema50:
+        dist_4h = abs(current_price - data_4h.ema20) / data_4h.ema20 * 100
         if dist_4h <= 2.0:
             score += 10
             reasons.append(f"✅ 4H Perfect Pullback (Dist {dist_4h:.1f}%) [+10]")
@@ -266,14 +976,14 @@ def calculate_entry_score(data_1d, data_4h, data_1h, current_price, sl_price):
     else:
         reasons.append("❌ 4H Bukan Pullback [+0]")
 
-    if 45 <= data_4h['rsi'] <= 60:
+    if 45 <= data_4h.rsi <= 60:
         score += 5
-        reasons.append(f"✅ 4H RSI Rebound ({data_4h['rsi']:.1f}) [+5]")
+        reasons.append(f"✅ 4H RSI Rebound ({data_4h.rsi:.1f}) [+5]")
     else:
-        reasons.append(f"⚠️ 4H RSI Tidak Ideal ({data_4h['rsi']:.1f}) [+0]")
+        reasons.append(f"⚠️ 4H RSI Tidak Ideal ({data_4h.rsi:.1f}) [+0]")
 
     # 3. MOMENTUM (30%)
-    macd_diff_4h = data_4h['macd'] - data_4h['macd_signal']
+    macd_diff_4h = data_4h.macd - data_4h.macd_signal
     if macd_diff_4h > 0:
         if current_price > 0 and abs(macd_diff_4h) / current_price < 0.002:
             score += 15
@@ -284,13 +994,13 @@ def calculate_entry_score(data_1d, data_4h, data_1h, current_price, sl_price):
     else:
         reasons.append("❌ 4H MACD Bearish [+0]")
 
-    if data_1h['ema10'] > data_1h['ema20']:
+    if data_1h.ema10 > data_1h.ema20:
         score += 5
         reasons.append("✅ 1H Momentum (EMA10>20) [+5]")
     else:
         reasons.append("❌ 1H Momentum Lemah [+0]")
 
-    macd_diff_1h = data_1h['macd'] - data_1h['macd_signal']
+    macd_diff_1h = data_1h.macd - data_1h.macd_signal
     if macd_diff_1h > 0:
         if current_price > 0 and abs(macd_diff_1h) / current_price < 0.002:
             score += 10
@@ -301,15 +1011,15 @@ def calculate_entry_score(data_1d, data_4h, data_1h, current_price, sl_price):
     else:
         reasons.append("❌ 1H MACD Bearish [+0]")
 
-    if 50 <= data_1h['rsi'] <= 65:
+    if 50 <= data_1h.rsi <= 65:
         score += 5
-        reasons.append(f"✅ 1H RSI Optimal ({data_1h['rsi']:.1f}) [+5]")
+        reasons.append(f"✅ 1H RSI Optimal ({data_1h.rsi:.1f}) [+5]")
     else:
-        reasons.append(f"⚠️ 1H RSI Tidak Optimal ({data_1h['rsi']:.1f}) [+0]")
+        reasons.append(f"⚠️ 1H RSI Tidak Optimal ({data_1h.rsi:.1f}) [+0]")
 
     # 4. VOLUME (15%)
-    vol = data_1h.get('volume', 0)
-    avg_vol = data_1h.get('average_volume', 0)
+    vol = data_1h.volume
+    avg_vol = data_1h.average_volume
     if avg_vol > 0 and vol > (1.5 * avg_vol):
         score += 15
         reasons.append(f"✅ 1H Volume Spike ({vol/avg_vol:.1f}x) [+15]")
@@ -318,80 +1028,155 @@ def calculate_entry_score(data_1d, data_4h, data_1h, current_price, sl_price):
 
     return score, reasons, vetoes
 
+# ==========================================
+# SCORING BATCH UNTUK SEMUA KANDIDAT ENTRY
+# ==========================================
+def score_entries(pairs, market_data, cfg=None, cache=None):
+    # Satu pass NumPy untuk semua pair (hasil identik dengan calculate_entry_score);
+    # teks alasan/veto dirender belakangan hanya untuk pair yang dicetak/dikirim.
+    # Dengan cache, pair yang input indikatornya tidak berubah memakai hasil sebelumnya.
+    cfg = cfg or STRATEGY
+    with METRICS.timer('score'):
+        columns = [to_columns(pairs, market_data, tf) for tf in TIMEFRAMES]
+        d1, h4, h1 = columns
+        price = h1['close']
+        sl_price = entry_sl_prices(price, h1['atr'], cfg)
+        if cache is None:
+            batch = score_batch(d1, h4, h1, price, sl_price, cfg)
+        else:
+            batch = cached_score_batch(pairs, columns, price, sl_price, cfg, cache)
+    batch.update(price=price, sl_price=sl_price)
+    return {pair: i for i, pair in enumerate(pairs)}, batch
+
 # ==========================================
 # CHECK ENTRY (V4.1)
 # ==========================================
-def check_entry(pair, data_1d, data_4h, data_1h, current_price, sl_price):
-    score, reasons, vetoes = calculate_entry_score(data_1d, data_4h, data_1h, current_price, sl_price)
+def check_entry(pair, data_1d, data_4h, data_1h, current_price, sl_price, cfg=None):
+    cfg = cfg or STRATEGY
+    score, reasons, vetoes = calculate_entry_score(data_1d, data_4h, data_1h, current_price, sl_price, cfg)
     
     if vetoes:
         return None, score, reasons, sl_price, vetoes
     
-    if score >= SCORE_BUY:
-        signal = "BUY_STRONG" if score >= SCORE_BUY_STRONG else "BUY"
+    if score >= cfg.score_buy:
+        signal = "BUY_STRONG" if score >= cfg.score_buy_strong else "BUY"
         return signal, score, reasons, sl_price, []
-    elif score >= SCORE_WATCH:
+    elif score >= cfg.score_watch:
         return "WATCH", score, reasons, sl_price, []
     else:
         return None, score, reasons, sl_price, []
 
+# ==========================================
+# RISIKO PORTOFOLIO (ANTARA SINYAL ENTRY & POSISI BARU)
+# ==========================================
+def load_correlations():
+    CORRELATIONS.load(PORTFOLIO_RISK_FILE)
+
+def save_correlations():
+    if not CORRELATIONS.dirty:
+        return
+    try:
+        with METRICS.timer('persist_correlations'):
+            CORRELATIONS.save(PORTFOLIO_RISK_FILE)
+    except Exception as e:
+        print(f"❌ Gagal simpan state korelasi: {e}")
+
+def update_correlations(prices, now, universe):
+    # Satu update per bar 1H; simbol di luar universe & posisi aktif dibuang dari state
+    with METRICS.timer('risk_update'):
+        updated = CORRELATIONS.update(prices, now)
+        CORRELATIONS.retain(set(universe) | set(ACTIVE_BUYS))
+    return updated
+
+def save_cycle_prices(now):
+    try:
+        atomic_write_json(RISK_PRICES_FILE, {'time': now, 'prices': dict(sorted(CYCLE_PRICES.items()))})
+    except Exception as e:
+        print(f"❌ Gagal simpan harga siklus: {e}")
+
+def shard_entry_slots(held):
+    # Shard berjalan paralel: sisa kapasitas dibagi rata supaya total tidak terlampaui
+    free = max(0, EXPOSURE_LIMITS.max_positions - held)
+    return -(-free // SHARD_COUNT)
+
+def review_buys(candidates, opened=0):
+    # candidates: {pair: skor} sinyal BUY gelombang ini. Return ({pair: korelasi
+    # portofolio atau None}, {pair: alasan ditolak}). Posisi yang mungkin exit di
+    # gelombang yang sama masih dihitung (konservatif).
+    if not RISK_LIMITS or not candidates:
+        return {pair: None for pair in candidates}, {}
+    held = sorted(PORTFOLIO_OTHERS | set(ACTIVE_BUYS))
+    slots = None if RISK_SHARD_SLOTS is None else RISK_SHARD_SLOTS - opened
+    with METRICS.timer('risk_review'):
+        return review_entries(CORRELATIONS, held, candidates, EXPOSURE_LIMITS, slots)
+
 # ==========================================
 # CHECK EXIT (MENGGUNAKAN TRAILING ATR)
 # ==========================================
-def check_exit(pair, current_price, data_1h):
+def check_price_exit(pair, current_price, cfg=None):
+    # Bagian check_exit() yang hanya butuh harga (SL, break even, trailing).
+    # Dipakai juga oleh exit_monitor untuk setiap tick harga.
+    cfg = cfg or STRATEGY
     if pair not in ACTIVE_BUYS:
         return None, ""
         
-    entry_data = ACTIVE_BUYS[pair]
-    entry_price = entry_data['price']
-    stop_loss = entry_data['stop_loss']
-    entry_atr = entry_data.get('entry_atr', current_price * 0.02)
-    highest_price = entry_data['highest_price']
-    
-    profit_pct = ((current_price - entry_price) / entry_price) * 100
-    profit_amount = current_price - entry_price
+    position = ACTIVE_BUYS[pair]
+    signal, details, events = price_exit(position, current_price, cfg)
+    profit_pct = position.profit_pct(current_price)
+    if EVENT_BREAK_EVEN in events:
+        save_active_buys()
+        send_telegram_alert("BREAK_EVEN", pair, current_price, f"Profit > {cfg.break_even_atr_multiplier:g}x ATR, SL moved to Entry", entry_price=position.price, profit_pct=profit_pct)
+    if EVENT_ACTIVATE_TRAIL in events:
+        send_telegram_alert("ACTIVATE_TRAIL", pair, current_price, f"Profit > {cfg.atr_trail_activation}x ATR. Trailing aktif.", entry_price=position.price, profit_pct=profit_pct)
+    return signal, details
 
-    # 1. Stop Loss Tersentuh
-    if current_price <= stop_loss:
-        return "STOP_LOSS", f"SL tercapai (${stop_loss:.4f})"
+def check_exit(pair, current_price, data_1h, cfg=None):
+    cfg = cfg or STRATEGY
+    if pair not in ACTIVE_BUYS:
+        return None, ""
 
-    # 2. Break Even (Pindah SL ke Entry jika profit > 1x ATR)
-    if profit_amount >= (BREAK_EVEN_ATR_MULTIPLIER * entry_atr) and not entry_data.get('break_even_active', False):
-        ACTIVE_BUYS[pair]['stop_loss'] = entry_price
-        ACTIVE_BUYS[pair]['break_even_active'] = True
-        save_active_buys()
-        send_telegram_alert("BREAK_EVEN", pair, current_price, f"Profit > 1x ATR, SL moved to Entry", entry_price=entry_price, profit_pct=profit_pct)
-
-    # 3. Aktivasi & Update Trailing Stop (Berdasarkan ATR)
-    if profit_amount >= (ATR_TRAIL_ACTIVATION * entry_atr):
-        # Update Highest Price
-        if current_price > highest_price:
-            ACTIVE_BUYS[pair]['highest_price'] = current_price
-            highest_price = current_price
-            
-        if not entry_data.get('trailing_active', False):
-            ACTIVE_BUYS[pair]['trailing_active'] = True
-            send_telegram_alert("ACTIVATE_TRAIL", pair, current_price, f"Profit > {ATR_TRAIL_ACTIVATION}x ATR. Trailing aktif.", entry_price=entry_price, profit_pct=profit_pct)
-        
-        # Batas Trailing: 1.5x ATR dari harga tertinggi
-        trailing_limit = highest_price - (ATR_TRAIL_DISTANCE * entry_atr)
-        
-        if current_price <= trailing_limit:
-            return "TRAILING_STOP", f"Trailing Stop ATR tersentuh di ${trailing_limit:.4f}"
+    signal, details = check_price_exit(pair, current_price, cfg)
+    if signal:
+        return signal, details
+    return indicator_exit(ACTIVE_BUYS[pair], current_price, data_1h)
 
-    # 4. Exit Indikator Pembalikan Arah (1H)
-    ema_cross_down = data_1h['ema10'] < data_1h['ema20']
-    macd_bearish = data_1h['macd'] < data_1h['macd_signal']
-    
-    if ema_cross_down and macd_bearish:
-        if profit_pct > 1 or profit_pct < -1:
-            return "SELL_EMA_MACD", f"EMA10 < EMA20 & MACD Bearish"
+EXIT_SIGNALS = ("STOP_LOSS", "TRAILING_STOP", "SELL_EMA_MACD", "SELL_CLOSE_EMA")
+
+def handle_exit_signal(pair, signal, details, current_price):
+    # Kirim alert; untuk sinyal exit, catat trade & tutup posisi. Return True jika posisi ditutup.
+    position = ACTIVE_BUYS[pair]
+    # Compare-and-swap atas waktu entry: posisi mungkin sudah ditutup proses lain
+    # sejak siklus ini dimulai, jangan kirim alert / catat trade dobel
+    sync_active_buys()
+    current = ACTIVE_BUYS.get(pair)
+    if current is None or current.time != position.time:
+        LOG.info('position_already_closed', "⏭️ Posisi {pair} sudah ditutup proses lain.", pair=pair,
+                 stage='exit', signal=signal)
+        return False
+    position = current
+    profit_pct = position.profit_pct(current_price)
+    send_telegram_alert(
+        signal, pair, current_price, details,
+        entry_price=position.price, profit_pct=profit_pct
+    )
+    if signal not in EXIT_SIGNALS:
+        return False
 
-    if current_price < data_1h['ema20']:
-        if profit_pct > 0 or profit_pct < -2:
-            return "SELL_CLOSE_EMA", f"Close < EMA20 (1H)"
+    record_trade({
+        'pair': pair, 'entry_price': position.price,
+        'exit_price': current_price, 'profit_pct': profit_pct,
+        'exit_reason': signal, 'entry_date': position.time.isoformat(),
+        'exit_date': datetime.now(UTC7).isoformat()
+    })
 
-    return None, "Hold"
+    if signal == "STOP_LOSS":
+        COOLDOWNS[pair] = Cooldown(until=datetime.now(UTC7) + timedelta(hours=STRATEGY.cooldown_hours))
+        save_cooldowns()
+    del ACTIVE_BUYS[pair]
+    save_active_buys()
+    LOG.info('position_closed', "✅ Posisi {pair} ditutup.", pair=pair, stage='exit', signal=signal,
+             profit_pct=round(profit_pct, 4))
+    return True
 
 # ==========================================
 # TELEGRAM NOTIFICATION
@@ -399,8 +1184,8 @@ def check_exit(pair, current_price, data_1h):
 def send_telegram_alert(signal_type, pair, current_price, details,
                         entry_price=None, profit_pct=None, score=None, reasons=None):
     
-    # 🆕 JIKA INI REKAP MINGGUAN, LANGSUNG KIRIM TEKS REKAP SAJA
-    if signal_type == "REKAP_MINGGUAN":
+    # 🆕 JIKA INI REKAP (MINGGUAN/BULANAN), LANGSUNG KIRIM TEKS REKAP SAJA
+    if signal_type.startswith("REKAP_"):
         message = details
     
     # FORMAT UNTUK SINYAL TRADING NORMAL
@@ -436,22 +1221,51 @@ def send_telegram_alert(signal_type, pair, current_price, details,
             for reason in reasons[:8]:
                 message += f"  {reason}\n"
                 
-    print(f"📢 Mengirim pesan Telegram untuk: {signal_type}")
-    
-    try:
-        requests.post(
-            f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/sendMessage",
-            json={
-                'chat_id': TELEGRAM_CHAT_ID, 'text': message,
-                'parse_mode': 'Markdown', 'disable_web_page_preview': True
-            }, timeout=10
-        )
-    except Exception as e:
-        print(f"❌ Gagal kirim Telegram: {e}")
+    LOG.info('telegram_queued', "📢 Pesan Telegram masuk antrean: {signal}", pair=pair, stage='notify',
+             signal=signal_type)
+    with METRICS.timer('notify', pair):
+        TELEGRAM.enqueue(message, signal_type)
 
 # ==========================================
 # REKAP MINGGUAN
 # ==========================================
+def summarize_trades(trades):
+    total_trades = len(trades)
+    wins = sum(1 for t in trades if t['profit_pct'] > 0)
+    total_profit = sum(t['profit_pct'] for t in trades)
+    return {
+        'total_trades': total_trades,
+        'wins': wins,
+        'losses': total_trades - wins,
+        'win_rate': (wins / total_trades * 100) if total_trades > 0 else 0,
+        'total_profit': total_profit,
+        'avg_profit': (total_profit / total_trades) if total_trades > 0 else 0,
+    }
+
+def build_recap_message(title, period, window):
+    summary = summarize_counter(window)
+    message = f"📊 *{title}*\n"
+    message += f"📅 Periode: {period}\n"
+    message += f"━━━━━━━━━━━━━━━━━━━━\n"
+    message += f"📈 *Total Trade:* {summary['total_trades']}\n"
+    message += f"✅ *Win:* {summary['wins']} | ❌ *Loss:* {summary['losses']}\n"
+    message += f"🎯 *Win Rate:* {summary['win_rate']:.1f}%\n"
+    message += f"💰 *Total PnL:* {summary['total_profit']:+.2f}%\n"
+    if summary['total_trades'] > 0:
+        message += f"📏 *Rata-rata/Trade:* {summary['avg_profit']:+.2f}%\n"
+
+        message += f"━━━━━━━━━━━━━━━━━━━━\n"
+        message += f"🚪 *Per Alasan Exit:*\n"
+        for reason, c in sorted(window['reasons'].items(), key=lambda kv: -kv[1]['count']):
+            message += f"  {reason.replace('_', ' ')}: {c['count']} ({c['pnl']:+.2f}%)\n"
+
+        ranked = sorted(window['pairs'].items(), key=lambda kv: kv[1]['pnl'], reverse=True)
+        message += f"🏆 *Pair Terbaik:* " + ", ".join(f"{p} {c['pnl']:+.2f}%" for p, c in ranked[:3]) + "\n"
+        message += f"🥀 *Pair Terburuk:* " + ", ".join(f"{p} {c['pnl']:+.2f}%" for p, c in ranked[::-1][:3]) + "\n"
+    message += f"━━━━━━━━━━━━━━━━━━━━\n"
+    message += f"🤖 Bot V4.1 (Independent Coin Analysis + ATR Risk) berjalan dengan baik!"
+    return message
+
 def check_and_send_weekly_recap():
     now = datetime.now(UTC7)
     if now.weekday() == 6 and now.hour == 23:
@@ -462,164 +1276,482 @@ def check_and_send_weekly_recap():
             return
             
         print("📊 Membuat rekap mingguan...")
-        history = load_trade_history()
-        cutoff = now - timedelta(days=7)
-        
-        recent_trades = []
-        for t in history:
-            try:
-                exit_date = datetime.fromisoformat(t['exit_date']).replace(tzinfo=UTC7)
-                if exit_date >= cutoff:
-                    recent_trades.append(t)
-            except:
-                pass
-                
-        total_trades = len(recent_trades)
-        wins = sum(1 for t in recent_trades if t['profit_pct'] > 0)
-        losses = total_trades - wins
-        win_rate = (wins / total_trades * 100) if total_trades > 0 else 0
-        total_profit = sum(t['profit_pct'] for t in recent_trades)
-        
-        message = f"📊 *REKAP PERFORMA MINGGUAN*\n"
-        message += f"📅 Periode: 7 Hari Terakhir\n"
-        message += f"━━━━━━━━━━━━━━━━━━━━\n"
-        message += f"📈 *Total Trade:* {total_trades}\n"
-        message += f"✅ *Win:* {wins} | ❌ *Loss:* {losses}\n"
-        message += f"🎯 *Win Rate:* {win_rate:.1f}%\n"
-        message += f"💰 *Total PnL:* {total_profit:+.2f}%\n"
-        if total_trades > 0:
-            message += f"📏 *Rata-rata/Trade:* {(total_profit/total_trades):+.2f}%\n"
-        message += f"━━━━━━━━━━━━━━━━━━━━\n"
-        message += f"🤖 Bot V4.1 (Independent Coin Analysis + ATR Risk) berjalan dengan baik!"
+        start_str = (now - timedelta(days=6)).strftime('%Y-%m-%d')
+        message = build_recap_message("REKAP PERFORMA MINGGUAN", "7 Hari Terakhir",
+                                      TRADE_STATS.window(start_str, today_str))
         
         send_telegram_alert("REKAP_MINGGUAN", "SYSTEM", 0, message)
         save_recap_sent(today_str)
         print("✅ Rekap mingguan berhasil dikirim ke Telegram.")
 
+def check_and_send_monthly_recap():
+    now = datetime.now(UTC7)
+    last_day_of_month = (now + timedelta(days=1)).month != now.month
+    if last_day_of_month and now.hour == 23:
+        today_str = now.strftime('%Y-%m-%d')
+        if load_recap_sent('last_monthly_sent_date') == today_str:
+            return
+
+        print("📊 Membuat rekap bulanan...")
+        message = build_recap_message("REKAP PERFORMA BULANAN", now.strftime('%B %Y'),
+                                      TRADE_STATS.window(now.strftime('%Y-%m-01'), today_str))
+
+        send_telegram_alert("REKAP_BULANAN", "SYSTEM", 0, message)
+        save_recap_sent(today_str, 'last_monthly_sent_date')
+        print("✅ Rekap bulanan berhasil dikirim ke Telegram.")
+
 # ==========================================
 # PROGRAM UTAMA (V4.1)
 # ==========================================
-def main():
+def load_state():
+    global ACTIVE_BUYS, COOLDOWNS, PORTFOLIO_OTHERS, RISK_SHARD_SLOTS
+    load_active_buys()
+    load_cooldowns()
+    migrate_trade_history()
+    load_trade_stats()
+    INDICATOR_CACHE.load()
+    EVAL_CACHE.load()
+    SCAN_SCHEDULE.load()
+    load_shadow_strategies()
+    load_correlations()
+    if SHARD_COUNT > 1:
+        # Shard hanya memegang record pair miliknya; pesan tertunda lama dikirim
+        # oleh langkah merge supaya tidak terkirim dobel dari tiap shard.
+        # Posisi shard lain tetap dihitung batas eksposur portofolio.
+        PORTFOLIO_OTHERS = {pair for pair in ACTIVE_BUYS if not owns(pair, SHARD_INDEX, SHARD_COUNT)}
+        RISK_SHARD_SLOTS = shard_entry_slots(len(ACTIVE_BUYS))
+        ACTIVE_BUYS = {pair: p for pair, p in ACTIVE_BUYS.items() if owns(pair, SHARD_INDEX, SHARD_COUNT)}
+        COOLDOWNS = {pair: c for pair, c in COOLDOWNS.items() if owns(pair, SHARD_INDEX, SHARD_COUNT)}
+        print(f"🧩 Shard {SHARD_INDEX}/{SHARD_COUNT}: {len(ACTIVE_BUYS)} posisi aktif, {len(COOLDOWNS)} cooldown.")
+    else:
+        TELEGRAM.load()
+    TELEGRAM.start()
+
+def save_state():
+    # Checkpoint: hanya file yang isinya berubah yang ditulis ulang
+    save_active_buys()
+    save_cooldowns()
+    with METRICS.timer('persist_indicator_cache'):
+        INDICATOR_CACHE.save()
+    with METRICS.timer('persist_evaluation_cache'):
+        EVAL_CACHE.save()
+    try:
+        SCAN_SCHEDULE.save(ACTIVE_BUYS)
+    except Exception as e:
+        print(f"❌ Gagal simpan jadwal scan: {e}")
+    save_shadow_strategies()
+    save_correlations()
+
+def print_banner(mode):
     print(f"🕒 Bot V4.1 dimulai: {datetime.now(UTC7).strftime('%Y-%m-%d %H:%M:%S')}")
     print("📌 Mode: Independent Coin Analysis (Tanpa Filter Makro BTC) + ATR Risk Management")
+    print(f"⚙️ Eksekusi: {mode}")
+    if SHARD_COUNT > 1:
+        print(f"🧩 Shard {SHARD_INDEX}/{SHARD_COUNT} (hash CRC32 simbol)")
     print("=" * 60)
-    
-    load_active_buys()
-    load_cooldowns()
-    pairs = get_pairs_from_file()
+
+def run_cycle():
+    if UNIVERSE_AUTO and SHARD_COUNT == 1:
+        # Di mode shard universe diperbarui oleh langkah merge, supaya semua shard
+        # memakai daftar pair yang sama
+        refresh_universe()
+    pairs = [pair for pair in get_pairs_from_file() if owns(pair, SHARD_INDEX, SHARD_COUNT)]
     
     print("\n✅ Mulai menganalisis altcoin...")
     print("=" * 60)
     
-    stats = {'BUY': 0, 'WATCH': 0, 'SKIP': 0, 'VETO': 0, 'HOLD': 0, 'EXIT': 0}
+    started = time.monotonic()
+    cycle_ts = time.time()
+    stats = {'BUY': 0, 'WATCH': 0, 'SKIP': 0, 'VETO': 0, 'HOLD': 0, 'EXIT': 0, 'LIMIT': 0, 'DEFERRED': 0}
+    FETCH_ENGINE.reset_stats()
+    CYCLE_PRICES.clear()
+    for shadow in SHADOWS:
+        shadow.reset_cycle()
+    INDICATOR_CACHE.hits = INDICATOR_CACHE.misses = 0
+    EVAL_CACHE.hits = EVAL_CACHE.misses = 0
     
+    scan_pairs = []
     for pair in pairs:
-        print(f"\n🔎 Menganalisis: {pair}")
-        
         if pair in COOLDOWNS:
-            if datetime.now(UTC7) < COOLDOWNS[pair]:
-                remaining = (COOLDOWNS[pair] - datetime.now(UTC7)).total_seconds() / 3600
-                print(f"  ⏳ {pair} dalam cooldown ({remaining:.1f} jam lagi). Skip.")
+            if COOLDOWNS[pair].active(datetime.now(UTC7)):
+                remaining = COOLDOWNS[pair].remaining_hours(datetime.now(UTC7))
+                LOG.info('cooldown', "  ⏳ {pair} dalam cooldown ({remaining_hours:.1f} jam lagi). Skip.",
+                         pair=pair, stage='scan', remaining_hours=round(remaining, 2))
                 stats['SKIP'] += 1
                 continue
             else:
                 del COOLDOWNS[pair]
-                save_cooldowns()
-        
-        analysis_1d = get_analysis(pair, TF_TREND)
-        analysis_4h = get_analysis(pair, TF_SETUP)
-        analysis_1h = get_analysis(pair, TF_ENTRY)
-        
-        if not all([analysis_1d, analysis_4h, analysis_1h]):
-            print(f"⚠️ Gagal mengambil data untuk {pair}. Skip.")
+        scan_pairs.append(pair)
+    save_cooldowns()
+    LOG.flush()
+
+    print(f"\n📡 Mengambil data {len(scan_pairs)} pair dari {DATA_SOURCE} ({len(TIMEFRAMES)} timeframe, batch {BATCH_CHUNK_SIZE}, "
+          f"{FETCH_MAX_WORKERS} worker, {FETCH_RATE_PER_SEC:g} req/s, budget {CYCLE_BUDGET_SECONDS:g} detik)...")
+
+    # Gelombang berprioritas: posisi (terdekat ke SL) -> WATCH terbaru -> sisa universe
+    shard_key = f"{SHARD_INDEX}/{SHARD_COUNT}"
+    tiers = SCAN_SCHEDULE.plan(scan_pairs, ACTIVE_BUYS, shard_key)
+    universe_tier = set(dict(tiers)[TIER_UNIVERSE])
+    stages = {'universe': 0, '1d': 0, 'prefilter': 0, 'complete': 0}
+    deferred = []
+    per_pair = None
+    for index, wave in enumerate(waves(tiers, SCHEDULER_WAVE_SIZE)):
+        elapsed = time.monotonic() - started
+        over_budget = elapsed >= CYCLE_BUDGET_SECONDS or (
+            per_pair is not None and elapsed + per_pair * len(wave) > CYCLE_BUDGET_SECONDS)
+        # Gelombang pertama (semua posisi) selalu jalan; sekali menunda, sisanya ikut ditunda
+        if index > 0 and (over_budget or deferred):
+            deferred.extend(wave)
+            continue
+        wave_started = time.monotonic()
+        with METRICS.timer('scan_wave'):
+            wave_stages = analyze_pairs(wave, stats, cycle_ts)
+        for key in stages:
+            stages[key] += wave_stages[key]
+        per_pair = (time.monotonic() - wave_started) / len(wave)
+    LOG.flush()
+
+    SCAN_SCHEDULE.defer(shard_key, [pair for pair in deferred if pair in universe_tier])
+    stats['DEFERRED'] = len(deferred)
+    stages['deferred'] = deferred
+    if SHARD_COUNT == 1:
+        update_correlations(CYCLE_PRICES, cycle_ts, pairs)
+    else:
+        save_cycle_prices(cycle_ts)
+    if SNAPSHOT_ARCHIVE:
+        SNAPSHOT_STORE.enforce_retention()
+
+    save_state()
+    if SHARD_COUNT == 1:
+        check_and_send_weekly_recap()
+        check_and_send_monthly_recap()
+    return stats, stages
+
+def archive_snapshots(cycle_ts, pairs, market_data, entry_rows, entry_batch):
+    # Indikator + hasil scoring gelombang ini ke arsip kolomnar (untuk analisis & replay)
+    if not SNAPSHOT_ARCHIVE:
+        return
+    columns = ('price', 'sl_price', 'score', 'signal', 'vetoes', 'rules')
+    scores = {pair: tuple(entry_batch[name][row] for name in columns) for pair, row in entry_rows.items()}
+    try:
+        with METRICS.timer('persist_snapshots'):
+            SNAPSHOT_STORE.append(cycle_ts, pairs, market_data, scores)
+    except Exception as e:
+        print(f"❌ Gagal menulis arsip snapshot: {e}")
+
+ENTRY_TEXT = "  ✅ SINYAL {signal} (Score: {score}/100)"
+
+def veto_text(fields):
+    return "  🚫 VETO: " + "; ".join(fields['vetoes'])
+
+def analyze_pairs(scan_pairs, stats, cycle_ts=None):
+    # Fetch bertahap + scoring batch + exit/entry untuk satu gelombang pair.
+    # Event gelombang sebelumnya ditulis dulu supaya urutan dengan print fetch terjaga.
+    LOG.flush()
+    market_data, prefiltered, stages = fetch_staged(scan_pairs)
+    entry_candidates = [
+        pair for pair in scan_pairs
+        if pair not in ACTIVE_BUYS and pair not in prefiltered
+        and all(market_data[pair].get(tf) for tf in TIMEFRAMES) and market_data[pair][TF_ENTRY].close != 0
+    ]
+    entry_rows, entry_batch = score_entries(entry_candidates, market_data, cache=EVAL_CACHE)
+    run_shadow_strategies(scan_pairs, market_data, prefiltered)
+    archive_snapshots(cycle_ts or time.time(), scan_pairs, market_data, entry_rows, entry_batch)
+    for pair in scan_pairs:
+        data_1h = market_data[pair].get(TF_ENTRY)
+        if data_1h and data_1h.close > 0:
+            CYCLE_PRICES[pair] = data_1h.close
+    buys = {pair: int(entry_batch['score'][row]) for pair, row in entry_rows.items()
+            if entry_batch['signal'][row] >= SIGNAL_BUY}
+    approved, rejected = review_buys(buys, stats['BUY'])
+
+    for pair in scan_pairs:
+        LOG.info('pair', "\n🔎 Menganalisis: {pair}", pair=pair, stage='scan')
+
+        if pair in prefiltered:
+            LOG.info('veto', "  🚫 VETO: {vetoes[0]} (4H/1H tidak diambil)", pair=pair, stage='prefilter',
+                     vetoes=[DAILY_DOWNTREND_VETO])
+            stats['VETO'] += 1
+            continue
+
+        data_1d = market_data[pair].get(TF_TREND)
+        data_4h = market_data[pair].get(TF_SETUP)
+        data_1h = market_data[pair].get(TF_ENTRY)
+
+        # Exit check cukup dengan data 1H, jadi posisi aktif tetap dicek walau 1D/4H gagal
+        complete = all([data_1d, data_4h, data_1h])
+        if not data_1h or (not complete and pair not in ACTIVE_BUYS):
+            LOG.warning('skip', "⚠️ Gagal mengambil data untuk {pair}. Skip.", pair=pair, stage='fetch',
+                        reason='missing_data')
             stats['SKIP'] += 1
             continue
             
-        data_1d = extract_indicators(analysis_1d)
-        data_4h = extract_indicators(analysis_4h)
-        data_1h = extract_indicators(analysis_1h)
-        current_price = data_1h['close']
+        current_price = data_1h.close
         
         if current_price == 0:
-            print(f"⚠️ Harga 0 untuk {pair}. Skip.")
+            LOG.warning('skip', "⚠️ Harga 0 untuk {pair}. Skip.", pair=pair, stage='fetch', reason='zero_price')
             stats['SKIP'] += 1
             continue
         
-        print_raw_indicators(pair, data_1d, data_4h, data_1h, current_price)
+        if complete and pair in entry_rows and entry_batch['reused'][entry_rows[pair]]:
+            LOG.info('evaluation_reused', "  ♻️ Indikator sama dengan evaluasi sebelumnya, hasil dipakai ulang.",
+                     pair=pair, stage='entry')
+        elif complete:
+            log_raw_indicators(pair, data_1d, data_4h, data_1h, current_price)
+        else:
+            LOG.warning('partial_data', "  ⚠️ Data 1D/4H tidak lengkap, hanya cek exit posisi aktif.",
+                        pair=pair, stage='exit')
             
-        atr = data_1h.get('atr', 0)
+        atr = data_1h.atr
         if atr > 0:
-            sl_price = current_price - (ATR_SL_MULTIPLIER * atr)
+            sl_price = current_price - (STRATEGY.atr_sl_multiplier * atr)
         else:
             sl_price = current_price * 0.95 # Fallback lebar jika tidak ada ATR
 
         # CEK EXIT UNTUK POSISI AKTIF
         if pair in ACTIVE_BUYS:
-            signal, details = check_exit(pair, current_price, data_1h)
+            with METRICS.timer('exit_check', pair):
+                signal, details = check_exit(pair, current_price, data_1h)
             if signal:
-                entry_data = ACTIVE_BUYS[pair]
-                profit_pct = ((current_price - entry_data['price']) / entry_data['price']) * 100
-                send_telegram_alert(
-                    signal, pair, current_price, details,
-                    entry_price=entry_data['price'], profit_pct=profit_pct
-                )
-                if signal in ["STOP_LOSS", "TRAILING_STOP", "SELL_EMA_MACD", "SELL_CLOSE_EMA"]:
-                    history = load_trade_history()
-                    history.append({
-                        'pair': pair, 'entry_price': entry_data['price'],
-                        'exit_price': current_price, 'profit_pct': profit_pct,
-                        'exit_reason': signal, 'entry_date': entry_data['time'].isoformat(),
-                        'exit_date': datetime.now(UTC7).isoformat()
-                    })
-                    save_trade_history(history)
-                    
-                    if signal == "STOP_LOSS":
-                        COOLDOWNS[pair] = datetime.now(UTC7) + timedelta(hours=COOLDOWN_HOURS)
-                        save_cooldowns()
-                    del ACTIVE_BUYS[pair]
-                    print(f"✅ Posisi {pair} ditutup.")
+                if handle_exit_signal(pair, signal, details, current_price):
                     stats['EXIT'] += 1
             else:
-                profit_pct = ((current_price - ACTIVE_BUYS[pair]['price']) / ACTIVE_BUYS[pair]['price']) * 100
-                print(f"  ⏸️ Hold: Profit {profit_pct:+.2f}%")
+                profit_pct = ACTIVE_BUYS[pair].profit_pct(current_price)
+                LOG.info('hold', "  ⏸️ Hold: Profit {profit_pct:+.2f}%", pair=pair, stage='exit',
+                         price=current_price, profit_pct=round(profit_pct, 4))
+                SCAN_SCHEDULE.record_price(pair, current_price)
                 stats['HOLD'] += 1
                 
         # CEK ENTRY JIKA TIDAK ADA POSISI
         else:
-            signal, score, reasons, sl_price, vetoes = check_entry(
-                pair, data_1d, data_4h, data_1h, current_price, sl_price
-            )
+            row = entry_rows[pair]
+            signal = SIGNAL_NAMES[entry_batch['signal'][row]]
+            score = int(entry_batch['score'][row])
+            veto_mask = entry_batch['vetoes'][row]
+            if signal != "WATCH" and pair not in rejected:
+                SCAN_SCHEDULE.clear_watch(pair)
             
-            if signal == "BUY" or signal == "BUY_STRONG":
-                print(f"  ✅ SINYAL {signal} (Score: {score}/100)")
-                ACTIVE_BUYS[pair] = {
-                    'price': current_price, 'time': datetime.now(UTC7),
-                    'stop_loss': sl_price, 'entry_atr': atr, # Simpan ATR untuk Trailing
-                    'trailing_active': False, 'highest_price': current_price,
-                    'entry_score': score, 'break_even_active': False
-                }
-                sl_info = f"SL: ${sl_price:.4f} (2.5x ATR)"
+            if pair in rejected:
+                # Sinyal BUY tetap dipantau: bisa lolos begitu ada posisi yang ditutup
+                LOG.info('entry_rejected', "  🧺 {signal} DITOLAK (risiko portofolio: {reason}) - Score: {score}/100",
+                         pair=pair, stage='risk', signal=signal, score=score, reason=rejected[pair])
+                SCAN_SCHEDULE.record_watch(pair, score)
+                stats['LIMIT'] += 1
+            elif signal == "BUY" or signal == "BUY_STRONG":
+                rho = approved.get(pair)
+                LOG.info('entry', ENTRY_TEXT if rho is None else ENTRY_TEXT + " | ρ portofolio {rho:+.2f}",
+                         pair=pair, stage='entry', signal=signal, score=score, price=current_price,
+                         sl_price=sl_price, rho=rho)
+                reasons = render_reasons(entry_batch['rules'][row], data_1d, data_4h, data_1h, current_price)
+                ACTIVE_BUYS[pair] = Position(
+                    price=current_price, time=datetime.now(UTC7),
+                    stop_loss=sl_price, entry_atr=atr, # Simpan ATR untuk Trailing
+                    trailing_active=False, highest_price=current_price,
+                    entry_score=score, break_even_active=False
+                )
+                sl_info = f"SL: ${sl_price:.4f} ({STRATEGY.atr_sl_multiplier}x ATR)"
                 send_telegram_alert(signal, pair, current_price, sl_info, score=score, reasons=reasons)
+                SCAN_SCHEDULE.record_price(pair, current_price)
                 stats['BUY'] += 1
             elif signal == "WATCH":
-                print(f"  👀 WATCH (Score: {score}/100) - Pantau")
+                LOG.info('watch', "  👀 WATCH (Score: {score}/100) - Pantau", pair=pair, stage='entry', score=score)
+                SCAN_SCHEDULE.record_watch(pair, score)
                 stats['WATCH'] += 1
-            elif vetoes:
-                print(f"  🚫 VETO: {'; '.join(vetoes)}")
+            elif veto_mask:
+                if LOG.enabled(INFO):
+                    vetoes = render_vetoes(veto_mask, data_1d, data_4h, data_1h, current_price, sl_price, STRATEGY)
+                    LOG.info('veto', veto_text, pair=pair, stage='entry', vetoes=vetoes, mask=int(veto_mask))
                 stats['VETO'] += 1
             else:
-                print(f"  ❌ Skip (Score: {score}/100)")
+                LOG.info('skip', "  ❌ Skip (Score: {score}/100)", pair=pair, stage='entry', score=score)
                 stats['SKIP'] += 1
-                
-    save_active_buys()
-    check_and_send_weekly_recap()
-    
-    print("\n" + "=" * 60)
-    print("📊 RINGKASAN SIKLUS:")
-    print(f"   🚀 BUY: {stats['BUY']} | 👀 WATCH: {stats['WATCH']} | ⏸️ HOLD: {stats['HOLD']}")
-    print(f"   ✅ EXIT: {stats['EXIT']} | 🚫 VETO: {stats['VETO']} | ❌ SKIP: {stats['SKIP']}")
-    print("=" * 60)
-    print("✅ Siklus analisis selesai.")
+    return stages
+
+def cycle_summary(stats, stages, unsent):
+    # Ringkasan siklus sebagai data (event cycle_summary), dirender ke teks hanya di format text
+    stages_timing = METRICS.summary()['stages']
+    cycle = stages_timing.pop('cycle', None)
+    slowest = sorted(stages_timing.items(), key=lambda item: item[1]['total'], reverse=True)
+    live_cpu = sum(stages_timing.get(stage, {}).get('total', 0.0) for stage in ('score', 'exit_check'))
+    deferred = stages.get('deferred', [])
+    return {
+        'signals': dict(stats),
+        'risk': {'positions': len(PORTFOLIO_OTHERS | set(ACTIVE_BUYS)), 'max_positions': EXPOSURE_LIMITS.max_positions,
+                 'rejected': stats['LIMIT'], 'tracked': len(CORRELATIONS.symbols)} if RISK_LIMITS else None,
+        'fetch': dict(FETCH_ENGINE.stats),
+        'pipeline': {key: stages[key] for key in ('universe', '1d', 'prefilter', 'complete')},
+        'deferred': {'count': len(deferred), 'sample': deferred[:DEFERRED_PRINT_LIMIT],
+                     'budget_seconds': CYCLE_BUDGET_SECONDS},
+        'indicator_cache': {'hits': INDICATOR_CACHE.hits, 'misses': INDICATOR_CACHE.misses},
+        'evaluation_cache': {'hits': EVAL_CACHE.hits, 'misses': EVAL_CACHE.misses},
+        'telegram': {**TELEGRAM.stats, 'pending': unsent},
+        'cycle_seconds': round(cycle['total'], 4) if cycle else None,
+        'slowest_stages': [{'stage': stage, 'total': round(s['total'], 4), 'p95': round(s['p95'], 4)}
+                           for stage, s in slowest[:METRICS_TOP_STAGES]],
+        'live_cpu_ms': round(live_cpu * 1000, 3),
+        'shadows': shadow_summary(),
+    }
+
+def render_cycle_summary(s):
+    signals, fetch, pipeline = s['signals'], s['fetch'], s['pipeline']
+    lines = ["\n" + "=" * 60, "📊 RINGKASAN SIKLUS:",
+             f"   🚀 BUY: {signals['BUY']} | 👀 WATCH: {signals['WATCH']} | ⏸️ HOLD: {signals['HOLD']}",
+             f"   ✅ EXIT: {signals['EXIT']} | 🚫 VETO: {signals['VETO']} | ❌ SKIP: {signals['SKIP']}"]
+    risk = s['risk']
+    if risk:
+        lines.append(f"   🧺 RISIKO: {risk['positions']}/{risk['max_positions']} posisi | ditolak {risk['rejected']} | "
+                     f"korelasi dilacak {risk['tracked']} pair")
+    lines.append(f"   📡 FETCH: {fetch['requests']} request | 🔁 Retry: {fetch['retries']} | "
+                 f"⚠️ Gagal: {fetch['failures']} | ⛔ Circuit open: {fetch['circuit_open']}")
+    lines.append(f"   🧪 PIPELINE: {pipeline['universe']} pair → 1D {pipeline['1d']} → lolos filter 1D "
+                 f"{pipeline['prefilter']} → 4H+1H lengkap {pipeline['complete']}")
+    deferred = s['deferred']
+    if deferred['count']:
+        sample = ', '.join(deferred['sample']) + (' ...' if deferred['count'] > len(deferred['sample']) else '')
+        lines.append(f"   ⏭️ DITUNDA (budget {deferred['budget_seconds']:g} detik): {deferred['count']} pair "
+                     f"→ run berikutnya: {sample}")
+    lines.append(f"   🗄️ CACHE: {s['indicator_cache']['hits']} hit | {s['indicator_cache']['misses']} miss")
+    lines.append(f"   ♻️ EVALUASI: {s['evaluation_cache']['hits']} dipakai ulang | "
+                 f"{s['evaluation_cache']['misses']} dihitung ulang")
+    telegram = s['telegram']
+    lines.append(f"   📨 TELEGRAM: {telegram['sent']} terkirim | ⏳ 429: {telegram['rate_limited']} | "
+                 f"🗑️ Dibuang: {telegram['dropped']} | 📬 Tertunda: {telegram['pending']}")
+    if s['cycle_seconds'] is not None:
+        top = " | ".join(f"{t['stage']} {t['total']:.2f}s (p95 {t['p95']*1000:.0f}ms)" for t in s['slowest_stages'])
+        lines.append(f"   ⏱️ SIKLUS: {s['cycle_seconds']:.2f} detik | tahap terlama: {top}")
+    ratio = f" (live score+exit {s['live_cpu_ms']:.1f} ms)" if s['live_cpu_ms'] else ""
+    for shadow in s['shadows']:
+        lines.append(f"   👻 SHADOW {shadow['name']}: {shadow['positions']} posisi | BUY {shadow['buy']} | "
+                     f"EXIT {shadow['exit']} ({shadow['pnl_pct']:+.2f}%) | total {shadow['trades']} trade, "
+                     f"WR {shadow['win_rate_pct']:.0f}%, PnL {shadow['total_pnl_pct']:+.2f}% | "
+                     f"CPU {shadow['cpu_ms']:.1f} ms{ratio}")
+    lines += ["=" * 60, "✅ Siklus analisis selesai."]
+    return "\n".join(lines)
+
+def log_cycle_summary(stats, stages, unsent):
+    LOG.info('cycle_summary', render_cycle_summary, stage='cycle', **cycle_summary(stats, stages, unsent))
+    LOG.flush()
+
+# ==========================================
+# METRIK & PROFILING SIKLUS
+# ==========================================
+def instrumented_cycle(profile=False):
+    # Satu siklus dengan metrik per tahap; --profile menambah cProfile untuk siklus ini
+    METRICS.reset()
+    with METRICS.timer('cycle'):
+        if not profile:
+            return run_cycle()
+        profiler = cProfile.Profile()
+        result = profiler.runcall(run_cycle)
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    profiler.dump_stats(PROFILE_FILE)
+    print(f"\n🔬 PROFIL SIKLUS (disimpan ke {PROFILE_FILE}):")
+    pstats.Stats(profiler).sort_stats('cumulative').print_stats(PROFILE_TOP)
+    return result
+
+def export_metrics(stats):
+    fetch_stats = FETCH_ENGINE.stats
+    for name in ('requests', 'retries', 'failures', 'circuit_open'):
+        METRICS.set(f'fetch_{name}', fetch_stats[name])
+    METRICS.set('cache_hits', INDICATOR_CACHE.hits)
+    METRICS.set('cache_misses', INDICATOR_CACHE.misses)
+    METRICS.set('evaluation_hits', EVAL_CACHE.hits)
+    METRICS.set('evaluation_misses', EVAL_CACHE.misses)
+    # Statistik Telegram terakumulasi selama proses hidup (--daemon), sisanya per siklus
+    for name, value in TELEGRAM.stats.items():
+        METRICS.set(f'telegram_{name}_total', value)
+    for name, value in stats.items():
+        METRICS.set(f'signals_{name.lower()}', value)
+    try:
+        os.makedirs(METRICS_DIR, exist_ok=True)
+        return METRICS.write(METRICS_PROM_FILE, METRICS_JSON_FILE)
+    except Exception as e:
+        print(f"⚠️ Gagal simpan metrik: {e}")
+        return None
+
+def main(profile=False):
+    # Mode cron: satu siklus lalu keluar
+    print_banner("sekali jalan (cron)")
+    load_state()
+    stats, stages = instrumented_cycle(profile)
+    unsent = TELEGRAM.close(TELEGRAM_FLUSH_TIMEOUT)
+    export_metrics(stats)
+    log_cycle_summary(stats, stages, unsent)
+
+# ==========================================
+# MODE DAEMON (PROSES PERSISTEN)
+# ==========================================
+def next_candle_close(now=None):
+    # Waktu tutup candle terdekat dari semua timeframe + daftar timeframe yang tutup saat itu
+    now = time.time() if now is None else now
+    closes = {interval: candle_open_time(interval, now) + INTERVAL_SECONDS[interval] for interval in TIMEFRAMES}
+    close_at = min(closes.values())
+    return close_at, [interval for interval, at in closes.items() if at == close_at]
+
+def run_daemon(profile=False):
+    # State, session HTTP & thread Telegram tetap hidup di memori antar siklus
+    stop = threading.Event()
+
+    def request_stop(signum, frame):
+        print(f"\n🛑 {os_signal.Signals(signum).name} diterima, berhenti setelah checkpoint...")
+        stop.set()
+
+    for signum in (os_signal.SIGINT, os_signal.SIGTERM):
+        os_signal.signal(signum, request_stop)
+
+    print_banner(f"daemon (siklus {DAEMON_CLOSE_DELAY:g} detik setelah candle ditutup)")
+    load_state()
+    try:
+        while not stop.is_set():
+            close_at, closed = next_candle_close()
+            wake_at = close_at + DAEMON_CLOSE_DELAY
+            wake_str = datetime.fromtimestamp(wake_at, UTC7).strftime('%Y-%m-%d %H:%M:%S')
+            print(f"\n💤 Menunggu candle {'/'.join(closed)} ditutup, siklus berikutnya {wake_str}")
+            if stop.wait(max(wake_at - time.time(), 0)):
+                break
+
+            # Posisi/cooldown bisa diubah exit_monitor di antara siklus
+            sync_active_buys()
+            sync_cooldowns()
+
+            print(f"🕒 Siklus dimulai: {datetime.now(UTC7).strftime('%Y-%m-%d %H:%M:%S')}")
+            try:
+                # Profil hanya siklus pertama supaya overhead cProfile tidak terbawa terus
+                stats, stages = instrumented_cycle(profile)
+            except Exception as e:
+                print(f"❌ Siklus gagal: {e}")
+                continue
+            finally:
+                profile = False
+            TELEGRAM.flush_digest()
+            export_metrics(stats)
+            log_cycle_summary(stats, stages, len(TELEGRAM.pending))
+    finally:
+        save_state()
+        unsent = TELEGRAM.close(TELEGRAM_FLUSH_TIMEOUT)
+        print(f"✅ Daemon berhenti. State disimpan, {unsent} pesan Telegram tertunda.")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Bot sinyal crypto V4.1")
+    parser.add_argument('--daemon', action='store_true',
+                        help="Jalan terus dan analisis setiap candle ditutup (default: satu siklus lalu keluar)")
+    parser.add_argument('--profile', action='store_true',
+                        help=f"Jalankan cProfile untuk satu siklus dan simpan ke {PROFILE_FILE}")
+    parser.add_argument('--refresh-universe', action='store_true',
+                        help=f"Bangun ulang {PAIRS_FILE} dari snapshot exchange Binance sekarang lalu keluar")
+    parser.add_argument('--shard', metavar='INDEX/JUMLAH',
+                        help="Hanya proses pair milik shard ini, mis. 0/4 (default: env SHARD_INDEX/SHARD_COUNT)")
+    args = parser.parse_args()
+    LOG.claim_stdout()
+    if args.shard:
+        try:
+            SHARD_INDEX, SHARD_COUNT = parse_shard(args.shard)
+        except ValueError as e:
+            parser.error(str(e))
+    if args.refresh_universe:
+        load_active_buys()
+        refresh_universe(force=True)
+    elif args.daemon:
+        run_daemon(args.profile)
+    else:
+        main(args.profile)
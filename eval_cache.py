@@ -0,0 +1,111 @@
+import hashlib
+import json
+import os
+import time
+from dataclasses import asdict
+from functools import lru_cache
+
+import numpy as np
+
+import scoring
+from state_store import atomic_write_json
+
+# ==========================================
+# CACHE HASIL EVALUASI PER PAIR (FINGERPRINT INPUT)
+# ==========================================
+# Fingerprint = hash semua nilai indikator (semua field, semua timeframe) yang
+# menjadi input scoring. Pair yang fingerprint-nya sama dengan evaluasi
+# sebelumnya memakai hasil tersimpan (skor, sinyal, veto, aturan); hanya pair
+# yang inputnya berubah yang di-scoring ulang. Seluruh cache terikat pada kunci
+# konfigurasi = parameter StrategyConfig + isi modul aturan scoring, jadi
+# parameter atau aturan berubah = semua entri otomatis tidak berlaku.
+RESULT_FIELDS = ('score', 'signal', 'vetoes', 'rules')
+
+
+@lru_cache(maxsize=16)
+def config_key(cfg):
+    digest = hashlib.sha1(json.dumps(asdict(cfg), sort_keys=True).encode())
+    with open(scoring.__file__, 'rb') as f:
+        digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+def input_fingerprints(columns):
+    # columns: [{field: array}] per timeframe (baris = pair) -> fingerprint hex per pair
+    matrix = np.column_stack([np.asarray(col[field], dtype=np.float64) for col in columns for field in col])
+    return [hashlib.blake2b(row.tobytes(), digest_size=8).hexdigest() for row in matrix]
+
+
+class EvaluationCache:
+    def __init__(self, path, max_age_hours=24):
+        self.path = path
+        self.max_age_seconds = max_age_hours * 3600
+        self.config = None
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+
+    def load(self):
+        self.config, self.entries = None, {}
+        self.hits = self.misses = 0
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+            self.config, self.entries = data.get('config'), data.get('entries', {})
+        except Exception as e:
+            print(f"⚠️ Cache evaluasi tidak bisa dibaca, mulai kosong: {e}")
+            self.config, self.entries = None, {}
+
+    def bind(self, key):
+        # Kunci konfigurasi berbeda dari yang tersimpan: semua hasil lama dibuang
+        if key != self.config:
+            if self.entries:
+                print(f"♻️ Konfigurasi strategi berubah, {len(self.entries)} hasil evaluasi lama dibuang.")
+            self.config, self.entries = key, {}
+
+    def lookup(self, pair, fingerprint, now=None):
+        entry = self.entries.get(pair)
+        if entry and entry['fp'] == fingerprint:
+            entry['seen_at'] = int(time.time() if now is None else now)
+            self.hits += 1
+            return entry
+        self.misses += 1
+        return None
+
+    def store(self, pair, fingerprint, result, now=None):
+        now = int(time.time() if now is None else now)
+        self.entries[pair] = {'fp': fingerprint, 'evaluated_at': now, 'seen_at': now,
+                              **{name: int(result[name]) for name in RESULT_FIELDS}}
+
+    def evict(self, now=None):
+        now = time.time() if now is None else now
+        self.entries = {pair: e for pair, e in self.entries.items() if now - e['seen_at'] < self.max_age_seconds}
+
+    def save(self):
+        self.evict()
+        try:
+            atomic_write_json(self.path, {'config': self.config, 'entries': dict(sorted(self.entries.items()))},
+                              separators=(',', ':'))
+        except Exception as e:
+            print(f"❌ Gagal simpan cache evaluasi: {e}")
+
+
+def cached_score_batch(pairs, columns, price, sl_price, cfg, cache):
+    # Sama dengan scoring.score_batch, tapi hanya baris yang fingerprint-nya berubah
+    # yang dihitung. Tambahan 'reused': True untuk baris yang memakai hasil cache.
+    cache.bind(config_key(cfg))
+    fingerprints = input_fingerprints(columns)
+    entries = [cache.lookup(pair, fp) for pair, fp in zip(pairs, fingerprints)]
+    stale = np.array([entry is None for entry in entries], dtype=bool)
+    batch = {name: np.array([entry[name] if entry else 0 for entry in entries], dtype=np.int64)
+             for name in RESULT_FIELDS}
+    if stale.any():
+        d1, h4, h1 = ({field: values[stale] for field, values in col.items()} for col in columns)
+        fresh = scoring.score_batch(d1, h4, h1, price[stale], sl_price[stale], cfg)
+        for name in RESULT_FIELDS:
+            batch[name][stale] = fresh[name]
+        for i in np.flatnonzero(stale):
+            cache.store(pairs[i], fingerprints[i], {name: batch[name][i] for name in RESULT_FIELDS})
+    batch['reused'] = ~stale
+    return batch
@@ -0,0 +1,125 @@
+import atexit
+import json
+import sys
+import threading
+import time
+
+# ==========================================
+# LOG TERSTRUKTUR (BERLEVEL, BUFFER + THREAD PENULIS)
+# ==========================================
+# Satu event = level + nama event + field (pair, stage, nilai). emit() hanya
+# menaruh tuple ke buffer; thread penulis mengambil seluruh buffer sekaligus,
+# merender dan menulisnya dalam satu write, jadi loop scan tidak menunggu I/O
+# stdout. Format 'json' = satu objek JSON per baris (untuk dashboard / jq),
+# print() biasa dipindah ke stderr lewat claim_stdout(); format 'text' = baris
+# emoji seperti output lama. Template teks baru di-format di thread penulis,
+# dan hanya untuk event yang level-nya aktif.
+DEBUG, INFO, WARNING, ERROR = 10, 20, 30, 40
+LEVELS = {'debug': DEBUG, 'info': INFO, 'warning': WARNING, 'error': ERROR}
+LEVEL_NAMES = {value: name for name, value in LEVELS.items()}
+FORMATS = ('text', 'json')
+
+
+def parse_level(name):
+    try:
+        return LEVELS[name.lower()]
+    except KeyError:
+        raise ValueError(f"level log tidak dikenal: {name} (pilih {', '.join(LEVELS)})")
+
+
+class EventLog:
+    def __init__(self, level=INFO, fmt='text', stream=None):
+        if fmt not in FORMATS:
+            raise ValueError(f"format log tidak dikenal: {fmt} (pilih {', '.join(FORMATS)})")
+        self.level = level
+        self.fmt = fmt
+        self.stream = stream                  # None = sys.stdout saat menulis
+        self._cond = threading.Condition()
+        self._buffer = []
+        self._writing = 0
+        self._thread = None
+
+    def claim_stdout(self):
+        # Format json: stdout hanya berisi event supaya bisa di-parse per baris;
+        # print() biasa (banner, progres fetch, error) dialihkan ke stderr
+        if self.fmt != 'json' or self.stream is not None:
+            return
+        self.stream = sys.stdout
+        sys.stdout = sys.stderr
+
+    def enabled(self, level):
+        return level >= self.level
+
+    # ---------- emit (dipanggil dari loop scan) ----------
+    def emit(self, level, event, text=None, **fields):
+        # text: template str.format atas fields, atau callable(fields) -> str
+        if level < self.level:
+            return
+        with self._cond:
+            self._buffer.append((time.time(), level, event, text, fields))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='event-log', daemon=True)
+                self._thread.start()
+                atexit.register(self.flush)
+            self._cond.notify_all()
+
+    def debug(self, event, text=None, **fields):
+        self.emit(DEBUG, event, text, **fields)
+
+    def info(self, event, text=None, **fields):
+        self.emit(INFO, event, text, **fields)
+
+    def warning(self, event, text=None, **fields):
+        self.emit(WARNING, event, text, **fields)
+
+    def error(self, event, text=None, **fields):
+        self.emit(ERROR, event, text, **fields)
+
+    def flush(self, timeout=10.0):
+        # Tunggu semua event tertulis (akhir siklus / sebelum proses keluar)
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._buffer or self._writing:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    # ---------- thread penulis ----------
+    def render(self, record):
+        ts, level, event, text, fields = record
+        if self.fmt == 'json':
+            return json.dumps({'ts': round(ts, 3), 'level': LEVEL_NAMES[level], 'event': event, **fields},
+                              ensure_ascii=False, separators=(',', ':'), default=str)
+        if callable(text):
+            return text(fields)
+        if text is None:
+            return f"{event} " + " ".join(f"{key}={value}" for key, value in fields.items())
+        return text.format(**fields)
+
+    def _write(self, batch):
+        lines = []
+        for record in batch:
+            try:
+                lines.append(self.render(record))
+            except Exception as e:
+                lines.append(f"⚠️ Event log {record[2]} gagal dirender: {e}")
+        try:
+            stream = self.stream or sys.stdout
+            stream.write("\n".join(lines) + "\n")
+            stream.flush()
+        except Exception:
+            pass
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._buffer:
+                    self._cond.wait()
+                batch, self._buffer = self._buffer, []
+                self._writing = len(batch)
+            self._write(batch)
+            with self._cond:
+                self._writing = 0
+                self._cond.notify_all()
@@ -0,0 +1,276 @@
+import argparse
+import bisect
+import copy
+import json
+import math
+import time
+
+import crypto_signal_bot as bot
+from records import merge_position
+
+# ==========================================
+# MONITOR EXIT REAL-TIME (STREAM HARGA)
+# ==========================================
+# Proses terpisah yang berjalan terus: setiap tick harga (miniTicker Binance atau
+# file replay) dicek terhadap SL, break even & trailing dengan logika yang sama
+# persis seperti check_exit() (lewat bot.check_price_exit). Exit indikator 1H
+# tetap ditangani run terjadwal.
+#
+# Tiap posisi punya "band" harga (lo, hi) yang dijamin tidak mengubah state apa pun.
+# Band disimpan di list terurut per pair, jadi satu tick cukup bisect (O(log n))
+# dan hanya posisi yang band-nya dilewati yang dievaluasi ulang.
+BINANCE_WS_URL = "wss://stream.binance.com:9443/stream?streams="
+RELOAD_INTERVAL = 30      # Detik: cek perubahan active_buys.json dari run terjadwal
+SAVE_INTERVAL = 5         # Detik: update highest_price ditulis ke disk secara berkala
+WS_TIMEOUT = 5
+WS_RECONNECT_MAX = 60
+
+
+def price_levels(position, cfg):
+    # Semua harga tempat hasil check_price_exit() bisa berubah untuk posisi ini
+    entry_price = position.price
+    entry_atr = position.entry_atr
+    levels = [position.stop_loss, entry_price + cfg.atr_trail_activation * entry_atr]
+    if not position.break_even_active:
+        levels.append(entry_price + cfg.break_even_atr_multiplier * entry_atr)
+    if position.trailing_active:
+        highest_price = position.highest_price
+        levels.append(highest_price - cfg.atr_trail_distance * entry_atr)
+        # Harga == highest tidak mengubah apa-apa, baru berubah jika lebih tinggi
+        levels.append(math.nextafter(highest_price, math.inf))
+    return levels
+
+def price_band(position, price, cfg):
+    # Interval terbuka (lo, hi) di sekitar harga terakhir tanpa level di dalamnya.
+    # Tick dievaluasi ulang hanya jika harga <= lo atau >= hi.
+    levels = price_levels(position, cfg)
+    lo = max((level for level in levels if level < price), default=-math.inf)
+    hi = min((level for level in levels if level >= price), default=math.inf)
+    return lo, hi
+
+
+class ExitMonitor:
+    def __init__(self, cfg=None):
+        self.cfg = cfg or bot.STRATEGY
+        self.books = {}           # pair -> {'lower': [(lo, key)], 'upper': [(hi, key)]}
+        self.bands = {}           # key -> (pair, lo, hi)
+        self.dirty = False
+        self.stats = {'ticks': 0, 'evaluations': 0, 'exits': 0}
+        # Perubahan milik monitor ini, diterapkan ulang setiap kali file di disk
+        # diubah proses lain (run terjadwal / --daemon). Posisi dikenali dari waktu entry.
+        self.updated = {}         # pair -> salinan Position setelah diubah monitor
+        self.closed = {}          # pair -> waktu entry posisi yang ditutup monitor
+        self.cooldowns = {}       # pair -> Cooldown yang dibuat monitor
+
+    def rebuild(self):
+        self.books = {}
+        self.bands = {}
+        for pair in bot.ACTIVE_BUYS:
+            # Belum ada harga: band kosong supaya tick pertama selalu dievaluasi
+            self._index(pair, pair, math.inf, -math.inf)
+
+    def sync(self):
+        # Muat ulang state yang diubah proses lain lalu terapkan ulang perubahan monitor.
+        # Return True jika ada yang dimuat ulang (index band dibangun ulang).
+        positions_changed = bot.ACTIVE_BUYS_STORE.changed_on_disk()
+        cooldowns_changed = bot.COOLDOWNS_STORE.changed_on_disk()
+        if cooldowns_changed:
+            bot.load_cooldowns()
+            lost = [pair for pair, cooldown in self.cooldowns.items()
+                    if pair not in bot.COOLDOWNS or bot.COOLDOWNS[pair].until < cooldown.until]
+            for pair in lost:
+                bot.COOLDOWNS[pair] = self.cooldowns[pair]
+            if lost:
+                bot.save_cooldowns()
+        if not positions_changed:
+            return False
+        bot.load_active_buys()
+        for pair, entry_time in list(self.closed.items()):
+            position = bot.ACTIVE_BUYS.get(pair)
+            if position is None or position.time != entry_time:
+                # Sudah hilang dari disk (atau posisi baru): catatan tidak diperlukan lagi
+                del self.closed[pair]
+            else:
+                del bot.ACTIVE_BUYS[pair]
+                self.dirty = True
+        for pair, ours in list(self.updated.items()):
+            position = bot.ACTIVE_BUYS.get(pair)
+            if position is None or position.time != ours.time:
+                del self.updated[pair]
+                continue
+            before = copy.copy(position)
+            merge_position(position, ours)
+            self.dirty = self.dirty or position != before
+        self.rebuild()
+        return True
+
+    def pairs(self):
+        return sorted(self.books)
+
+    def _index(self, key, pair, lo, hi):
+        book = self.books.setdefault(pair, {'lower': [], 'upper': []})
+        bisect.insort(book['lower'], (lo, key))
+        bisect.insort(book['upper'], (hi, key))
+        self.bands[key] = (pair, lo, hi)
+
+    def _unindex(self, key):
+        pair, lo, hi = self.bands.pop(key)
+        book = self.books[pair]
+        book['lower'].remove((lo, key))
+        book['upper'].remove((hi, key))
+        if not book['lower']:
+            del self.books[pair]
+
+    def on_tick(self, pair, price):
+        book = self.books.get(pair)
+        if book is None:
+            return
+        self.stats['ticks'] += 1
+        lower, upper = book['lower'], book['upper']
+        touched = {key for _, key in lower[bisect.bisect_left(lower, (price,)):]}
+        touched.update(key for _, key in upper[:bisect.bisect_right(upper, (price, chr(0x10ffff)))])
+        for key in touched:
+            self._evaluate(key, pair, price)
+
+    def _evaluate(self, key, pair, price):
+        self.stats['evaluations'] += 1
+        self._unindex(key)
+        # Posisi bisa saja sudah ditutup/diubah run terjadwal: evaluasi selalu atas state terbaru
+        if self.sync() and key in self.bands:
+            self._unindex(key)
+        if key not in bot.ACTIVE_BUYS:
+            return
+        before = copy.copy(bot.ACTIVE_BUYS[key])
+        signal, details = bot.check_price_exit(key, price, self.cfg)
+        if signal:
+            print(f"⚡ {pair} @ {price:.6f}: {signal}")
+            if bot.handle_exit_signal(key, signal, details, price):
+                self.stats['exits'] += 1
+                self.closed[key] = before.time
+                self.updated.pop(key, None)
+                if key in bot.COOLDOWNS:
+                    self.cooldowns[key] = bot.COOLDOWNS[key]
+            return
+        if bot.ACTIVE_BUYS[key] != before:
+            self.updated[key] = copy.copy(bot.ACTIVE_BUYS[key])
+            self.dirty = True
+        self._index(key, pair, *price_band(bot.ACTIVE_BUYS[key], price, self.cfg))
+
+    def flush(self):
+        # Tidak pernah menimpa file dengan state basi: sinkronkan dulu, baru tulis
+        self.sync()
+        if self.dirty:
+            bot.save_active_buys()
+            self.dirty = False
+
+
+# ==========================================
+# SUMBER TICK
+# ==========================================
+def replay_ticks(path, speed=0.0):
+    # File JSON Lines berformat miniTicker Binance: {"s": "BTCUSDT", "c": "64000.1", "E": 1700000000000}
+    previous = None
+    with open(path, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            event = json.loads(line)
+            if speed > 0 and previous is not None:
+                time.sleep(max(event['E'] - previous, 0) / 1000 / speed)
+            previous = event['E']
+            yield event['s'], float(event['c'])
+
+def websocket_ticks(monitor):
+    # Combined stream miniTicker untuk semua pair yang punya posisi. Daftar stream
+    # dibangun ulang (reconnect) jika posisi berubah. Butuh paket websocket-client.
+    try:
+        import websocket
+    except ImportError:
+        raise SystemExit("❌ Mode stream butuh paket websocket-client (pip install websocket-client)")
+
+    delay = 1
+    while True:
+        pairs = monitor.pairs()
+        if not pairs:
+            yield None
+            time.sleep(WS_TIMEOUT)
+            continue
+        url = BINANCE_WS_URL + '/'.join(f"{pair.lower()}@miniTicker" for pair in pairs)
+        try:
+            conn = websocket.create_connection(url, timeout=WS_TIMEOUT)
+        except Exception as e:
+            print(f"⚠️ Gagal konek websocket: {e}. Coba lagi dalam {delay} detik.")
+            time.sleep(delay)
+            delay = min(delay * 2, WS_RECONNECT_MAX)
+            continue
+        print(f"🔌 Websocket tersambung ({len(pairs)} pair).")
+        delay = 1
+        try:
+            while monitor.pairs() == pairs:
+                try:
+                    message = json.loads(conn.recv())
+                except websocket.WebSocketTimeoutException:
+                    yield None
+                    continue
+                data = message.get('data', {})
+                if 's' in data and 'c' in data:
+                    yield data['s'], float(data['c'])
+        except Exception as e:
+            print(f"⚠️ Websocket terputus: {e}")
+        finally:
+            conn.close()
+
+
+# ==========================================
+# PROGRAM UTAMA
+# ==========================================
+def run(monitor, ticks, duration=None):
+    started = last_reload = last_save = time.time()
+    for tick in ticks:
+        if tick is not None:
+            monitor.on_tick(*tick)
+        now = time.time()
+        if now - last_save >= SAVE_INTERVAL:
+            monitor.flush()
+            last_save = now
+        if now - last_reload >= RELOAD_INTERVAL:
+            # Posisi baru/ditutup oleh run terjadwal
+            monitor.sync()
+            last_reload = now
+        if duration is not None and now - started >= duration:
+            break
+
+def main():
+    parser = argparse.ArgumentParser(description="Monitor SL/trailing real-time dari stream harga")
+    parser.add_argument('--replay', metavar='FILE', help="Putar ulang tick dari file JSONL (miniTicker)")
+    parser.add_argument('--speed', type=float, default=0.0,
+                        help="Kecepatan replay relatif waktu asli (0 = secepatnya)")
+    parser.add_argument('--duration', type=float, default=None, help="Berhenti setelah N detik")
+    args = parser.parse_args()
+    bot.LOG.claim_stdout()
+
+    bot.load_active_buys()
+    bot.load_cooldowns()
+    bot.migrate_trade_history()
+    bot.load_trade_stats()
+    bot.TELEGRAM.load()
+    bot.TELEGRAM.start()
+
+    monitor = ExitMonitor()
+    monitor.rebuild()
+    print(f"👁️ Monitor exit aktif untuk {len(monitor.pairs())} posisi.")
+    ticks = replay_ticks(args.replay, args.speed) if args.replay else websocket_ticks(monitor)
+    try:
+        run(monitor, ticks, args.duration)
+    except KeyboardInterrupt:
+        print("\n🛑 Monitor dihentikan.")
+    finally:
+        monitor.flush()
+        unsent = bot.TELEGRAM.close(bot.TELEGRAM_FLUSH_TIMEOUT)
+        stats = monitor.stats
+        print(f"📊 {stats['ticks']} tick | {stats['evaluations']} evaluasi | {stats['exits']} exit | "
+              f"📬 Telegram tertunda: {unsent}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+# ==========================================
+# ATURAN EXIT (TANPA ALERT / PENYIMPANAN)
+# ==========================================
+# Logika exit V4.1 atas satu Position. Posisi di-update di tempat (SL pindah ke
+# entry, harga tertinggi, status trailing); perubahan status yang perlu alert
+# dikembalikan sebagai event, jadi pemanggil yang memutuskan mengirim alert
+# (bot live) atau tidak (strategi shadow).
+EVENT_BREAK_EVEN = 'BREAK_EVEN'
+EVENT_ACTIVATE_TRAIL = 'ACTIVATE_TRAIL'
+
+
+def price_exit(position, current_price, cfg):
+    # SL, break even & trailing ATR. Return (sinyal atau None, detail, [event])
+    entry_price = position.price
+    entry_atr = position.entry_atr
+    profit_amount = current_price - entry_price
+    events = []
+
+    # 1. Stop Loss Tersentuh
+    if current_price <= position.stop_loss:
+        return "STOP_LOSS", f"SL tercapai (${position.stop_loss:.4f})", events
+
+    # 2. Break Even (Pindah SL ke Entry jika profit > 1x ATR)
+    if profit_amount >= (cfg.break_even_atr_multiplier * entry_atr) and not position.break_even_active:
+        position.stop_loss = entry_price
+        position.break_even_active = True
+        events.append(EVENT_BREAK_EVEN)
+
+    # 3. Aktivasi & Update Trailing Stop (Berdasarkan ATR)
+    if profit_amount >= (cfg.atr_trail_activation * entry_atr):
+        if current_price > position.highest_price:
+            position.highest_price = current_price
+        if not position.trailing_active:
+            position.trailing_active = True
+            events.append(EVENT_ACTIVATE_TRAIL)
+
+        # Batas Trailing: 1.5x ATR dari harga tertinggi
+        trailing_limit = position.highest_price - (cfg.atr_trail_distance * entry_atr)
+        if current_price <= trailing_limit:
+            return "TRAILING_STOP", f"Trailing Stop ATR tersentuh di ${trailing_limit:.4f}", events
+
+    return None, "", events
+
+def indicator_exit(position, current_price, data_1h):
+    # 4. Exit Indikator Pembalikan Arah (1H)
+    profit_pct = position.profit_pct(current_price)
+    ema_cross_down = data_1h.ema10 < data_1h.ema20
+    macd_bearish = data_1h.macd < data_1h.macd_signal
+
+    if ema_cross_down and macd_bearish:
+        if profit_pct > 1 or profit_pct < -1:
+            return "SELL_EMA_MACD", f"EMA10 < EMA20 & MACD Bearish"
+
+    if current_price < data_1h.ema20:
+        if profit_pct > 0 or profit_pct < -2:
+            return "SELL_CLOSE_EMA", f"Close < EMA20 (1H)"
+
+    return None, "Hold"
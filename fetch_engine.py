@@ -0,0 +1,164 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+# ==========================================
+# FETCH ENGINE: KONKURENSI + RATE LIMIT + RETRY
+# ==========================================
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class FetchError(Exception):
+    def __init__(self, message, status=None, retry_after=None, retryable=None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+        if retryable is None:
+            retryable = status in RETRYABLE_STATUS
+        self.retryable = retryable
+
+
+class CircuitOpenError(FetchError):
+    pass
+
+
+class TokenBucket:
+    # Token diisi ulang sebesar `rate` per detik, maksimum `capacity` (burst)
+    def __init__(self, rate, capacity):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class CircuitBreaker:
+    # CLOSED -> OPEN setelah `threshold` kegagalan beruntun,
+    # OPEN -> HALF_OPEN setelah `cooldown` detik (1 request percobaan).
+    def __init__(self, threshold, cooldown):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.trial_running = False
+        self.lock = threading.Lock()
+
+    def allow(self):
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at < self.cooldown or self.trial_running:
+                return False
+            self.trial_running = True
+            return True
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_running = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.trial_running = False
+            if self.opened_at is not None or self.failures >= self.threshold:
+                opened = self.opened_at is None
+                self.opened_at = time.monotonic()
+                return opened
+            return False
+
+
+class FetchEngine:
+    def __init__(self, max_workers=4, rate=2.0, burst=4, max_retries=4,
+                 backoff_base=1.0, backoff_max=30.0,
+                 breaker_threshold=5, breaker_cooldown=60.0):
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown = breaker_cooldown
+        self.bucket = TokenBucket(rate, burst)
+        self.breakers = {}
+        self.lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        with self.lock:
+            self.stats = {'requests': 0, 'retries': 0, 'failures': 0, 'circuit_open': 0}
+
+    def _count(self, key):
+        with self.lock:
+            self.stats[key] += 1
+
+    def _breaker(self, host):
+        with self.lock:
+            if host not in self.breakers:
+                self.breakers[host] = CircuitBreaker(self.breaker_threshold, self.breaker_cooldown)
+            return self.breakers[host]
+
+    def _backoff(self, attempt, retry_after=None):
+        # Exponential backoff dengan full jitter; Retry-After dari server dihormati
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+        if retry_after:
+            delay = max(delay, float(retry_after))
+        return delay
+
+    def call(self, host, fn):
+        breaker = self._breaker(host)
+        attempt = 0
+        while True:
+            if not breaker.allow():
+                self._count('failures')
+                raise CircuitOpenError(f"Circuit breaker terbuka untuk {host}")
+
+            self.bucket.acquire()
+            self._count('requests')
+            try:
+                result = fn()
+            except Exception as e:
+                if not isinstance(e, FetchError):
+                    network_error = isinstance(e, (requests.ConnectionError, requests.Timeout))
+                    e = FetchError(str(e), retryable=network_error)
+                if not e.retryable:
+                    # Host merespons (mis. simbol tidak valid), bukan gangguan server
+                    breaker.record_success()
+                elif breaker.record_failure():
+                    self._count('circuit_open')
+                if not e.retryable or attempt >= self.max_retries:
+                    self._count('failures')
+                    raise e
+                self._count('retries')
+                time.sleep(self._backoff(attempt, e.retry_after))
+                attempt += 1
+                continue
+            breaker.record_success()
+            return result
+
+    def map(self, tasks):
+        # tasks: {key: (host, fn)} -> {key: hasil atau Exception}
+        results = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = {key: pool.submit(self.call, host, fn) for key, (host, fn) in tasks.items()}
+            for key, future in futures.items():
+                try:
+                    results[key] = future.result()
+                except Exception as e:
+                    results[key] = e
+        return results
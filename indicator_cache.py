@@ -0,0 +1,82 @@
+import json
+import os
+import time
+
+from state_store import atomic_write_json
+
+# ==========================================
+# CACHE INDIKATOR PER CANDLE (PERSISTEN)
+# ==========================================
+# Candle Binance selalu sejajar dengan epoch UTC, jadi waktu buka candle
+# cukup dihitung dari floor(timestamp / durasi).
+INTERVAL_SECONDS = {
+    '1m': 60, '5m': 300, '15m': 900, '30m': 1800,
+    '1h': 3600, '2h': 7200, '4h': 14400, '1d': 86400, '1W': 604800,
+}
+
+
+def candle_open_time(interval, now=None):
+    seconds = INTERVAL_SECONDS[interval]
+    now = time.time() if now is None else now
+    if interval == '1W':
+        # Candle mingguan dibuka Senin 00:00 UTC (epoch 0 = Kamis)
+        return int((now - 4 * 86400) // seconds * seconds + 4 * 86400)
+    return int(now // seconds * seconds)
+
+
+class IndicatorCache:
+    def __init__(self, path, max_entries=2000):
+        self.path = path
+        self.max_entries = max_entries
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(pair, interval, open_time):
+        return f"{pair}|{interval}|{open_time}"
+
+    def load(self):
+        self.entries = {}
+        self.hits = self.misses = 0
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r') as f:
+                self.entries = json.load(f)
+        except Exception as e:
+            print(f"⚠️ Cache indikator tidak bisa dibaca, mulai kosong: {e}")
+            self.entries = {}
+
+    def get(self, pair, interval, now=None):
+        now = time.time() if now is None else now
+        entry = self.entries.get(self.key(pair, interval, candle_open_time(interval, now)))
+        if entry and now < entry['expires_at']:
+            self.hits += 1
+            return entry['data']
+        self.misses += 1
+        return None
+
+    def put(self, pair, interval, data, now=None):
+        now = time.time() if now is None else now
+        open_time = candle_open_time(interval, now)
+        self.entries[self.key(pair, interval, open_time)] = {
+            'data': data,
+            'fetched_at': int(now),
+            # Kedaluwarsa tepat saat candle ditutup
+            'expires_at': open_time + INTERVAL_SECONDS[interval],
+        }
+
+    def evict(self, now=None):
+        now = time.time() if now is None else now
+        self.entries = {k: v for k, v in self.entries.items() if v['expires_at'] > now}
+        if len(self.entries) > self.max_entries:
+            newest = sorted(self.entries.items(), key=lambda kv: kv[1]['fetched_at'], reverse=True)
+            self.entries = dict(newest[:self.max_entries])
+
+    def save(self):
+        self.evict()
+        try:
+            atomic_write_json(self.path, self.entries, separators=(',', ':'))
+        except Exception as e:
+            print(f"❌ Gagal simpan cache indikator: {e}")
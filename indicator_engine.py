@@ -0,0 +1,248 @@
+import numpy as np
+
+from records import INDICATOR_FIELDS
+
+# ==========================================
+# INDICATOR ENGINE NATIVE (NUMPY, MULTI-SIMBOL)
+# ==========================================
+# Semua state berbentuk array (n_simbol,), satu candle diproses untuk semua
+# simbol sekaligus. Nilai NaN pada input berarti simbol tersebut tidak punya
+# candle di kolom waktu itu (belum listing / sudah diproses sebelumnya) dan
+# state-nya dibiarkan apa adanya.
+#
+# Definisi mengikuti Pine Script TradingView: ta.ema / ta.rma diawali SMA dari
+# `period` nilai pertama, RSI & ATR & ADX memakai smoothing Wilder (RMA).
+EMA_PERIODS = (10, 20, 50, 200)
+MACD_FAST, MACD_SLOW, MACD_SIGNAL = 12, 26, 9
+RSI_PERIOD = 14
+ATR_PERIOD = 14
+ADX_PERIOD = 14
+VOLUME_AVG_PERIOD = 20
+
+
+class Smoother:
+    # EMA (alpha = 2/(n+1)) atau RMA/Wilder (alpha = 1/n), diawali SMA
+    def __init__(self, n_symbols, period, wilder=False):
+        self.period = period
+        self.alpha = 1.0 / period if wilder else 2.0 / (period + 1)
+        self.value = np.full(n_symbols, np.nan)
+        self.seed = np.zeros(n_symbols)
+        self.count = np.zeros(n_symbols, dtype=np.int64)
+
+    def update(self, x):
+        valid = ~np.isnan(x)
+        self.count += valid
+        seeding = valid & (self.count <= self.period)
+        self.seed[seeding] += x[seeding]
+        seeded = valid & (self.count == self.period)
+        self.value[seeded] = self.seed[seeded] / self.period
+        running = valid & (self.count > self.period)
+        self.value[running] = self.alpha * x[running] + (1 - self.alpha) * self.value[running]
+        return self.value
+
+    def state(self, prefix):
+        return {f"{prefix}.value": self.value, f"{prefix}.seed": self.seed, f"{prefix}.count": self.count}
+
+    def restore(self, prefix, state):
+        self.value = np.array(state[f"{prefix}.value"], dtype=float)
+        self.seed = np.array(state[f"{prefix}.seed"], dtype=float)
+        self.count = np.array(state[f"{prefix}.count"], dtype=np.int64)
+
+
+class IndicatorEngine:
+    def __init__(self, symbols):
+        self.symbols = list(symbols)
+        n = len(self.symbols)
+        self.last_time = np.full(n, -1, dtype=np.int64)   # open time candle tertutup terakhir (ms)
+        self.prev_close = np.full(n, np.nan)
+        self.prev_high = np.full(n, np.nan)
+        self.prev_low = np.full(n, np.nan)
+        self.close = np.full(n, np.nan)
+        self.volume = np.full(n, np.nan)
+
+        self.emas = {p: Smoother(n, p) for p in EMA_PERIODS}
+        self.macd_fast = Smoother(n, MACD_FAST)
+        self.macd_slow = Smoother(n, MACD_SLOW)
+        self.macd_signal = Smoother(n, MACD_SIGNAL)
+        self.rsi_up = Smoother(n, RSI_PERIOD, wilder=True)
+        self.rsi_down = Smoother(n, RSI_PERIOD, wilder=True)
+        self.atr = Smoother(n, ATR_PERIOD, wilder=True)
+        self.adx_tr = Smoother(n, ADX_PERIOD, wilder=True)
+        self.adx_plus = Smoother(n, ADX_PERIOD, wilder=True)
+        self.adx_minus = Smoother(n, ADX_PERIOD, wilder=True)
+        self.adx = Smoother(n, ADX_PERIOD, wilder=True)
+
+        # Ring buffer volume untuk SMA volume O(1) per candle
+        self.vol_ring = np.zeros((n, VOLUME_AVG_PERIOD))
+        self.vol_pos = np.zeros(n, dtype=np.int64)
+        self.vol_count = np.zeros(n, dtype=np.int64)
+        self.vol_sum = np.zeros(n)
+
+    def _smoothers(self):
+        named = {f"ema{p}": s for p, s in self.emas.items()}
+        named.update({
+            'macd_fast': self.macd_fast, 'macd_slow': self.macd_slow, 'macd_signal': self.macd_signal,
+            'rsi_up': self.rsi_up, 'rsi_down': self.rsi_down, 'atr': self.atr,
+            'adx_tr': self.adx_tr, 'adx_plus': self.adx_plus, 'adx_minus': self.adx_minus, 'adx': self.adx,
+        })
+        return named
+
+    # ------------------------------------------
+    # Update satu candle (array 1-D per field, panjang n_simbol)
+    # ------------------------------------------
+    def update(self, high, low, close, volume, open_time=None):
+        valid = ~np.isnan(close)
+
+        for smoother in self.emas.values():
+            smoother.update(close)
+
+        fast = self.macd_fast.update(close)
+        slow = self.macd_slow.update(close)
+        self.macd_signal.update(np.where(valid, fast - slow, np.nan))
+
+        change = close - self.prev_close
+        has_prev = valid & ~np.isnan(self.prev_close)
+        self.rsi_up.update(np.where(has_prev, np.maximum(change, 0), np.nan))
+        self.rsi_down.update(np.where(has_prev, np.maximum(-change, 0), np.nan))
+
+        tr = np.where(
+            has_prev,
+            np.fmax(high - low, np.fmax(np.abs(high - self.prev_close), np.abs(low - self.prev_close))),
+            high - low,
+        )
+        self.atr.update(tr)
+
+        up_move = high - self.prev_high
+        down_move = self.prev_low - low
+        plus_dm = np.where((up_move > down_move) & (up_move > 0), up_move, 0.0)
+        minus_dm = np.where((down_move > up_move) & (down_move > 0), down_move, 0.0)
+        truerange = self.adx_tr.update(np.where(has_prev, tr, np.nan))
+        plus_rma = self.adx_plus.update(np.where(has_prev, plus_dm, np.nan))
+        minus_rma = self.adx_minus.update(np.where(has_prev, minus_dm, np.nan))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            plus_di = 100 * plus_rma / truerange
+            minus_di = 100 * minus_rma / truerange
+            di_sum = plus_di + minus_di
+            dx = np.abs(plus_di - minus_di) / np.where(di_sum == 0, 1, di_sum)
+        self.adx.update(np.where(has_prev & ~np.isnan(dx), dx, np.nan))
+
+        rows = np.flatnonzero(valid)
+        pos = self.vol_pos[rows]
+        self.vol_sum[rows] += volume[rows] - self.vol_ring[rows, pos]
+        self.vol_ring[rows, pos] = volume[rows]
+        self.vol_pos[rows] = (pos + 1) % VOLUME_AVG_PERIOD
+        self.vol_count[rows] = np.minimum(self.vol_count[rows] + 1, VOLUME_AVG_PERIOD)
+
+        self.prev_close = np.where(valid, close, self.prev_close)
+        self.prev_high = np.where(valid, high, self.prev_high)
+        self.prev_low = np.where(valid, low, self.prev_low)
+        self.close = np.where(valid, close, self.close)
+        self.volume = np.where(valid, volume, self.volume)
+        if open_time is not None:
+            self.last_time = np.where(valid, open_time, self.last_time)
+
+    def values(self):
+        # Nilai terkini per field, masing-masing array (n_simbol,)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            up, down = self.rsi_up.value, self.rsi_down.value
+            rsi = np.where(down == 0, 100.0, np.where(up == 0, 0.0, 100 - 100 / (1 + up / down)))
+            average_volume = np.where(self.vol_count > 0, self.vol_sum / np.maximum(self.vol_count, 1), np.nan)
+        return {
+            'close': self.close,
+            'ema10': self.emas[10].value, 'ema20': self.emas[20].value,
+            'ema50': self.emas[50].value, 'ema200': self.emas[200].value,
+            'macd': self.macd_fast.value - self.macd_slow.value,
+            'macd_signal': self.macd_signal.value,
+            'rsi': rsi,
+            'adx': 100 * self.adx.value,
+            'atr': self.atr.value,
+            'volume': self.volume,
+            'average_volume': average_volume,
+        }
+
+    # ------------------------------------------
+    # Batch: array 2-D (n_simbol, n_candle)
+    # ------------------------------------------
+    def run(self, high, low, close, volume, open_times=None, keep_history=False):
+        high, low, close, volume = (np.asarray(a, dtype=float) for a in (high, low, close, volume))
+        history = {field: np.full(close.shape, np.nan) for field in INDICATOR_FIELDS} if keep_history else None
+        for t in range(close.shape[1]):
+            self.update(high[:, t], low[:, t], close[:, t], volume[:, t],
+                        None if open_times is None else open_times[t])
+            if keep_history:
+                for field, value in self.values().items():
+                    history[field][:, t] = value
+        return history
+
+    def preview(self, high, low, close, volume):
+        # Nilai dengan candle yang masih berjalan, tanpa mengubah state tersimpan
+        clone = self.copy()
+        clone.update(high, low, close, volume)
+        return clone.values()
+
+    def copy(self):
+        clone = IndicatorEngine(self.symbols)
+        clone.restore(self.state())
+        return clone
+
+    # ------------------------------------------
+    # Persistensi state (np.savez)
+    # ------------------------------------------
+    def state(self):
+        state = {
+            'symbols': np.array(self.symbols), 'last_time': self.last_time,
+            'prev_close': self.prev_close, 'prev_high': self.prev_high, 'prev_low': self.prev_low,
+            'close': self.close, 'volume': self.volume,
+            'vol_ring': self.vol_ring, 'vol_pos': self.vol_pos,
+            'vol_count': self.vol_count, 'vol_sum': self.vol_sum,
+        }
+        for name, smoother in self._smoothers().items():
+            state.update(smoother.state(name))
+        return {k: np.array(v, copy=True) for k, v in state.items()}
+
+    def restore(self, state):
+        for key in ('last_time', 'vol_pos', 'vol_count'):
+            setattr(self, key, np.array(state[key], dtype=np.int64))
+        for key in ('prev_close', 'prev_high', 'prev_low', 'close', 'volume', 'vol_ring', 'vol_sum'):
+            setattr(self, key, np.array(state[key], dtype=float))
+        for name, smoother in self._smoothers().items():
+            smoother.restore(name, state)
+
+    def save(self, path):
+        np.savez(path, **self.state())
+
+    @classmethod
+    def load(cls, path, symbols):
+        # Simbol baru mendapat state kosong, simbol yang tidak dipakai dibuang
+        engine = cls(symbols)
+        if not engine.symbols:
+            return engine
+        with np.load(path) as saved:
+            # Setiap akses saved[key] membaca ulang array dari file: baca sekali per key
+            index = {str(s): i for i, s in enumerate(saved['symbols'])}
+            if not index:
+                return engine
+            rows = np.array([index.get(s, -1) for s in engine.symbols], dtype=np.int64)
+            missing = rows < 0
+            merged = {}
+            for key, blank in engine.state().items():
+                if key == 'symbols':
+                    continue
+                merged[key] = np.asarray(saved[key])[np.maximum(rows, 0)]
+                merged[key][missing] = blank[missing]
+        engine.restore(merged)
+        return engine
+
+
+def snapshot_dicts(symbols, values):
+    # Bentuk hasil sama dengan extract_indicators(): NaN -> 0 (RSI -> 50)
+    result = {}
+    for i, symbol in enumerate(symbols):
+        data = {}
+        for field in INDICATOR_FIELDS:
+            value = float(values[field][i])
+            if np.isnan(value):
+                value = 50.0 if field == 'rsi' else 0.0
+            data[field] = value
+        result[symbol] = data
+    return result
@@ -0,0 +1,105 @@
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+from state_store import atomic_write_json, atomic_write_text
+
+# ==========================================
+# INSTRUMENTASI PER TAHAP
+# ==========================================
+# Setiap tahap (fetch per timeframe, extract, score, exit check, notify, persist)
+# mencatat durasi per panggilan (opsional per pair). Di akhir siklus ringkasan
+# p50/p95/max ditulis sebagai Prometheus text exposition dan JSON.
+METRICS_PREFIX = 'crypto_bot'
+SLOWEST_PAIRS = 3
+
+
+def percentile(sorted_values, q):
+    # Nearest-rank percentile dari list yang sudah diurutkan
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(q * len(sorted_values)) - 1, 0)
+    return sorted_values[rank]
+
+
+class Metrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.samples = {}     # stage -> [(detik, pair)]
+            self.counters = {}    # nama -> nilai
+            self.started_at = time.time()
+
+    def observe(self, stage, seconds, pair=None):
+        with self.lock:
+            self.samples.setdefault(stage, []).append((seconds, pair))
+
+    def incr(self, name, value=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def set(self, name, value):
+        with self.lock:
+            self.counters[name] = value
+
+    @contextmanager
+    def timer(self, stage, pair=None):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started, pair)
+
+    def summary(self):
+        with self.lock:
+            samples = {stage: list(values) for stage, values in self.samples.items()}
+            counters = dict(self.counters)
+        stages = {}
+        for stage, values in sorted(samples.items()):
+            durations = sorted(seconds for seconds, _ in values)
+            slowest = sorted((v for v in values if v[1] is not None), key=lambda v: v[0], reverse=True)
+            stages[stage] = {
+                'count': len(durations),
+                'total': sum(durations),
+                'p50': percentile(durations, 0.50),
+                'p95': percentile(durations, 0.95),
+                'max': durations[-1],
+                'slowest': [{'pair': pair, 'seconds': seconds} for seconds, pair in slowest[:SLOWEST_PAIRS]],
+            }
+        return {'started_at': self.started_at, 'stages': stages, 'counters': counters}
+
+    def to_prometheus(self, summary=None):
+        summary = summary or self.summary()
+        name = f"{METRICS_PREFIX}_stage_seconds"
+        lines = [
+            f"# HELP {name} Durasi per panggilan tiap tahap siklus (detik).",
+            f"# TYPE {name} summary",
+        ]
+        for stage, s in summary['stages'].items():
+            for q, key in (('0.5', 'p50'), ('0.95', 'p95')):
+                lines.append(f'{name}{{stage="{stage}",quantile="{q}"}} {s[key]:.6f}')
+            lines.append(f'{name}_sum{{stage="{stage}"}} {s["total"]:.6f}')
+            lines.append(f'{name}_count{{stage="{stage}"}} {s["count"]}')
+        lines.append(f"# HELP {name}_max Durasi terlama per tahap pada siklus terakhir (detik).")
+        lines.append(f"# TYPE {name}_max gauge")
+        for stage, s in summary['stages'].items():
+            lines.append(f'{name}_max{{stage="{stage}"}} {s["max"]:.6f}')
+        for counter, value in sorted(summary['counters'].items()):
+            # Konvensi Prometheus: akhiran _total = counter yang hanya naik selama proses hidup,
+            # nilai per siklus (di-reset tiap siklus) diekspor sebagai gauge tanpa akhiran itu
+            metric = f"{METRICS_PREFIX}_{counter}"
+            lines.append(f"# TYPE {metric} {'counter' if counter.endswith('_total') else 'gauge'}")
+            lines.append(f"{metric} {value}")
+        lines.append(f"# TYPE {METRICS_PREFIX}_cycle_started_timestamp_seconds gauge")
+        lines.append(f"{METRICS_PREFIX}_cycle_started_timestamp_seconds {summary['started_at']:.0f}")
+        return '\n'.join(lines) + '\n'
+
+    def write(self, prometheus_path, json_path):
+        summary = self.summary()
+        atomic_write_text(prometheus_path, self.to_prometheus(summary))
+        atomic_write_json(json_path, summary, indent=2)
+        return summary
@@ -0,0 +1,197 @@
+import json
+import os
+import threading
+import time
+import uuid
+
+import requests
+
+from state_store import atomic_write_json
+
+# ==========================================
+# OUTBOX TELEGRAM (ASINKRON & PERSISTEN)
+# ==========================================
+# Pesan masuk ke outbox di disk lalu dikirim oleh satu thread latar lewat
+# requests.Session (koneksi dipakai ulang). Loop scan tidak pernah menunggu
+# Telegram; pesan yang belum terkirim saat run selesai dicoba lagi di run berikutnya.
+TELEGRAM_API_URL = "https://api.telegram.org/bot{token}/sendMessage"
+TELEGRAM_MAX_LENGTH = 4096
+DIGEST_SEPARATOR = "\n━━━━━━━━━━━━━━━━━━━━\n"
+
+
+class TelegramOutbox:
+    def __init__(self, path, token, chat_id, session=None, digest=False, timeout=10,
+                 max_attempts=20, max_age_hours=48, backoff_base=1.0, backoff_max=30.0, metrics=None):
+        self.path = path
+        self.url = TELEGRAM_API_URL.format(token=token)
+        self.chat_id = chat_id
+        self.session = session or requests.Session()
+        self.digest = digest
+        self.timeout = timeout
+        self.max_attempts = max_attempts          # Total percobaan lintas run sebelum pesan dibuang
+        self.max_age = max_age_hours * 3600       # Pesan yang terlalu basi tidak dikirim lagi
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.metrics = metrics                    # Opsional: durasi tiap POST dicatat sebagai tahap telegram_send
+        self.pending = []
+        self.digest_buffer = []
+        self.blocked_until = 0.0                  # Diisi dari retry_after saat kena 429
+        self.stats = {'sent': 0, 'failed': 0, 'dropped': 0, 'rate_limited': 0}
+        self._cond = threading.Condition()
+        self._stopping = False
+        self._deadline = None
+        self._thread = None
+        self._dirty = False                       # Ada pesan baru yang belum ditulis ke disk
+
+    # ---------- persistensi ----------
+    def load(self):
+        self.pending = []
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r') as f:
+                self.pending = json.load(f)
+        except Exception as e:
+            print(f"⚠️ Outbox Telegram tidak bisa dibaca, mulai kosong: {e}")
+            self.pending = []
+        self._dirty = False
+        if self.pending:
+            print(f"📬 {len(self.pending)} pesan Telegram tertunda dari run sebelumnya akan dikirim ulang.")
+
+    def _persist(self):
+        try:
+            atomic_write_json(self.path, self.pending, indent=1)
+            self._dirty = False
+        except Exception as e:
+            print(f"❌ Gagal simpan outbox Telegram: {e}")
+
+    # ---------- antrean ----------
+    def start(self):
+        with self._cond:
+            if self._thread is not None:
+                # Thread lama masih mengirim (close() habis waktu): dipakai lagi,
+                # jangan sampai ada dua pengirim untuk antrean yang sama
+                self._stopping = False
+                self._deadline = None
+                return
+            self._thread = threading.Thread(target=self._run, name='telegram-outbox', daemon=True)
+            self._thread.start()
+
+    def enqueue(self, text, kind='ALERT'):
+        if self.digest and not kind.startswith('REKAP_'):
+            # Mode digest: semua alert satu siklus digabung saat close()
+            self.digest_buffer.append(text)
+            return
+        self._push(text, kind)
+
+    def _push(self, text, kind):
+        # Ditulis ke disk oleh thread pengirim (sekali untuk beberapa pesan sekaligus)
+        # atau saat close(), bukan per pesan di loop scan
+        with self._cond:
+            self.pending.append({
+                'id': uuid.uuid4().hex, 'kind': kind, 'text': text,
+                'created_at': time.time(), 'attempts': 0,
+            })
+            self._dirty = True
+            self._cond.notify()
+
+    def flush_digest(self):
+        if not self.digest_buffer:
+            return
+        header = f"🗞️ *DIGEST SIKLUS* ({len(self.digest_buffer)} alert)\n"
+        chunk = header
+        for text in self.digest_buffer:
+            piece = text if chunk == header else DIGEST_SEPARATOR + text
+            if len(chunk) + len(piece) > TELEGRAM_MAX_LENGTH and chunk != header:
+                self._push(chunk, 'DIGEST')
+                chunk, piece = header, text
+            chunk += piece
+        self._push(chunk, 'DIGEST')
+        self.digest_buffer = []
+
+    def close(self, timeout=30):
+        # Tunggu antrean habis maksimal `timeout` detik; sisanya tetap di disk
+        self.flush_digest()
+        self.start()
+        with self._cond:
+            self._stopping = True
+            self._deadline = time.time() + timeout
+            thread = self._thread
+            self._cond.notify()
+        thread.join(timeout + self.timeout + 1)
+        with self._cond:
+            self._persist()
+            # Thread yang masih tertahan di POST tetap dicatat (berhenti sendiri setelah
+            # deadline) supaya start() berikutnya tidak membuat pengirim kedua
+            if self._thread is None:
+                self._stopping = False
+                self._deadline = None
+        return len(self.pending)
+
+    # ---------- pengiriman ----------
+    def _run(self):
+        failures = 0
+        while True:
+            with self._cond:
+                while not self.pending and not self._stopping:
+                    self._cond.wait()
+                if self._dirty:
+                    self._persist()
+                wait = max(self.blocked_until - time.time(), 0)
+                if not self.pending or (self._deadline is not None and time.time() + wait > self._deadline):
+                    # Selesai: outbox bisa dipakai lagi (start) setelah close, mis. main() dipanggil berulang
+                    self._thread = None
+                    return
+                if wait > 0:
+                    self._cond.wait(wait)
+                    continue
+                message = self.pending[0]
+
+            outcome, retry_after = self._send(message)
+
+            with self._cond:
+                if outcome == 'sent':
+                    failures = 0
+                    self.stats['sent'] += 1
+                    self.pending.remove(message)
+                elif outcome == 'rate_limited':
+                    self.stats['rate_limited'] += 1
+                    self.blocked_until = time.time() + retry_after
+                    print(f"⏳ Telegram 429, tunggu {retry_after:.0f} detik.")
+                else:
+                    failures += 1
+                    message['attempts'] += 1
+                    self.stats['failed'] += 1
+                    age = time.time() - message['created_at']
+                    if outcome == 'rejected' or message['attempts'] >= self.max_attempts or age > self.max_age:
+                        print(f"🗑️ Pesan Telegram {message['kind']} dibuang setelah {message['attempts']} percobaan.")
+                        self.stats['dropped'] += 1
+                        self.pending.remove(message)
+                    else:
+                        self.blocked_until = time.time() + min(self.backoff_max, self.backoff_base * (2 ** (failures - 1)))
+                self._persist()
+
+    def _send(self, message):
+        started = time.perf_counter()
+        try:
+            response = self.session.post(self.url, json={
+                'chat_id': self.chat_id, 'text': message['text'],
+                'parse_mode': 'Markdown', 'disable_web_page_preview': True
+            }, timeout=self.timeout)
+        except requests.RequestException as e:
+            print(f"❌ Gagal kirim Telegram: {e}")
+            return 'error', 0
+        finally:
+            if self.metrics is not None:
+                self.metrics.observe('telegram_send', time.perf_counter() - started)
+        if response.status_code == 200:
+            return 'sent', 0
+        try:
+            body = response.json()
+        except ValueError:
+            body = {}
+        if response.status_code == 429:
+            return 'rate_limited', float(body.get('parameters', {}).get('retry_after', 1))
+        print(f"❌ Telegram HTTP {response.status_code}: {body.get('description', '')}")
+        # 4xx selain 429 (mis. Markdown tidak valid) tidak akan berhasil walau diulang
+        return ('rejected' if 400 <= response.status_code < 500 else 'error'), 0
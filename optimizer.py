@@ -0,0 +1,122 @@
+import argparse
+import itertools
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict, replace
+
+import numpy as np
+
+import crypto_signal_bot as bot
+import backtest
+
+# ==========================================
+# PARAMETER SWEEP (GRID / RANDOM SEARCH)
+# ==========================================
+# Setiap worker membuka fitur backtest lewat np.load(mmap_mode='r'), jadi data
+# harga dibagi lewat page cache OS tanpa disalin ke tiap proses.
+OPTIMIZER_OUTPUT_FILE = 'optimizer_results.json'
+SEARCH_SPACE = {
+    'atr_sl_multiplier': [1.0, 1.5, 2.0, 2.5, 3.0],
+    'atr_trail_activation': [1.5, 2.0, 3.0],
+    'atr_trail_distance': [1.0, 1.5, 2.0],
+    'break_even_atr_multiplier': [0.5, 1.0, 1.5],
+    'score_buy': [70, 75, 80, 85],
+    'rsi_overbought_veto': [70, 75, 80],
+}
+SORT_KEYS = ('total_pnl', 'win_rate', 'max_drawdown', 'trades')
+
+_WORKER_DATA = {}
+
+
+def _init_worker(data_dir):
+    _WORKER_DATA['features'] = backtest.load_features(data_dir, mmap_mode='r')
+
+def _evaluate(params):
+    symbols, times, features = _WORKER_DATA['features']
+    cfg = replace(bot.STRATEGY, **params)
+    trades, _ = backtest.simulate(symbols, times, features, cfg)
+    return params, compute_metrics(trades)
+
+def compute_metrics(trades):
+    summary = bot.summarize_trades(trades)
+    ordered = sorted(trades, key=lambda t: t['exit_date'])
+    equity = np.concatenate([[0.0], np.cumsum([t['profit_pct'] for t in ordered])])
+    drawdown = float(np.max(np.maximum.accumulate(equity) - equity))
+    return {
+        'trades': summary['total_trades'],
+        'win_rate': summary['win_rate'],
+        'total_pnl': summary['total_profit'],
+        'avg_pnl': summary['avg_profit'],
+        'max_drawdown': drawdown,
+    }
+
+def build_configs(space, samples=None, seed=0):
+    names = list(space)
+    grid = [dict(zip(names, values)) for values in itertools.product(*(space[n] for n in names))]
+    if samples is None or samples >= len(grid):
+        return grid
+    return random.Random(seed).sample(grid, samples)
+
+def parse_space(overrides):
+    space = dict(SEARCH_SPACE)
+    valid = set(asdict(bot.STRATEGY))
+    for item in overrides or []:
+        name, _, values = item.partition('=')
+        if name not in valid:
+            raise SystemExit(f"❌ Parameter tidak dikenal: {name} (pilihan: {', '.join(sorted(valid))})")
+        kind = type(getattr(bot.STRATEGY, name))
+        space[name] = [kind(v) for v in values.split(',')]
+    return space
+
+def run_sweep(configs, data_dir, workers):
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(data_dir,)) as pool:
+        futures = [pool.submit(_evaluate, params) for params in configs]
+        for done, future in enumerate(as_completed(futures), start=1):
+            params, metrics = future.result()
+            results.append({'params': params, **metrics})
+            if done % max(1, len(configs) // 20) == 0 or done == len(configs):
+                print(f"  ⏳ {done}/{len(configs)} konfigurasi selesai")
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep parameter strategi di atas data backtest")
+    parser.add_argument('--data-dir', default=backtest.HISTORY_DIR)
+    parser.add_argument('--param', action='append', metavar='NAMA=v1,v2',
+                        help="Ganti nilai yang dicoba untuk satu parameter StrategyConfig")
+    parser.add_argument('--random', type=int, default=None, metavar='N', help="Random search N konfigurasi")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--sort', choices=SORT_KEYS, default='total_pnl')
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--output', default=OPTIMIZER_OUTPUT_FILE)
+    args = parser.parse_args()
+
+    if not os.path.exists(os.path.join(args.data_dir, 'features')):
+        backtest.build_features(args.data_dir)
+
+    configs = build_configs(parse_space(args.param), args.random, args.seed)
+    print(f"🔬 Mengevaluasi {len(configs)} konfigurasi dengan {args.workers} worker...")
+    started = time.perf_counter()
+    results = run_sweep(configs, args.data_dir, args.workers)
+    print(f"⏱️ Selesai dalam {time.perf_counter() - started:.1f} detik")
+
+    # Drawdown terkecil = terbaik, metrik lain terbesar = terbaik
+    results.sort(key=lambda r: r[args.sort], reverse=args.sort != 'max_drawdown')
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=4)
+
+    print("=" * 60)
+    print(f"🏆 TOP {args.top} (urut {args.sort}):")
+    for r in results[:args.top]:
+        params = ' '.join(f"{k}={v}" for k, v in r['params'].items())
+        print(f"   💰 {r['total_pnl']:+8.2f}% | 🎯 {r['win_rate']:5.1f}% | 📉 DD {r['max_drawdown']:6.2f}% | "
+              f"📈 {r['trades']:4d} trade | {params}")
+    print("=" * 60)
+    print(f"✅ Hasil lengkap disimpan ke {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+import copy
+from dataclasses import dataclass
+from datetime import datetime
+
+# ==========================================
+# RECORD RINGKAS (SLOTS) UNTUK INDIKATOR, POSISI & COOLDOWN
+# ==========================================
+# Dataclass dengan __slots__ tidak punya __dict__ per objek, jadi jauh lebih
+# hemat memori daripada dict 12 key per pair per timeframe, dan akses atribut
+# lebih cepat daripada lookup dict + .get(default). Format JSON di disk tetap sama.
+INDICATOR_FIELDS = ('close', 'ema10', 'ema20', 'ema50', 'ema200', 'macd', 'macd_signal',
+                    'rsi', 'adx', 'atr', 'volume', 'average_volume')
+
+
+@dataclass(slots=True)
+class IndicatorSnapshot:
+    close: float = 0.0
+    ema10: float = 0.0
+    ema20: float = 0.0
+    ema50: float = 0.0
+    ema200: float = 0.0
+    macd: float = 0.0
+    macd_signal: float = 0.0
+    rsi: float = 50.0
+    adx: float = 0.0
+    atr: float = 0.0
+    volume: float = 0.0
+    average_volume: float = 0.0
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in INDICATOR_FIELDS}
+
+
+@dataclass(slots=True)
+class Position:
+    price: float
+    time: datetime
+    stop_loss: float
+    entry_atr: float
+    trailing_active: bool = False
+    highest_price: float = 0.0
+    entry_score: int = 0
+    break_even_active: bool = False
+
+    @classmethod
+    def from_json(cls, d):
+        return cls(
+            price=float(d['price']),
+            time=datetime.fromisoformat(d['time']),
+            stop_loss=float(d['stop_loss']),
+            entry_atr=float(d.get('entry_atr', d['price'] * 0.02)),
+            trailing_active=d.get('trailing_active', False),
+            highest_price=float(d.get('highest_price', d['price'])),
+            entry_score=int(d.get('entry_score', 0)),
+            break_even_active=d.get('break_even_active', False),
+        )
+
+    def to_json(self):
+        return {
+            'price': self.price, 'time': self.time.isoformat(),
+            'stop_loss': self.stop_loss, 'entry_atr': self.entry_atr,
+            'trailing_active': self.trailing_active, 'highest_price': self.highest_price,
+            'entry_score': self.entry_score, 'break_even_active': self.break_even_active
+        }
+
+    def profit_pct(self, current_price):
+        return ((current_price - self.price) / self.price) * 100
+
+
+@dataclass(slots=True)
+class Cooldown:
+    until: datetime
+
+    @classmethod
+    def from_json(cls, value):
+        return cls(until=datetime.fromisoformat(value))
+
+    def to_json(self):
+        return self.until.isoformat()
+
+    def active(self, now):
+        return now < self.until
+
+    def remaining_hours(self, now):
+        return (self.until - now).total_seconds() / 3600
+
+
+# ==========================================
+# GABUNG POSISI YANG DIUBAH BEBERAPA PROSES
+# ==========================================
+# Run terjadwal, --daemon dan exit_monitor berbagi active_buys.json. Posisi dikenali
+# dari waktu entry: pair yang sama dengan waktu berbeda adalah posisi lain.
+def merge_position(disk, ours):
+    # Perubahan posisi bersifat monoton (harga tertinggi naik, SL hanya naik,
+    # break even / trailing hanya menyala), jadi aman diterapkan ulang ke versi disk
+    disk.highest_price = max(disk.highest_price, ours.highest_price)
+    disk.stop_loss = max(disk.stop_loss, ours.stop_loss)
+    disk.break_even_active = disk.break_even_active or ours.break_even_active
+    disk.trailing_active = disk.trailing_active or ours.trailing_active
+
+
+def merge_positions(base, ours, theirs):
+    # Merge tiga arah: base = isi file saat terakhir dibaca/ditulis proses ini,
+    # ours = state di memori, theirs = isi file sekarang. Posisi yang ditutup salah
+    # satu pihak tetap tertutup, posisi baru dari kedua pihak dipertahankan.
+    merged = {}
+    for pair in list(theirs) + [pair for pair in ours if pair not in theirs]:
+        old, mine, other = base.get(pair), ours.get(pair), theirs.get(pair)
+        if mine is None:
+            # Ditutup di sini, kecuali proses lain membuka posisi baru
+            if old is None or old.time != other.time:
+                merged[pair] = other
+        elif other is None:
+            # Ditutup proses lain, kecuali posisi ini baru dibuka di sini
+            if old is None or old.time != mine.time:
+                merged[pair] = mine
+        elif mine.time != other.time:
+            # Posisi berbeda: yang berubah sejak base adalah yang lebih baru
+            merged[pair] = other if old is not None and old.time == mine.time else mine
+        else:
+            merged[pair] = copy.copy(other)
+            merge_position(merged[pair], mine)
+    return merged
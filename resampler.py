@@ -0,0 +1,102 @@
+import numpy as np
+
+# ==========================================
+# RESAMPLING DARI SATU STREAM CANDLE DASAR
+# ==========================================
+# Per simbol disimpan ring buffer candle dasar (mis. 1H) yang sudah tertutup.
+# Candle timeframe lebih besar (4H, 1D, ...) disusun lokal dari candle dasar:
+# high = max, low = min, close = close terakhir, volume = jumlah. Candle Binance
+# sejajar dengan epoch UTC, jadi bucket cukup floor(open_time / durasi).
+# Baris memakai format kline Binance: [open_time, open, high, low, close, volume, close_time].
+BUFFER_FIELDS = ('open', 'high', 'low', 'close', 'volume')
+
+
+class CandleBuffer:
+    def __init__(self, symbols, capacity=48):
+        self.symbols = list(symbols)
+        n = len(self.symbols)
+        self.capacity = capacity
+        self.times = np.full((n, capacity), -1, dtype=np.int64)
+        self.values = np.full((n, len(BUFFER_FIELDS), capacity), np.nan)
+        self.pos = np.zeros(n, dtype=np.int64)       # slot yang ditulis berikutnya
+        self.count = np.zeros(n, dtype=np.int64)
+        self.last_time = np.full(n, -1, dtype=np.int64)
+
+    def extend(self, i, klines):
+        # Hanya candle yang lebih baru dari isi buffer yang ditambahkan
+        for k in klines:
+            if k[0] <= self.last_time[i]:
+                continue
+            slot = self.pos[i]
+            self.times[i, slot] = k[0]
+            self.values[i, :, slot] = [float(v) for v in k[1:6]]
+            self.pos[i] = (slot + 1) % self.capacity
+            self.count[i] = min(self.count[i] + 1, self.capacity)
+            self.last_time[i] = k[0]
+
+    def rows(self, i, base_ms):
+        # Isi buffer simbol ke-i sebagai baris kline, terlama lebih dulu
+        slots = [(self.pos[i] - self.count[i] + j) % self.capacity for j in range(self.count[i])]
+        return [[int(self.times[i, s]), *(float(v) for v in self.values[i, :, s]), int(self.times[i, s]) + base_ms - 1]
+                for s in slots]
+
+    # ------------------------------------------
+    # Persistensi (np.savez), antarmuka sama dengan IndicatorEngine (simbol di sumbu 0)
+    # ------------------------------------------
+    def state(self):
+        state = {'symbols': np.array(self.symbols), 'times': self.times, 'values': self.values,
+                 'pos': self.pos, 'count': self.count, 'last_time': self.last_time}
+        return {k: np.array(v, copy=True) for k, v in state.items()}
+
+    def restore(self, state):
+        self.times = np.array(state['times'], dtype=np.int64)
+        self.values = np.array(state['values'], dtype=float)
+        self.pos = np.array(state['pos'], dtype=np.int64)
+        self.count = np.array(state['count'], dtype=np.int64)
+        self.last_time = np.array(state['last_time'], dtype=np.int64)
+        self.capacity = self.times.shape[1]
+
+    def save(self, path):
+        np.savez(path, **self.state())
+
+    @classmethod
+    def load(cls, path, symbols, capacity=None):
+        # Simbol baru mendapat buffer kosong; kapasitas berubah = buffer lama dibuang
+        with np.load(path) as saved:
+            buffer = cls(symbols, capacity or saved['times'].shape[1])
+            if saved['times'].shape[1] != buffer.capacity:
+                return buffer
+            # Setiap akses saved[key] membaca ulang array dari file: baca sekali per key
+            index = {str(s): i for i, s in enumerate(saved['symbols'])}
+            pairs = [(i, index[symbol]) for i, symbol in enumerate(buffer.symbols) if symbol in index]
+            if not pairs:
+                return buffer
+            target, rows = (np.array(column, dtype=np.int64) for column in zip(*pairs))
+            for key in ('times', 'values', 'pos', 'count', 'last_time'):
+                getattr(buffer, key)[target] = np.asarray(saved[key])[rows]
+        return buffer
+
+
+def resample(klines, target_ms, now_ms, after=-1):
+    # Kline dasar (terurut, boleh termasuk candle yang masih berjalan) -> (candle target
+    # tertutup dengan open_time > after, candle target yang masih berjalan atau None)
+    buckets = {}
+    for k in klines:
+        start = k[0] // target_ms * target_ms
+        if start <= after:
+            continue
+        bar = buckets.get(start)
+        if bar is None:
+            buckets[start] = [start, float(k[1]), float(k[2]), float(k[3]), float(k[4]), float(k[5]), start + target_ms - 1]
+        else:
+            bar[2] = max(bar[2], float(k[2]))
+            bar[3] = min(bar[3], float(k[3]))
+            bar[4] = float(k[4])
+            bar[5] += float(k[5])
+    closed = [bar for start, bar in sorted(buckets.items()) if bar[6] < now_ms]
+    forming = [bar for bar in buckets.values() if bar[6] >= now_ms]
+    return closed, (forming[0] if forming else None)
+
+def first_full_bucket(first_time, target_ms):
+    # Bucket target pertama yang seluruh candle dasarnya ada di data (mulai first_time)
+    return -(-first_time // target_ms) * target_ms
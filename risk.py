@@ -0,0 +1,210 @@
+import math
+import os
+from dataclasses import dataclass
+
+import numpy as np
+
+# ==========================================
+# RISIKO PORTOFOLIO (KORELASI INKREMENTAL + BATAS EKSPOSUR)
+# ==========================================
+# CorrelationTracker menyimpan rata-rata & kovarians EWMA dari return log per bar
+# (1H) untuk seluruh universe. Tiap bar baru cukup satu update outer product
+# O(N²) tervektorisasi atas simbol yang punya harga di bar itu, tanpa menghitung
+# ulang dari riwayat. Bar yang terlewat (siklus gagal / pair ditunda) dinormalisasi
+# dengan sqrt(jumlah bar) supaya skala volatilitasnya tetap per bar.
+# review_entries memakai korelasinya untuk membatasi jumlah posisi total & per
+# klaster, lalu mendahulukan kandidat BUY yang paling menambah diversifikasi.
+REJECT_TOTAL = 'batas total posisi'
+REJECT_CLUSTER = 'klaster penuh'
+REJECT_CORRELATION = 'korelasi portofolio'
+
+
+@dataclass(frozen=True)
+class ExposureLimits:
+    max_positions: int = 10
+    max_cluster_positions: int = 3          # Posisi yang saling berkorelasi tinggi
+    cluster_correlation: float = 0.7        # Ambang korelasi satu klaster
+    max_portfolio_correlation: float = 0.85 # Korelasi kandidat vs portofolio yang dipegang
+
+
+class CorrelationTracker:
+    def __init__(self, bar_seconds=3600, halflife_bars=72, min_samples=24, max_gap_bars=6):
+        self.bar_seconds = bar_seconds
+        self.alpha = 1 - 0.5 ** (1 / halflife_bars)
+        self.min_samples = min_samples
+        self.max_gap_bars = max_gap_bars
+        self.dirty = False
+        self._reset([])
+
+    def _reset(self, symbols):
+        n = len(symbols)
+        self.symbols = list(symbols)
+        self.index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.last_price = np.full(n, np.nan)
+        self.last_bar = np.full(n, -1, dtype=np.int64)
+        self.mean = np.zeros(n)
+        self.cov = np.zeros((n, n))
+        self.count = np.zeros((n, n), dtype=np.int64)   # Jumlah bar bersama per pasangan
+
+    def _add(self, symbols):
+        new = [symbol for symbol in dict.fromkeys(symbols) if symbol not in self.index]
+        if not new:
+            return
+        n, k = len(self.symbols), len(new)
+        self.symbols += new
+        self.index.update({symbol: n + i for i, symbol in enumerate(new)})
+        self.last_price = np.concatenate([self.last_price, np.full(k, np.nan)])
+        self.last_bar = np.concatenate([self.last_bar, np.full(k, -1, dtype=np.int64)])
+        self.mean = np.concatenate([self.mean, np.zeros(k)])
+        self.cov = np.pad(self.cov, ((0, k), (0, k)))
+        self.count = np.pad(self.count, ((0, k), (0, k)))
+
+    def retain(self, symbols):
+        # Buang simbol yang keluar dari universe (dan tidak sedang dipegang)
+        symbols = set(symbols)
+        keep = [i for i, symbol in enumerate(self.symbols) if symbol in symbols]
+        if len(keep) == len(self.symbols):
+            return
+        state = {'symbols': [self.symbols[i] for i in keep], 'last_price': self.last_price[keep],
+                 'last_bar': self.last_bar[keep], 'mean': self.mean[keep],
+                 'cov': self.cov[np.ix_(keep, keep)], 'count': self.count[np.ix_(keep, keep)]}
+        self.restore(state)
+        self.dirty = True
+
+    # ------------------------------------------
+    # Update per bar
+    # ------------------------------------------
+    def update(self, prices, now):
+        # prices: {simbol: harga terakhir}. Return jumlah simbol yang mendapat return baru.
+        prices = {symbol: price for symbol, price in prices.items() if price and price > 0}
+        if not prices:
+            return 0
+        self._add(sorted(prices))
+        bar = int(now // self.bar_seconds)
+        idx = np.array([self.index[symbol] for symbol in prices], dtype=np.int64)
+        price = np.array(list(prices.values()), dtype=float)
+        fresh = bar > self.last_bar[idx]             # Siklus kedua di bar yang sama tidak dihitung
+        idx, price = idx[fresh], price[fresh]
+        if not len(idx):
+            return 0
+        gap = bar - self.last_bar[idx]
+        valid = (self.last_bar[idx] >= 0) & (gap <= self.max_gap_bars)
+        old_price = self.last_price[idx]
+        self.last_price[idx] = price
+        self.last_bar[idx] = bar
+        self.dirty = True
+
+        idx = idx[valid]
+        if not len(idx):
+            return 0
+        returns = np.log(price[valid] / old_price[valid]) / np.sqrt(gap[valid])
+        delta = returns - self.mean[idx]
+        block = np.ix_(idx, idx)
+        # EWMA: S = (1 - a) * (S + a * d dᵀ), d = r - mean sebelum update
+        self.cov[block] = (1 - self.alpha) * (self.cov[block] + self.alpha * np.outer(delta, delta))
+        self.mean[idx] += self.alpha * delta
+        self.count[block] += 1
+        return len(idx)
+
+    # ------------------------------------------
+    # Query
+    # ------------------------------------------
+    def correlation(self, symbols):
+        # Matriks korelasi simbol yang diminta; pasangan dengan sampel < min_samples = NaN
+        k = len(symbols)
+        corr = np.full((k, k), np.nan)
+        rows = [i for i, symbol in enumerate(symbols) if symbol in self.index]
+        if rows:
+            idx = [self.index[symbols[i]] for i in rows]
+            cov = self.cov[np.ix_(idx, idx)]
+            vol = np.sqrt(np.diag(cov))
+            with np.errstate(divide='ignore', invalid='ignore'):
+                known = cov / np.outer(vol, vol)
+            known[self.count[np.ix_(idx, idx)] < self.min_samples] = np.nan
+            corr[np.ix_(rows, rows)] = known
+        np.fill_diagonal(corr, 1.0)
+        return corr
+
+    # ------------------------------------------
+    # Persistensi (np.savez)
+    # ------------------------------------------
+    def state(self):
+        return {'symbols': np.array(self.symbols), 'last_price': self.last_price, 'last_bar': self.last_bar,
+                'mean': self.mean, 'cov': self.cov, 'count': self.count}
+
+    def restore(self, state):
+        self._reset([str(symbol) for symbol in state['symbols']])
+        self.last_price = np.array(state['last_price'], dtype=float)
+        self.last_bar = np.array(state['last_bar'], dtype=np.int64)
+        self.mean = np.array(state['mean'], dtype=float)
+        self.cov = np.array(state['cov'], dtype=float).reshape(len(self.symbols), len(self.symbols))
+        self.count = np.array(state['count'], dtype=np.int64).reshape(len(self.symbols), len(self.symbols))
+
+    def load(self, path):
+        self._reset([])
+        self.dirty = False
+        if not os.path.exists(path):
+            return
+        try:
+            with np.load(path) as saved:
+                self.restore(saved)
+        except Exception as e:
+            print(f"⚠️ State korelasi tidak bisa dibaca, mulai dari awal: {e}")
+            self._reset([])
+
+    def save(self, path):
+        # Ditulis ke file sementara lalu di-rename, sama seperti state JSON
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(tmp_path, **self.state())
+        os.replace(tmp_path, path)
+        self.dirty = False
+
+
+def portfolio_correlation(corr, candidate, held):
+    # Korelasi kandidat dengan portofolio equal-risk (bobot 1/vol) dari posisi held.
+    # Dengan bobot 1/vol_j, cov(kandidat, P) = vol_c * Σ ρ_cj dan var(P) = Σ ρ_jk,
+    # jadi volatilitasnya saling menghapus dan cukup matriks korelasi.
+    # Pasangan yang korelasinya belum diketahui dianggap 0.
+    if not held:
+        return 0.0
+    rho = np.nan_to_num(corr[candidate, held])
+    block = np.nan_to_num(corr[np.ix_(held, held)])
+    return float(rho.sum() / math.sqrt(max(block.sum(), 1e-12)))
+
+def review_entries(tracker, held, candidates, limits, slots=None):
+    # candidates: {pair: skor}. Greedy: tiap langkah kandidat dengan korelasi terendah
+    # ke portofolio saat itu (lalu skor tertinggi) dicek batas klaster & korelasinya;
+    # yang diterima ikut menjadi bagian portofolio untuk kandidat berikutnya.
+    # Return ({pair: korelasi portofolio}, {pair: alasan ditolak}).
+    held = list(dict.fromkeys(held))
+    symbols = held + sorted(pair for pair in candidates if pair not in held)
+    corr = tracker.correlation(symbols)
+    position = {symbol: i for i, symbol in enumerate(symbols)}
+    chosen = [position[pair] for pair in held]
+    free = limits.max_positions - len(held)
+    full_reason = f"{REJECT_TOTAL} ({limits.max_positions})"
+    if slots is not None and slots < free:
+        free = slots
+        full_reason = f"{REJECT_TOTAL} (jatah shard habis)"
+
+    approved, rejected = {}, {}
+    remaining = sorted(pair for pair in candidates if pair not in held)
+    while remaining:
+        if free <= 0:
+            for pair in remaining:
+                rejected[pair] = full_reason
+            break
+        rhos = {pair: portfolio_correlation(corr, position[pair], chosen) for pair in remaining}
+        pair = min(remaining, key=lambda p: (rhos[p], -candidates[p], p))
+        remaining.remove(pair)
+        i = position[pair]
+        cluster = [symbols[j] for j in chosen if corr[i, j] >= limits.cluster_correlation]
+        if len(cluster) >= limits.max_cluster_positions:
+            rejected[pair] = f"{REJECT_CLUSTER} ({', '.join(cluster)})"
+        elif rhos[pair] > limits.max_portfolio_correlation:
+            rejected[pair] = f"{REJECT_CORRELATION} {rhos[pair]:.2f}"
+        else:
+            approved[pair] = rhos[pair]
+            chosen.append(i)
+            free -= 1
+    return approved, rejected
@@ -0,0 +1,104 @@
+import json
+import os
+import time
+
+from state_store import atomic_write_json
+
+# ==========================================
+# PENJADWAL SCAN BERPRIORITAS (DENGAN BUDGET WAKTU)
+# ==========================================
+# Urutan kerja satu siklus:
+#   1. Posisi aktif, yang harganya paling dekat ke stop loss lebih dulu
+#   2. Pair yang baru-baru ini mendapat skor WATCH
+#   3. Sisa universe, round-robin mulai dari pair pertama yang ditunda run lalu
+# Pekerjaan dijalankan per gelombang dengan urutan di atas; gelombang yang
+# diperkirakan melewati budget ditunda ke run berikutnya. Gelombang pertama
+# (berisi semua posisi) selalu dijalankan.
+TIER_POSITIONS = 'posisi'
+TIER_WATCH = 'watch'
+TIER_UNIVERSE = 'universe'
+
+
+class ScanSchedule:
+    def __init__(self, path, watch_hours=24):
+        self.path = path
+        self.watch_ttl = watch_hours * 3600
+        self.last_price = {}      # pair -> harga terakhir yang terlihat (untuk jarak ke SL)
+        self.watch = {}           # pair -> {'at': epoch, 'score': skor WATCH terakhir}
+        self.cursor = {}          # kunci shard -> pair tempat round-robin dilanjutkan
+
+    def load(self):
+        self.last_price, self.watch, self.cursor = {}, {}, {}
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"⚠️ Jadwal scan tidak bisa dibaca, mulai dari awal: {e}")
+            return
+        self.last_price = data.get('last_price', {})
+        self.watch = data.get('watch', {})
+        self.cursor = data.get('cursor', {})
+
+    def save(self, positions, now=None):
+        now = time.time() if now is None else now
+        # Harga hanya perlu untuk posisi yang masih terbuka, WATCH lama dibuang
+        self.last_price = {pair: price for pair, price in self.last_price.items() if pair in positions}
+        self.watch = {pair: w for pair, w in self.watch.items() if now - w['at'] < self.watch_ttl}
+        atomic_write_json(self.path, {
+            'last_price': dict(sorted(self.last_price.items())),
+            'watch': dict(sorted(self.watch.items())),
+            'cursor': dict(sorted(self.cursor.items())),
+        }, indent=1)
+
+    def record_price(self, pair, price):
+        self.last_price[pair] = price
+
+    def record_watch(self, pair, score, now=None):
+        self.watch[pair] = {'at': time.time() if now is None else now, 'score': score}
+
+    def clear_watch(self, pair):
+        self.watch.pop(pair, None)
+
+    def stop_distance(self, pair, position):
+        # Jarak relatif harga terakhir ke SL; harga belum diketahui = paling mendesak
+        price = self.last_price.get(pair)
+        if not price:
+            return -1.0
+        return (price - position.stop_loss) / price
+
+    def plan(self, pairs, positions, shard_key, now=None):
+        # Return [(tier, [pair])] sesuai urutan prioritas
+        now = time.time() if now is None else now
+        held = sorted((pair for pair in pairs if pair in positions),
+                      key=lambda pair: (self.stop_distance(pair, positions[pair]), pair))
+        watched = sorted((pair for pair in pairs if pair not in positions and pair in self.watch
+                          and now - self.watch[pair]['at'] < self.watch_ttl),
+                         key=lambda pair: (-self.watch[pair]['score'], -self.watch[pair]['at'], pair))
+        taken = set(held) | set(watched)
+        rest = [pair for pair in pairs if pair not in taken]
+        start = self.cursor.get(shard_key)
+        if start in rest:
+            index = rest.index(start)
+            rest = rest[index:] + rest[:index]
+        return [(TIER_POSITIONS, held), (TIER_WATCH, watched), (TIER_UNIVERSE, rest)]
+
+    def defer(self, shard_key, deferred):
+        # Run berikutnya melanjutkan dari pair pertama yang tidak sempat diproses
+        if deferred:
+            self.cursor[shard_key] = deferred[0]
+        else:
+            self.cursor.pop(shard_key, None)
+
+
+def waves(tiers, wave_size):
+    # Urutan prioritas dipertahankan; gelombang pertama selalu memuat semua posisi
+    # (exit check tidak pernah ditunda), sisanya dipecah per wave_size pair
+    held = [pair for tier, pairs in tiers if tier == TIER_POSITIONS for pair in pairs]
+    others = [pair for tier, pairs in tiers if tier != TIER_POSITIONS for pair in pairs]
+    first = max(wave_size - len(held), 0)
+    if held or others:
+        yield held + others[:first]
+    for index in range(first, len(others), wave_size):
+        yield others[index:index + wave_size]
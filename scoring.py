@@ -0,0 +1,197 @@
+import numpy as np
+
+from records import INDICATOR_FIELDS
+
+# ==========================================
+# SCORING BATCH (STRUCT-OF-ARRAYS + BITMASK)
+# ==========================================
+# Versi vektor dari calculate_entry_score(): semua pair dihitung sekaligus dari
+# satu array NumPy per field per timeframe. Aturan yang terpenuhi disimpan sebagai
+# bitmask; teks alasan baru dirender (render_reasons / render_vetoes) untuk pair
+# yang benar-benar dikirim atau dicetak.
+
+# Bit veto
+VETO_DAILY_DOWNTREND = 1 << 0
+VETO_RSI_OVERBOUGHT = 1 << 1
+VETO_FAR_FROM_EMA20 = 1 << 2
+VETO_LOW_ATR = 1 << 3
+VETO_LOW_RR = 1 << 4
+
+# Teks veto downtrend 1D juga dipakai crypto_signal_bot (skor skalar & pra-filter 1D)
+DAILY_DOWNTREND_VETO = "1D Downtrend jelas (Close<EMA50<EMA200)"
+
+# Bit aturan skor: (bit, poin)
+RULE_1D_STRONG_TREND = 1 << 0
+RULE_1D_UPTREND = 1 << 1
+RULE_1D_ADX = 1 << 2
+RULE_4H_PULLBACK_NEAR = 1 << 3
+RULE_4H_PULLBACK_FAR = 1 << 4
+RULE_4H_RSI = 1 << 5
+RULE_4H_MACD_FRESH = 1 << 6
+RULE_4H_MACD_BULLISH = 1 << 7
+RULE_1H_MOMENTUM = 1 << 8
+RULE_1H_MACD_FRESH = 1 << 9
+RULE_1H_MACD_BULLISH = 1 << 10
+RULE_1H_RSI = 1 << 11
+RULE_1H_VOLUME_SPIKE = 1 << 12
+
+RULE_POINTS = (
+    (RULE_1D_STRONG_TREND, 25), (RULE_1D_UPTREND, 20), (RULE_1D_ADX, 15),
+    (RULE_4H_PULLBACK_NEAR, 10), (RULE_4H_PULLBACK_FAR, 5), (RULE_4H_RSI, 5),
+    (RULE_4H_MACD_FRESH, 15), (RULE_4H_MACD_BULLISH, 10),
+    (RULE_1H_MOMENTUM, 5), (RULE_1H_MACD_FRESH, 10), (RULE_1H_MACD_BULLISH, 5),
+    (RULE_1H_RSI, 5), (RULE_1H_VOLUME_SPIKE, 15),
+)
+
+# Kode sinyal hasil batch
+SIGNAL_NONE, SIGNAL_WATCH, SIGNAL_BUY, SIGNAL_BUY_STRONG = 0, 1, 2, 3
+SIGNAL_NAMES = (None, "WATCH", "BUY", "BUY_STRONG")
+
+
+def to_columns(pairs, market_data, interval, fields=INDICATOR_FIELDS):
+    # {pair: {interval: IndicatorSnapshot}} -> {field: array} dengan urutan baris = urutan pairs
+    snapshots = [market_data[pair][interval] for pair in pairs]
+    return {field: np.fromiter((getattr(s, field) for s in snapshots), dtype=float, count=len(snapshots))
+            for field in fields}
+
+def entry_sl_prices(price, atr, cfg):
+    # Sama dengan perhitungan SL di main(): fallback 5% jika ATR tidak ada
+    return np.where(atr > 0, price - (cfg.atr_sl_multiplier * atr), price * 0.95)
+
+def _flag(condition, bit):
+    return np.where(condition, bit, 0)
+
+def score_batch(d1, h4, h1, price, sl_price, cfg):
+    # Return dict array per pair: score, vetoes (bitmask), rules (bitmask), signal (kode)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        downtrend = (d1['ema50'] < d1['ema200']) & (d1['close'] < d1['ema50'])
+
+        dist = ((price - h4['ema20']) / h4['ema20']) * 100
+        atr = h1['atr']
+        risk = price - sl_price
+        rr_ratio = ((price + (cfg.rr_target_atr * atr)) - price) / risk
+
+        vetoes = _flag(downtrend, VETO_DAILY_DOWNTREND)
+        # Downtrend 1D langsung keluar di versi skalar, veto lain tidak dicatat
+        vetoes |= np.where(downtrend, 0,
+                           _flag(h1['rsi'] > cfg.rsi_overbought_veto, VETO_RSI_OVERBOUGHT)
+                           | _flag((h4['ema20'] > 0) & (dist > cfg.max_distance_from_ema20_pct), VETO_FAR_FROM_EMA20)
+                           | _flag((atr > 0) & ((atr / price) < cfg.min_atr_pct), VETO_LOW_ATR)
+                           | _flag((risk > 0) & (atr > 0) & (rr_ratio < cfg.min_rr_ratio), VETO_LOW_RR))
+
+        strong = (d1['ema20'] > d1['ema50']) & (d1['ema50'] > d1['ema200']) & (d1['close'] > d1['ema20'])
+        uptrend = (d1['ema50'] > d1['ema200']) & (d1['close'] > d1['ema50'])
+        rules = _flag(strong, RULE_1D_STRONG_TREND) | _flag(~strong & uptrend, RULE_1D_UPTREND)
+        rules |= _flag(d1['adx'] > 25, RULE_1D_ADX)
+
+        pullback = h4['ema20'] > h4['ema50']
+        near = np.abs(price - h4['ema20']) / h4['ema20'] * 100 <= 2.0
+        rules |= _flag(pullback & near, RULE_4H_PULLBACK_NEAR) | _flag(pullback & ~near, RULE_4H_PULLBACK_FAR)
+        rules |= _flag((h4['rsi'] >= 45) & (h4['rsi'] <= 60), RULE_4H_RSI)
+
+        macd_diff_4h = h4['macd'] - h4['macd_signal']
+        fresh_4h = (price > 0) & (np.abs(macd_diff_4h) / price < 0.002)
+        rules |= _flag((macd_diff_4h > 0) & fresh_4h, RULE_4H_MACD_FRESH)
+        rules |= _flag((macd_diff_4h > 0) & ~fresh_4h, RULE_4H_MACD_BULLISH)
+
+        rules |= _flag(h1['ema10'] > h1['ema20'], RULE_1H_MOMENTUM)
+        macd_diff_1h = h1['macd'] - h1['macd_signal']
+        fresh_1h = (price > 0) & (np.abs(macd_diff_1h) / price < 0.002)
+        rules |= _flag((macd_diff_1h > 0) & fresh_1h, RULE_1H_MACD_FRESH)
+        rules |= _flag((macd_diff_1h > 0) & ~fresh_1h, RULE_1H_MACD_BULLISH)
+        rules |= _flag((h1['rsi'] >= 50) & (h1['rsi'] <= 65), RULE_1H_RSI)
+
+        avg_vol = h1['average_volume']
+        rules |= _flag((avg_vol > 0) & (h1['volume'] > (1.5 * avg_vol)), RULE_1H_VOLUME_SPIKE)
+
+    vetoed = vetoes != 0
+    rules = np.where(vetoed, 0, rules)
+    score = np.zeros(np.shape(rules), dtype=np.int64)
+    for bit, points in RULE_POINTS:
+        score += np.where(rules & bit, points, 0)
+
+    signal = np.where(score >= cfg.score_buy_strong, SIGNAL_BUY_STRONG,
+                      np.where(score >= cfg.score_buy, SIGNAL_BUY,
+                               np.where(score >= cfg.score_watch, SIGNAL_WATCH, SIGNAL_NONE)))
+    signal = np.where(vetoed, SIGNAL_NONE, signal)
+    return {'score': score, 'vetoes': vetoes, 'rules': rules, 'signal': signal}
+
+# ==========================================
+# RENDER TEKS (HANYA UNTUK PAIR YANG DIPERLUKAN)
+# ==========================================
+def render_vetoes(mask, data_1d, data_4h, data_1h, current_price, sl_price, cfg):
+    mask = int(mask)
+    vetoes = []
+    if mask & VETO_DAILY_DOWNTREND:
+        vetoes.append(DAILY_DOWNTREND_VETO)
+    if mask & VETO_RSI_OVERBOUGHT:
+        vetoes.append(f"RSI 1H OB ({data_1h.rsi:.1f})")
+    if mask & VETO_FAR_FROM_EMA20:
+        dist = ((current_price - data_4h.ema20) / data_4h.ema20) * 100
+        vetoes.append(f"Jauh dari EMA20 4H ({dist:.1f}%)")
+    atr = data_1h.atr
+    if mask & VETO_LOW_ATR:
+        vetoes.append(f"ATR terlalu kecil ({(atr/current_price)*100:.2f}%)")
+    if mask & VETO_LOW_RR:
+        rr_ratio = ((current_price + (cfg.rr_target_atr * atr)) - current_price) / (current_price - sl_price)
+        vetoes.append(f"RR kecil (1:{rr_ratio:.1f} < 1:{cfg.min_rr_ratio:.1f})")
+    return vetoes
+
+def render_reasons(mask, data_1d, data_4h, data_1h, current_price):
+    mask = int(mask)
+    reasons = []
+    if mask & RULE_1D_STRONG_TREND:
+        reasons.append("✅ 1D Strong Trend (EMA20>50>200) [+25]")
+    elif mask & RULE_1D_UPTREND:
+        reasons.append("✅ 1D Uptrend (Close>EMA50>200) [+20]")
+    else:
+        reasons.append("❌ 1D Trend Lemah [+0]")
+
+    if mask & RULE_1D_ADX:
+        reasons.append(f"✅ 1D ADX Kuat ({data_1d.adx:.1f}) [+15]")
+    else:
+        reasons.append(f"❌ 1D ADX Lemah ({data_1d.adx:.1f}) [+0]")
+
+    if mask & (RULE_4H_PULLBACK_NEAR | RULE_4H_PULLBACK_FAR):
+        dist_4h = abs(current_price - data_4h.ema20) / data_4h.ema20 * 100
+        if mask & RULE_4H_PULLBACK_NEAR:
+            reasons.append(f"✅ 4H Perfect Pullback (Dist {dist_4h:.1f}%) [+10]")
+        else:
+            reasons.append(f"⚠️ 4H Pullback Far (Dist {dist_4h:.1f}%) [+5]")
+    else:
+        reasons.append("❌ 4H Bukan Pullback [+0]")
+
+    if mask & RULE_4H_RSI:
+        reasons.append(f"✅ 4H RSI Rebound ({data_4h.rsi:.1f}) [+5]")
+    else:
+        reasons.append(f"⚠️ 4H RSI Tidak Ideal ({data_4h.rsi:.1f}) [+0]")
+
+    if mask & RULE_4H_MACD_FRESH:
+        reasons.append("✅ 4H MACD Fresh Cross [+15]")
+    elif mask & RULE_4H_MACD_BULLISH:
+        reasons.append("✅ 4H MACD Bullish [+10]")
+    else:
+        reasons.append("❌ 4H MACD Bearish [+0]")
+
+    if mask & RULE_1H_MOMENTUM:
+        reasons.append("✅ 1H Momentum (EMA10>20) [+5]")
+    else:
+        reasons.append("❌ 1H Momentum Lemah [+0]")
+
+    if mask & RULE_1H_MACD_FRESH:
+        reasons.append("✅ 1H MACD Fresh Cross [+10]")
+    elif mask & RULE_1H_MACD_BULLISH:
+        reasons.append("✅ 1H MACD Bullish [+5]")
+    else:
+        reasons.append("❌ 1H MACD Bearish [+0]")
+
+    if mask & RULE_1H_RSI:
+        reasons.append(f"✅ 1H RSI Optimal ({data_1h.rsi:.1f}) [+5]")
+    else:
+        reasons.append(f"⚠️ 1H RSI Tidak Optimal ({data_1h.rsi:.1f}) [+0]")
+
+    if mask & RULE_1H_VOLUME_SPIKE:
+        reasons.append(f"✅ 1H Volume Spike ({data_1h.volume/data_1h.average_volume:.1f}x) [+15]")
+    else:
+        reasons.append("❌ 1H Volume Rendah/Tidak Spike [+0]")
+    return reasons
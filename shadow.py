@@ -0,0 +1,128 @@
+import json
+import os
+import time
+from datetime import datetime, timedelta
+
+from exit_rules import indicator_exit, price_exit
+from records import Cooldown, Position
+from scoring import SIGNAL_BUY, entry_sl_prices, score_batch, to_columns
+from state_store import JsonStateFile, TradeLog
+
+# ==========================================
+# STRATEGI SHADOW (VARIAN DI ATAS DATA SIKLUS YANG SAMA)
+# ==========================================
+# Setiap varian punya StrategyConfig sendiri (threshold skor, veto, exit) dan
+# posisi / cooldown / riwayat trade virtual di shadow/<nama>/. Varian hanya
+# memakai market_data yang sudah diambil siklus live (tanpa request tambahan)
+# dan tidak pernah mengirim alert. Waktu CPU per varian dicatat tiap siklus.
+SHADOW_DIR = 'shadow'
+
+
+class ShadowStrategy:
+    def __init__(self, name, cfg, timeframes, tz, root=SHADOW_DIR):
+        self.name = name
+        self.cfg = cfg
+        self.timeframes = tuple(timeframes)
+        self.tz = tz
+        self.directory = os.path.join(root, name)
+        self.positions_store = JsonStateFile(os.path.join(self.directory, 'active_buys.json'))
+        self.cooldowns_store = JsonStateFile(os.path.join(self.directory, 'cooldowns.json'))
+        self.trade_log = TradeLog(os.path.join(self.directory, 'trade_history.jsonl'))
+        self.positions = {}
+        self.cooldowns = {}
+        self.totals = {'count': 0, 'wins': 0, 'pnl': 0.0}
+        self.reset_cycle()
+
+    def reset_cycle(self):
+        self.cycle = {'BUY': 0, 'EXIT': 0, 'HOLD': 0, 'pnl': 0.0, 'cpu': 0.0}
+
+    # ---------- state ----------
+    def load(self):
+        self.positions, self.cooldowns = {}, {}
+        if os.path.exists(self.positions_store.path):
+            self.positions = {pair: Position.from_json(d) for pair, d in self.positions_store.load().items()}
+        if os.path.exists(self.cooldowns_store.path):
+            self.cooldowns = {pair: Cooldown.from_json(v) for pair, v in self.cooldowns_store.load().items()}
+        self.totals = {'count': 0, 'wins': 0, 'pnl': 0.0}
+        for trade in self.trade_log.load():
+            self._count(trade)
+
+    def save(self, now=None):
+        now = now or datetime.now(self.tz)
+        self.cooldowns = {pair: c for pair, c in self.cooldowns.items() if c.active(now)}
+        os.makedirs(self.directory, exist_ok=True)
+        self.positions_store.save({pair: p.to_json() for pair, p in sorted(self.positions.items())})
+        self.cooldowns_store.save({pair: c.to_json() for pair, c in sorted(self.cooldowns.items())})
+
+    def _count(self, trade):
+        self.totals['count'] += 1
+        self.totals['wins'] += 1 if trade['profit_pct'] > 0 else 0
+        self.totals['pnl'] += trade['profit_pct']
+
+    def record_trade(self, trade):
+        os.makedirs(self.directory, exist_ok=True)
+        self.trade_log.append(trade)
+        self._count(trade)
+        self.cycle['pnl'] += trade['profit_pct']
+
+    # ---------- evaluasi satu gelombang ----------
+    def evaluate(self, pairs, market_data, prefiltered, now=None):
+        started = time.thread_time()
+        now = now or datetime.now(self.tz)
+        trend, setup, entry = self.timeframes
+        held = {pair for pair in pairs if pair in self.positions}
+
+        for pair in sorted(held):
+            data_1h = market_data[pair].get(entry)
+            if not data_1h or data_1h.close == 0:
+                continue
+            position = self.positions[pair]
+            signal, details, _ = price_exit(position, data_1h.close, self.cfg)
+            if not signal:
+                signal, details = indicator_exit(position, data_1h.close, data_1h)
+            if signal == "Hold" or not signal:
+                self.cycle['HOLD'] += 1
+                continue
+            self.record_trade({
+                'pair': pair, 'entry_price': position.price,
+                'exit_price': data_1h.close, 'profit_pct': position.profit_pct(data_1h.close),
+                'exit_reason': signal, 'entry_date': position.time.isoformat(),
+                'exit_date': now.isoformat()
+            })
+            if signal == "STOP_LOSS":
+                self.cooldowns[pair] = Cooldown(until=now + timedelta(hours=self.cfg.cooldown_hours))
+            del self.positions[pair]
+            self.cycle['EXIT'] += 1
+
+        candidates = [
+            pair for pair in pairs
+            if pair not in held and pair not in prefiltered
+            and not (pair in self.cooldowns and self.cooldowns[pair].active(now))
+            and all(market_data[pair].get(tf) for tf in self.timeframes) and market_data[pair][entry].close != 0
+        ]
+        if candidates:
+            d1, h4, h1 = (to_columns(candidates, market_data, tf) for tf in (trend, setup, entry))
+            price = h1['close']
+            sl_price = entry_sl_prices(price, h1['atr'], self.cfg)
+            batch = score_batch(d1, h4, h1, price, sl_price, self.cfg)
+            for i, pair in enumerate(candidates):
+                if batch['signal'][i] >= SIGNAL_BUY:
+                    self.positions[pair] = Position(
+                        price=float(price[i]), time=now, stop_loss=float(sl_price[i]),
+                        entry_atr=float(h1['atr'][i]), trailing_active=False,
+                        highest_price=float(price[i]), entry_score=int(batch['score'][i]),
+                        break_even_active=False
+                    )
+                    self.cycle['BUY'] += 1
+
+        cpu = time.thread_time() - started
+        self.cycle['cpu'] += cpu
+        return cpu
+
+
+def load_variants(path):
+    # [{"name": "v4.2", "params": {field StrategyConfig: nilai}}, ...]
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r') as f:
+        return json.load(f)
@@ -0,0 +1,323 @@
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+import crypto_signal_bot as bot
+from indicator_engine import IndicatorEngine
+from records import Cooldown, Position
+from resampler import CandleBuffer
+from shadow import SHADOW_DIR
+from sharding import shard_of
+from state_store import TradeLog
+
+# ==========================================
+# JALANKAN SHARD & GABUNGKAN STATE
+# ==========================================
+# Tiap shard berjalan di folder kerjanya sendiri (lokal: shards/shard-N, di
+# GitHub Actions: checkout job matrix yang diunggah sebagai artifact shard-N).
+# Merge menggabungkan hasilnya ke file state utama secara deterministik:
+# record tiap pair diambil dari shard pemiliknya; jika shard itu tidak
+# menghasilkan output (job gagal), record lama di file utama dipertahankan.
+SHARDS_DIR = 'shards'
+SHARD_INPUT_FILES = (bot.PAIRS_FILE, bot.ACTIVE_BUYS_FILE, bot.COOLDOWNS_FILE,
+                     bot.TRADE_STATS_FILE, bot.INDICATOR_CACHE_FILE, bot.EVALUATION_CACHE_FILE, bot.SCAN_SCHEDULE_FILE,
+                     bot.SHADOW_STRATEGIES_FILE, bot.PORTFOLIO_RISK_FILE)
+SHARD_LOG_FILE = 'run.log'
+
+
+def shard_path(index):
+    return os.path.join(SHARDS_DIR, f"shard-{index}")
+
+def read_json(path, default=None):
+    if not os.path.exists(path):
+        return default
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"⚠️ {path} tidak bisa dibaca: {e}")
+        return default
+
+# ==========================================
+# MODE LOKAL: N PROSES PARALEL
+# ==========================================
+def prepare_shard(index):
+    # Salinan state utama, setara checkout repo di job matrix. Riwayat trade tidak
+    # disalin: shard hanya menambahkan trade baru, merge yang menggabungkannya.
+    directory = shard_path(index)
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory)
+    for name in SHARD_INPUT_FILES:
+        if os.path.exists(name):
+            shutil.copy2(name, directory)
+    if os.path.isdir(bot.NATIVE_STATE_DIR):
+        shutil.copytree(bot.NATIVE_STATE_DIR, os.path.join(directory, bot.NATIVE_STATE_DIR))
+    if os.path.isdir(SHADOW_DIR):
+        shutil.copytree(SHADOW_DIR, os.path.join(directory, SHADOW_DIR),
+                        ignore=shutil.ignore_patterns(os.path.basename(bot.TRADE_HISTORY_FILE)))
+    return directory
+
+def run_local(count):
+    script = os.path.abspath(bot.__file__)
+    processes = {}
+    started = time.time()
+    for index in range(count):
+        directory = prepare_shard(index)
+        log = open(os.path.join(directory, SHARD_LOG_FILE), 'w')
+        processes[index] = (subprocess.Popen([sys.executable, script, '--shard', f"{index}/{count}"],
+                                             cwd=directory, stdout=log, stderr=subprocess.STDOUT), log)
+    print(f"🚀 {count} shard berjalan paralel (log: {SHARDS_DIR}/shard-N/{SHARD_LOG_FILE})")
+
+    failed = []
+    for index, (process, log) in processes.items():
+        code = process.wait()
+        log.close()
+        print(f"   shard {index}: {'✅ selesai' if code == 0 else f'❌ exit {code}'} ({time.time() - started:.1f} detik)")
+        if code != 0:
+            failed.append(index)
+            # Output shard gagal tidak dipakai, record lamanya dipertahankan saat merge
+            shutil.rmtree(shard_path(index), ignore_errors=True)
+    return failed
+
+# ==========================================
+# MERGE
+# ==========================================
+def merge_records(current, count, present, filename, parse):
+    # {pair: record}: shard yang ada menimpa record pair miliknya, sisanya dari state utama
+    merged = {pair: record for pair, record in current.items() if shard_of(pair, count) not in present}
+    for index in sorted(present):
+        data = read_json(os.path.join(shard_path(index), filename))
+        if data is None:
+            print(f"⚠️ Shard {index} tanpa {filename}, record lama dipertahankan.")
+            merged.update({pair: record for pair, record in current.items() if shard_of(pair, count) == index})
+            continue
+        for pair, value in data.items():
+            if shard_of(pair, count) == index:
+                merged[pair] = parse(value)
+    return dict(sorted(merged.items()))
+
+def trade_key(trade):
+    return json.dumps(trade, sort_keys=True)
+
+def merge_trades(present):
+    # Trade baru dari semua shard, dideduplikasi terhadap riwayat utama & diurutkan
+    known = {trade_key(trade) for trade in bot.load_trade_history()}
+    new_trades = {}
+    for index in sorted(present):
+        records = TradeLog(os.path.join(shard_path(index), bot.TRADE_HISTORY_FILE)).load()
+        for trade in records:
+            key = trade_key(trade)
+            if key not in known:
+                new_trades[key] = trade
+    ordered = sorted(new_trades.values(), key=lambda t: (t.get('exit_date', ''), t.get('pair', '')))
+    for trade in ordered:
+        bot.record_trade(trade)
+    return len(ordered)
+
+def merge_shadows(count, present):
+    # Posisi & cooldown virtual tiap varian dari shard pemiliknya, trade baru ditambahkan
+    for shadow in bot.SHADOWS:
+        shadow.positions = merge_records(shadow.positions, count, present,
+                                         shadow.positions_store.path, Position.from_json)
+        shadow.cooldowns = merge_records(shadow.cooldowns, count, present,
+                                         shadow.cooldowns_store.path, Cooldown.from_json)
+        known = {trade_key(trade) for trade in shadow.trade_log.load()}
+        new_trades = {}
+        for index in sorted(present):
+            for trade in TradeLog(os.path.join(shard_path(index), shadow.trade_log.path)).load():
+                if trade_key(trade) not in known:
+                    new_trades[trade_key(trade)] = trade
+        for trade in sorted(new_trades.values(), key=lambda t: (t.get('exit_date', ''), t.get('pair', ''))):
+            shadow.record_trade(trade)
+
+def merge_indicator_cache(count, present):
+    def pair_of(key):
+        return key.split('|', 1)[0]
+
+    entries = {key: entry for key, entry in bot.INDICATOR_CACHE.entries.items()
+               if shard_of(pair_of(key), count) not in present}
+    for index in sorted(present):
+        data = read_json(os.path.join(shard_path(index), bot.INDICATOR_CACHE_FILE), {})
+        entries.update({key: entry for key, entry in data.items() if shard_of(pair_of(key), count) == index})
+    bot.INDICATOR_CACHE.entries = dict(sorted(entries.items()))
+    # Universe yang di-shard lebih besar, batas cache ikut dikali jumlah shard
+    bot.INDICATOR_CACHE.max_entries = bot.INDICATOR_CACHE_MAX_ENTRIES * count
+
+def merge_evaluation_cache(count, present):
+    # Hasil evaluasi per pair dari shard pemiliknya; semua shard memakai kunci konfigurasi yang sama
+    cache = bot.EVAL_CACHE
+    entries = {pair: entry for pair, entry in cache.entries.items() if shard_of(pair, count) not in present}
+    for index in sorted(present):
+        data = read_json(os.path.join(shard_path(index), bot.EVALUATION_CACHE_FILE))
+        if data is None:
+            entries.update({pair: e for pair, e in cache.entries.items() if shard_of(pair, count) == index})
+            continue
+        if data.get('config') != cache.config:
+            # Konfigurasi baru: entri lama dari state utama tidak berlaku lagi
+            cache.config = data.get('config')
+            entries = {pair: e for pair, e in entries.items() if shard_of(pair, count) in present}
+        entries.update({pair: e for pair, e in data.get('entries', {}).items() if shard_of(pair, count) == index})
+    cache.entries = dict(sorted(entries.items()))
+
+def merge_schedule(count, present):
+    # Harga terakhir & WATCH per pair dari shard pemiliknya, cursor round-robin per shard
+    schedule = bot.SCAN_SCHEDULE
+    for index in sorted(present):
+        data = read_json(os.path.join(shard_path(index), bot.SCAN_SCHEDULE_FILE))
+        if data is None:
+            continue
+        for name in ('last_price', 'watch'):
+            merged = {pair: value for pair, value in getattr(schedule, name).items() if shard_of(pair, count) != index}
+            merged.update({pair: value for pair, value in data.get(name, {}).items() if shard_of(pair, count) == index})
+            setattr(schedule, name, merged)
+        key = f"{index}/{count}"
+        if key in data.get('cursor', {}):
+            schedule.cursor[key] = data['cursor'][key]
+        else:
+            schedule.cursor.pop(key, None)
+
+def merge_outbox(present):
+    known = {message['id'] for message in bot.TELEGRAM.pending}
+    added = 0
+    for index in sorted(present):
+        path = os.path.join(shard_path(index), bot.TELEGRAM_OUTBOX_FILE)
+        for message in read_json(path, []):
+            if message['id'] not in known:
+                known.add(message['id'])
+                bot.TELEGRAM.pending.append(message)
+                added += 1
+    bot.TELEGRAM.pending.sort(key=lambda message: message['created_at'])
+    bot.TELEGRAM._persist()
+    # Sudah pindah ke outbox utama: merge ulang tidak boleh mengirim pesan yang sama lagi
+    for index in sorted(present):
+        path = os.path.join(shard_path(index), bot.TELEGRAM_OUTBOX_FILE)
+        if os.path.exists(path):
+            os.remove(path)
+    return added
+
+def native_state_files():
+    # (nama file, kelas state) di indicator_state/; keduanya punya load/state/restore/save
+    files = [(f"{interval}.npz", IndicatorEngine) for interval in bot.TIMEFRAMES]
+    if bot.NATIVE_BASE_INTERVAL:
+        files.append((f"base_{bot.NATIVE_BASE_INTERVAL}.npz", CandleBuffer))
+    return files
+
+def merge_native_state(count, present):
+    # State indicator engine per timeframe (+ ring buffer candle dasar): baris simbol
+    # diambil dari shard pemiliknya
+    for filename, state_class in native_state_files():
+        shard_files = {index: os.path.join(shard_path(index), bot.NATIVE_STATE_DIR, filename) for index in present}
+        shard_files = {index: path for index, path in shard_files.items() if os.path.exists(path)}
+        sources = {}
+        main_path = os.path.join(bot.NATIVE_STATE_DIR, filename)
+        if os.path.exists(main_path):
+            with np.load(main_path) as saved:
+                sources[main_path] = [str(s) for s in saved['symbols'] if shard_of(str(s), count) not in shard_files]
+        for index, path in sorted(shard_files.items()):
+            with np.load(path) as saved:
+                sources[path] = [str(s) for s in saved['symbols'] if shard_of(str(s), count) == index]
+        if not any(sources.values()):
+            continue
+
+        states = [state_class.load(path, symbols).state() for path, symbols in sources.items() if symbols]
+        symbols = [str(symbol) for state in states for symbol in state['symbols']]
+        order = np.argsort(symbols, kind='stable')
+        merged = {key: np.concatenate([state[key] for state in states])[order]
+                  for key in states[0] if key != 'symbols'}
+        engine = state_class([symbols[i] for i in order])
+        engine.restore(merged)
+        os.makedirs(bot.NATIVE_STATE_DIR, exist_ok=True)
+        engine.save(main_path)
+
+def merge_correlations(present):
+    # Harga siklus semua shard digabung lalu korelasi di-update sekali atas seluruh
+    # universe, jadi pasangan pair lintas shard juga ikut terukur
+    bot.load_correlations()
+    prices, stamps = {}, []
+    for index in sorted(present):
+        data = read_json(os.path.join(shard_path(index), bot.RISK_PRICES_FILE))
+        if data:
+            prices.update(data.get('prices', {}))
+            stamps.append(data['time'])
+    if not prices:
+        return 0
+    return bot.update_correlations(prices, max(stamps), bot.get_pairs_from_file())
+
+def shard_cycle_seconds(index):
+    summary = read_json(os.path.join(shard_path(index), bot.METRICS_JSON_FILE), {})
+    return summary.get('stages', {}).get('cycle', {}).get('total')
+
+def merge(count):
+    present = {index for index in range(count) if os.path.isdir(shard_path(index))}
+    missing = sorted(set(range(count)) - present)
+    print(f"🧩 Merge {len(present)}/{count} shard" + (f" (tanpa output: {missing})" if missing else ""))
+
+    bot.load_active_buys()
+    bot.load_cooldowns()
+    bot.migrate_trade_history()
+    bot.load_trade_stats()
+    bot.INDICATOR_CACHE.load()
+    bot.EVAL_CACHE.load()
+    bot.SCAN_SCHEDULE.load()
+    bot.TELEGRAM.load()
+
+    bot.ACTIVE_BUYS = merge_records(bot.ACTIVE_BUYS, count, present, bot.ACTIVE_BUYS_FILE, Position.from_json)
+    bot.COOLDOWNS = merge_records(bot.COOLDOWNS, count, present, bot.COOLDOWNS_FILE, Cooldown.from_json)
+    new_trades = merge_trades(present)
+    merge_indicator_cache(count, present)
+    merge_evaluation_cache(count, present)
+    merge_schedule(count, present)
+    bot.load_shadow_strategies()
+    merge_shadows(count, present)
+    if os.path.isdir(bot.NATIVE_STATE_DIR) or any(
+            os.path.isdir(os.path.join(shard_path(index), bot.NATIVE_STATE_DIR)) for index in present):
+        merge_native_state(count, present)
+    correlated = merge_correlations(present)
+    unsent = merge_outbox(present)
+    bot.save_state()
+    if bot.UNIVERSE_AUTO:
+        # Shard tidak memperbarui universe sendiri; daftar baru dipakai semua shard run berikutnya
+        bot.refresh_universe()
+
+    # Rekap hanya dikirim sekali, dari state gabungan
+    bot.TELEGRAM.start()
+    bot.check_and_send_weekly_recap()
+    bot.check_and_send_monthly_recap()
+    pending = bot.TELEGRAM.close(bot.TELEGRAM_FLUSH_TIMEOUT)
+
+    print("\n" + "=" * 60)
+    print("📊 RINGKASAN MERGE:")
+    print(f"   📈 Posisi aktif: {len(bot.ACTIVE_BUYS)} | ⏳ Cooldown: {len(bot.COOLDOWNS)} | "
+          f"🧾 Trade baru: {new_trades}")
+    print(f"   🧺 Korelasi: {correlated} pair dapat return baru | {len(bot.CORRELATIONS.symbols)} pair dilacak")
+    print(f"   📨 Pesan tertunda dari shard: {unsent} | 📬 Masih tertunda: {pending}")
+    for index in sorted(present):
+        seconds = shard_cycle_seconds(index)
+        if seconds is not None:
+            print(f"   ⏱️ Shard {index}: siklus {seconds:.1f} detik")
+    if missing:
+        print(f"⚠️ Shard {missing} tidak menghasilkan output; posisi & cooldown pair-nya tetap dari state lama.")
+    print("=" * 60)
+    return missing
+
+def main():
+    parser = argparse.ArgumentParser(description="Jalankan scan per shard dan gabungkan state-nya")
+    parser.add_argument('command', choices=('run', 'merge'),
+                        help="run: jalankan semua shard lokal lalu merge; merge: gabungkan output di shards/")
+    parser.add_argument('--shards', type=int, default=int(os.getenv('SHARD_COUNT', '2')), help="Jumlah shard")
+    args = parser.parse_args()
+    if args.shards < 1:
+        parser.error("--shards minimal 1")
+
+    if args.command == 'run':
+        run_local(args.shards)
+    merge(args.shards)
+
+if __name__ == "__main__":
+    main()
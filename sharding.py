@@ -0,0 +1,26 @@
+import zlib
+
+# ==========================================
+# PEMBAGIAN UNIVERSE KE BEBERAPA WORKER (SHARD)
+# ==========================================
+# Pair dibagi dengan hash CRC32 simbol (stabil lintas proses & mesin, tidak
+# seperti hash() bawaan Python), jadi pair yang sama selalu jatuh ke shard yang
+# sama selama jumlah shard tidak berubah. Setiap shard hanya membaca & menulis
+# posisi, cooldown dan trade milik pair-nya sendiri.
+
+
+def shard_of(pair, count):
+    return zlib.crc32(pair.upper().encode()) % count
+
+def owns(pair, index, count):
+    return count <= 1 or shard_of(pair, count) == index
+
+def parse_shard(text):
+    # Format "INDEX/JUMLAH", mis. "0/4" .. "3/4"
+    try:
+        index, count = (int(part) for part in text.split('/'))
+    except ValueError:
+        raise ValueError(f"Format shard harus INDEX/JUMLAH, bukan {text!r}")
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"Shard {text!r} di luar rentang (0 <= INDEX < JUMLAH)")
+    return index, count
@@ -0,0 +1,161 @@
+import json
+import os
+import shutil
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from state_store import atomic_write_json
+
+# ==========================================
+# ARSIP SNAPSHOT INDIKATOR (KOLOMNAR, MEMMAP)
+# ==========================================
+# Setiap siklus menambahkan satu baris per pair: waktu siklus, id simbol, semua
+# field indikator per timeframe, harga, SL, skor & bitmask hasil scoring.
+# Tiap kolom adalah file biner fixed-width (<kolom>.bin) di partisi harian UTC
+# (snapshots/YYYY-MM-DD/), jadi bisa dibaca lewat numpy.memmap tanpa parsing.
+# Baris dalam partisi terurut waktu (append-only), query rentang waktu cukup
+# searchsorted pada kolom ts. Retensi = hapus partisi yang lebih tua dari batas.
+SYMBOLS_FILE = 'symbols.json'
+ROWS_FILE = 'rows.json'
+SCORE_COLUMNS = (('price', np.float64), ('sl_price', np.float64), ('score', np.int16),
+                 ('signal', np.int8), ('vetoes', np.int16), ('rules', np.int32))
+NO_SCORE = -1                  # Pair yang tidak di-scoring (posisi aktif, tersaring 1D, data kurang)
+
+
+class SnapshotStore:
+    def __init__(self, root, intervals, fields, retention_days=30):
+        self.root = root
+        self.retention_days = retention_days
+        self.columns = [('ts', np.int64), ('symbol', np.int32)]
+        self.columns += [(f"{interval}.{field}", np.float64) for interval in intervals for field in fields]
+        self.columns += list(SCORE_COLUMNS)
+        self.intervals = tuple(intervals)
+        self.fields = tuple(fields)
+        self.symbols = None
+        self.symbol_ids = {}
+
+    # ---------- simbol ----------
+    def _load_symbols(self):
+        if self.symbols is not None:
+            return
+        path = os.path.join(self.root, SYMBOLS_FILE)
+        self.symbols = []
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                self.symbols = json.load(f)
+        self.symbol_ids = {symbol: i for i, symbol in enumerate(self.symbols)}
+
+    def _symbol_id(self, symbol):
+        if symbol not in self.symbol_ids:
+            self.symbol_ids[symbol] = len(self.symbols)
+            self.symbols.append(symbol)
+        return self.symbol_ids[symbol]
+
+    # ---------- partisi ----------
+    @staticmethod
+    def partition_name(ts):
+        return datetime.fromtimestamp(ts, timezone.utc).strftime('%Y-%m-%d')
+
+    def partitions(self):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name for name in os.listdir(self.root) if os.path.isdir(os.path.join(self.root, name)))
+
+    def _rows(self, path):
+        rows_path = os.path.join(path, ROWS_FILE)
+        if not os.path.exists(rows_path):
+            return 0
+        with open(rows_path, 'r') as f:
+            return json.load(f)['rows']
+
+    def column(self, partition, name, rows=None):
+        # View memmap read-only atas satu kolom (hanya baris yang sudah di-commit)
+        path = os.path.join(self.root, partition)
+        rows = self._rows(path) if rows is None else rows
+        dtype = dict(self.columns)[name]
+        if rows == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(os.path.join(path, f"{name}.bin"), dtype=dtype, mode='r', shape=(rows,))
+
+    # ---------- tulis ----------
+    def append(self, ts, pairs, market_data, scores=None):
+        # market_data: {pair: {interval: IndicatorSnapshot}}, scores: {pair: (price, sl, score, signal, vetoes, rules)}
+        if not pairs:
+            return 0
+        self._load_symbols()
+        scores = scores or {}
+        known = len(self.symbols)
+        n = len(pairs)
+        data = {
+            'ts': np.full(n, int(ts), dtype=np.int64),
+            'symbol': np.fromiter((self._symbol_id(pair) for pair in pairs), dtype=np.int32, count=n),
+        }
+        for interval in self.intervals:
+            snapshots = [market_data.get(pair, {}).get(interval) for pair in pairs]
+            for field in self.fields:
+                data[f"{interval}.{field}"] = np.fromiter(
+                    (getattr(s, field) if s is not None else np.nan for s in snapshots), dtype=np.float64, count=n)
+        defaults = (np.nan, np.nan, NO_SCORE, 0, 0, 0)
+        for k, (name, dtype) in enumerate(SCORE_COLUMNS):
+            data[name] = np.fromiter((scores.get(pair, defaults)[k] for pair in pairs), dtype=dtype, count=n)
+
+        path = os.path.join(self.root, self.partition_name(ts))
+        os.makedirs(path, exist_ok=True)
+        if len(self.symbols) != known:
+            atomic_write_json(os.path.join(self.root, SYMBOLS_FILE), self.symbols)
+        rows = self._rows(path)
+        for name, dtype in self.columns:
+            with open(os.path.join(path, f"{name}.bin"), 'ab') as f:
+                # Sisa append yang terputus (lebih dari jumlah baris ter-commit) dibuang dulu
+                f.truncate(rows * np.dtype(dtype).itemsize)
+                data[name].astype(dtype, copy=False).tofile(f)
+        # Jumlah baris ditulis terakhir: baris baru baru terlihat setelah semua kolom lengkap
+        atomic_write_json(os.path.join(path, ROWS_FILE), {'rows': rows + n})
+        return n
+
+    def enforce_retention(self, now=None):
+        now = time.time() if now is None else now
+        cutoff = self.partition_name(now - self.retention_days * 86400)
+        removed = [name for name in self.partitions() if name < cutoff]
+        for name in removed:
+            shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
+        return removed
+
+    # ---------- baca ----------
+    def query(self, pairs=None, start=None, end=None, columns=None):
+        # Rentang waktu [start, end] (epoch detik), opsional filter pair & kolom.
+        # Return {kolom: array} + 'pair' (nama simbol per baris)
+        self._load_symbols()
+        names = columns or [name for name, _ in self.columns]
+        names = ['ts', 'symbol'] + [name for name in names if name not in ('ts', 'symbol')]
+        wanted = None
+        if pairs is not None:
+            wanted = np.array([self.symbol_ids[p] for p in pairs if p in self.symbol_ids], dtype=np.int32)
+
+        first = self.partition_name(start) if start is not None else None
+        last = self.partition_name(end) if end is not None else None
+        parts = {name: [] for name in names}
+        for partition in self.partitions():
+            if (first and partition < first) or (last and partition > last):
+                continue
+            rows = self._rows(os.path.join(self.root, partition))
+            if rows == 0:
+                continue
+            ts = self.column(partition, 'ts', rows)
+            lo = int(np.searchsorted(ts, start, 'left')) if start is not None else 0
+            hi = int(np.searchsorted(ts, end, 'right')) if end is not None else rows
+            if lo >= hi:
+                continue
+            mask = None
+            if wanted is not None:
+                mask = np.isin(self.column(partition, 'symbol', rows)[lo:hi], wanted)
+            for name in names:
+                values = self.column(partition, name, rows)[lo:hi]
+                parts[name].append(np.array(values[mask] if mask is not None else values))
+
+        result = {name: (np.concatenate(chunks) if chunks else np.empty(0, dtype=dict(self.columns)[name]))
+                  for name, chunks in parts.items()}
+        result['pair'] = np.array(self.symbols, dtype=object)[result['symbol']]
+        return result
@@ -0,0 +1,120 @@
+import json
+import os
+import tempfile
+
+# ==========================================
+# PENYIMPANAN STATE ATOMIK
+# ==========================================
+# Semua file state ditulis ke file sementara di folder yang sama lalu di-rename
+# (os.replace atomik), jadi run yang dihentikan paksa oleh timeout workflow
+# tidak pernah meninggalkan file JSON setengah jadi.
+
+
+def atomic_write_text(path, text):
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def atomic_write_json(path, data, **dump_kwargs):
+    atomic_write_text(path, json.dumps(data, **dump_kwargs))
+
+
+class JsonStateFile:
+    # File JSON kecil (active_buys, cooldowns) yang hanya ditulis ulang bila isinya berubah
+    def __init__(self, path, indent=4):
+        self.path = path
+        self.indent = indent
+        self.last_written = None
+        self.last_mtime = None
+
+    def _mtime(self):
+        return os.path.getmtime(self.path) if os.path.exists(self.path) else None
+
+    def changed_on_disk(self):
+        # True jika file diubah proses lain (mis. exit_monitor) sejak terakhir dibaca/ditulis
+        return self._mtime() != self.last_mtime
+
+    def load(self):
+        with open(self.path, 'r') as f:
+            text = f.read()
+        data = json.loads(text)
+        self.last_written = json.dumps(data, indent=self.indent)
+        self.last_mtime = self._mtime()
+        return data
+
+    def save(self, data):
+        text = json.dumps(data, indent=self.indent)
+        if text == self.last_written:
+            return False
+        atomic_write_text(self.path, text)
+        self.last_written = text
+        self.last_mtime = self._mtime()
+        return True
+
+
+class TradeLog:
+    # Riwayat trade append-only (JSON Lines): satu trade ditutup = satu baris baru
+    def __init__(self, path, legacy_path=None):
+        self.path = path
+        self.legacy_path = legacy_path
+
+    def migrate(self):
+        # Impor trade_history.json lama (satu array JSON) ke log JSONL sekali saja
+        if not self.legacy_path or not os.path.exists(self.legacy_path) or os.path.exists(self.path):
+            return 0
+        with open(self.legacy_path, 'r') as f:
+            records = json.load(f)
+        self._rewrite(records)
+        os.remove(self.legacy_path)
+        print(f"✅ Migrasi {len(records)} trade dari {self.legacy_path} ke {self.path}")
+        return len(records)
+
+    def append(self, record):
+        line = (json.dumps(record) + '\n').encode()
+        with open(self.path, 'ab+') as f:
+            f.seek(0, os.SEEK_END)
+            if f.tell() > 0:
+                # Jangan sambung ke baris terakhir yang terpotong
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b'\n':
+                    line = b'\n' + line
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def read(self):
+        records, corrupt = [], 0
+        if not os.path.exists(self.path):
+            return records, corrupt
+        with open(self.path, 'r') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    # Baris terpotong karena proses dihentikan saat menulis
+                    corrupt += 1
+        return records, corrupt
+
+    def load(self):
+        # Trade tidak pernah diubah/dihapus, jadi satu-satunya yang perlu dipadatkan
+        # adalah baris rusak: log ditulis ulang hanya jika ada baris seperti itu
+        records, corrupt = self.read()
+        if corrupt:
+            print(f"⚠️ {corrupt} baris rusak di {self.path}, log dipadatkan ulang.")
+            self._rewrite(records)
+        return records
+
+    def _rewrite(self, records):
+        atomic_write_text(self.path, ''.join(json.dumps(r) + '\n' for r in records))
@@ -0,0 +1,76 @@
+from dataclasses import fields, replace
+
+import numpy as np
+import pytest
+
+import crypto_signal_bot as bot
+from eval_cache import EvaluationCache
+from records import INDICATOR_FIELDS, IndicatorSnapshot
+
+CFG = replace(bot.STRATEGY, atr_sl_multiplier=1.0)
+
+
+def market(n=20, seed=0):
+    rng = np.random.default_rng(seed)
+    data = {}
+    for i in range(n):
+        base = 100 * (i + 1)
+        data[f'P{i:02d}USDT'] = {
+            tf: IndicatorSnapshot(**{field: float(base * rng.uniform(0.5, 1.5)) for field in INDICATOR_FIELDS})
+            for tf in bot.TIMEFRAMES
+        }
+    return data
+
+
+def evaluate(data, cfg, cache):
+    pairs = sorted(data)
+    rows, batch = bot.score_entries(pairs, data, cfg, cache=cache)
+    _, expected = bot.score_entries(pairs, data, cfg)
+    for name in ('score', 'signal', 'vetoes', 'rules'):
+        assert np.array_equal(batch[name], expected[name]), name
+    return {pair: bool(batch['reused'][row]) for pair, row in rows.items()}
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return EvaluationCache(str(tmp_path / 'evaluation_cache.json'))
+
+
+def test_unchanged_inputs_hit(cache):
+    data = market()
+    assert not any(evaluate(data, CFG, cache).values())
+    cache.save()
+    cache.load()
+    assert all(evaluate(data, CFG, cache).values())
+    assert cache.hits == len(data) and cache.misses == 0
+
+
+@pytest.mark.parametrize('tf', bot.TIMEFRAMES)
+@pytest.mark.parametrize('field', INDICATOR_FIELDS)
+def test_any_changed_input_misses(cache, tf, field):
+    data = market()
+    evaluate(data, CFG, cache)
+    snapshot = data['P03USDT'][tf]
+    setattr(snapshot, field, np.nextafter(getattr(snapshot, field), np.inf))
+    reused = evaluate(data, CFG, cache)
+    assert reused.pop('P03USDT') is False
+    assert all(reused.values())
+
+
+@pytest.mark.parametrize('name', [f.name for f in fields(bot.StrategyConfig)])
+def test_changed_strategy_parameter_misses(cache, name):
+    data = market()
+    evaluate(data, CFG, cache)
+    changed = replace(CFG, **{name: getattr(CFG, name) + 1})
+    assert not any(evaluate(data, changed, cache).values())
+    # Kembali ke parameter lama: hasil untuk konfigurasi lain sudah dibuang
+    assert not any(evaluate(data, CFG, cache).values())
+    assert all(evaluate(data, CFG, cache).values())
+
+
+def test_changed_parameter_survives_restart(cache):
+    data = market()
+    evaluate(data, CFG, cache)
+    cache.save()
+    cache.load()
+    assert not any(evaluate(data, replace(CFG, score_buy=CFG.score_buy - 5), cache).values())
@@ -0,0 +1,35 @@
+import io
+import json
+import sys
+
+from eventlog import INFO, EventLog
+
+
+def test_json_format_keeps_stdout_line_parseable(monkeypatch):
+    stdout, stderr = io.StringIO(), io.StringIO()
+    monkeypatch.setattr(sys, 'stdout', stdout)
+    monkeypatch.setattr(sys, 'stderr', stderr)
+    log = EventLog(INFO, 'json')
+    log.claim_stdout()
+    print("📡 Mengambil data 3 pair...")
+    log.info('pair', "🔎 {pair}", pair='AAAUSDT', stage='scan')
+    print("❌ Gagal simpan cooldown: disk penuh")
+    log.warning('skip', pair='BBBUSDT', stage='fetch', reason='missing_data')
+    assert log.flush()
+
+    events = [json.loads(line) for line in stdout.getvalue().splitlines()]
+    assert [event['event'] for event in events] == ['pair', 'skip']
+    assert events[0]['pair'] == 'AAAUSDT' and events[1]['level'] == 'warning'
+    assert stderr.getvalue().splitlines() == ["📡 Mengambil data 3 pair...", "❌ Gagal simpan cooldown: disk penuh"]
+
+
+def test_text_format_leaves_stdout_alone(monkeypatch):
+    stdout = io.StringIO()
+    monkeypatch.setattr(sys, 'stdout', stdout)
+    log = EventLog(INFO, 'text')
+    log.claim_stdout()
+    print("banner")
+    log.info('pair', "🔎 {pair}", pair='AAAUSDT')
+    assert log.flush()
+    assert sys.stdout is stdout
+    assert stdout.getvalue().splitlines() == ["banner", "🔎 AAAUSDT"]
@@ -0,0 +1,142 @@
+import json
+import os
+from datetime import datetime
+
+import pytest
+
+import crypto_signal_bot as bot
+import exit_monitor
+from records import Position
+from state_store import JsonStateFile
+
+OPENED = datetime(2024, 1, 1, 8, tzinfo=bot.UTC7)
+
+
+@pytest.fixture
+def state(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(bot, 'ACTIVE_BUYS_STORE', JsonStateFile(bot.ACTIVE_BUYS_FILE))
+    monkeypatch.setattr(bot, 'COOLDOWNS_STORE', JsonStateFile(bot.COOLDOWNS_FILE))
+    monkeypatch.setattr(bot, 'ACTIVE_BUYS', {})
+    monkeypatch.setattr(bot, 'COOLDOWNS', {})
+    monkeypatch.setattr(bot, 'send_telegram_alert', lambda *args, **kwargs: None)
+    trades = []
+    monkeypatch.setattr(bot, 'record_trade', trades.append)
+    return trades
+
+
+def position(**overrides):
+    fields = dict(price=100.0, time=OPENED, stop_loss=95.0, entry_atr=2.0, highest_price=100.0)
+    fields.update(overrides)
+    return Position(**fields)
+
+
+def write_external(positions):
+    # Tulisan proses lain (run terjadwal / --daemon); mtime dimajukan supaya pasti berbeda
+    with open(bot.ACTIVE_BUYS_FILE, 'w') as f:
+        json.dump({pair: p.to_json() for pair, p in positions.items()}, f)
+    stat = os.stat(bot.ACTIVE_BUYS_FILE)
+    os.utime(bot.ACTIVE_BUYS_FILE, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+
+def read_disk():
+    with open(bot.ACTIVE_BUYS_FILE) as f:
+        return {pair: Position.from_json(d) for pair, d in json.load(f).items()}
+
+
+def start_monitor(positions):
+    write_external(positions)
+    bot.load_active_buys()
+    monitor = exit_monitor.ExitMonitor()
+    monitor.rebuild()
+    return monitor
+
+
+def test_flush_keeps_positions_opened_elsewhere(state):
+    monitor = start_monitor({'AAAUSDT': position()})
+    monitor.on_tick('AAAUSDT', 120.0)
+    high = bot.ACTIVE_BUYS['AAAUSDT'].highest_price
+    assert high == 120.0 and monitor.dirty
+
+    # Run terjadwal membuka posisi baru dengan salinan AAA yang lebih lama
+    write_external({'AAAUSDT': position(), 'BBBUSDT': position(price=50.0, stop_loss=48.0, entry_atr=1.0)})
+    monitor.flush()
+
+    disk = read_disk()
+    assert set(disk) == {'AAAUSDT', 'BBBUSDT'}
+    assert disk['AAAUSDT'].highest_price == high
+    assert disk['AAAUSDT'].trailing_active and disk['AAAUSDT'].break_even_active
+    assert disk['AAAUSDT'].stop_loss == 100.0
+    assert 'BBBUSDT' in monitor.pairs()
+
+
+def test_position_closed_elsewhere_is_not_closed_again(state):
+    monitor = start_monitor({'AAAUSDT': position()})
+    write_external({})
+    monitor.on_tick('AAAUSDT', 90.0)
+    assert state == []
+    assert monitor.stats['exits'] == 0
+    assert read_disk() == {}
+
+
+def test_stale_write_does_not_resurrect_closed_position(state):
+    monitor = start_monitor({'AAAUSDT': position(), 'BBBUSDT': position()})
+    monitor.on_tick('AAAUSDT', 90.0)
+    assert [trade['pair'] for trade in state] == ['AAAUSDT']
+    assert 'AAAUSDT' in bot.COOLDOWNS
+
+    # Proses lain menulis ulang salinan lama (masih berisi AAA) + cooldown tanpa AAA
+    write_external({'AAAUSDT': position(), 'BBBUSDT': position()})
+    with open(bot.COOLDOWNS_FILE, 'w') as f:
+        json.dump({}, f)
+    os.utime(bot.COOLDOWNS_FILE, ns=(0, os.stat(bot.COOLDOWNS_FILE).st_mtime_ns + 10**9))
+    monitor.flush()
+
+    assert set(read_disk()) == {'BBBUSDT'}
+    with open(bot.COOLDOWNS_FILE) as f:
+        assert 'AAAUSDT' in json.load(f)
+    monitor.on_tick('AAAUSDT', 80.0)
+    assert len(state) == 1
+
+
+def test_reopened_position_is_kept(state):
+    monitor = start_monitor({'AAAUSDT': position()})
+    monitor.on_tick('AAAUSDT', 90.0)
+    reopened = position(time=datetime(2024, 1, 2, 8, tzinfo=bot.UTC7), price=91.0, stop_loss=87.0)
+    write_external({'AAAUSDT': reopened})
+    monitor.flush()
+    assert read_disk() == {'AAAUSDT': reopened}
+
+
+# ------------------------------------------
+# Sisi run terjadwal / --daemon
+# ------------------------------------------
+def test_daemon_does_not_close_position_closed_by_monitor(state, monkeypatch):
+    alerts = []
+    monkeypatch.setattr(bot, 'send_telegram_alert', lambda *args, **kwargs: alerts.append(args))
+    # Daemon memuat state di awal siklus, lalu monitor menutup AAA di tengah siklus
+    write_external({'AAAUSDT': position(), 'BBBUSDT': position()})
+    bot.load_active_buys()
+    write_external({'BBBUSDT': position()})
+
+    assert bot.handle_exit_signal('AAAUSDT', 'STOP_LOSS', 'SL', 90.0) is False
+    assert state == [] and alerts == []
+    assert 'AAAUSDT' not in bot.ACTIVE_BUYS and 'AAAUSDT' not in bot.COOLDOWNS
+    assert bot.handle_exit_signal('BBBUSDT', 'STOP_LOSS', 'SL', 90.0) is True
+    assert [trade['pair'] for trade in state] == ['BBBUSDT'] and len(alerts) == 1
+    assert read_disk() == {}
+
+
+def test_daemon_save_merges_changes_from_disk(state):
+    write_external({'AAAUSDT': position(), 'BBBUSDT': position()})
+    bot.load_active_buys()
+    # Daemon: trailing BBB naik, CCC dibuka. Monitor: AAA ditutup, SL BBB naik ke break even.
+    bot.ACTIVE_BUYS['BBBUSDT'].highest_price = 130.0
+    bot.ACTIVE_BUYS['CCCUSDT'] = position(price=10.0, stop_loss=9.0, entry_atr=0.2, highest_price=10.0)
+    write_external({'BBBUSDT': position(stop_loss=100.0, break_even_active=True)})
+    bot.save_active_buys()
+
+    disk = read_disk()
+    assert set(disk) == {'BBBUSDT', 'CCCUSDT'}
+    assert disk['BBBUSDT'] == position(stop_loss=100.0, break_even_active=True, highest_price=130.0)
+    assert bot.ACTIVE_BUYS == disk
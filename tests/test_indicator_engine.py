@@ -0,0 +1,221 @@
+import math
+import random
+
+import numpy as np
+import pytest
+
+from indicator_engine import VOLUME_AVG_PERIOD, IndicatorEngine, snapshot_dicts
+from records import INDICATOR_FIELDS
+
+# ==========================================
+# REFERENSI SKALAR GAYA PINE SCRIPT
+# ==========================================
+# Satu simbol, list Python, satu candle per iterasi: ta.ema / ta.rma diawali SMA
+# dari `period` nilai pertama, RSI/ATR/ADX memakai RMA (Wilder). None = na.
+N_CANDLES = 420
+LISTED_AT = 150          # Simbol terakhir baru listing di candle ini (NaN sebelumnya)
+
+
+def smooth(xs, period, alpha):
+    out, value, seed = [], None, []
+    for x in xs:
+        if x is not None:
+            if value is None:
+                seed.append(x)
+                if len(seed) == period:
+                    value = sum(seed) / period
+            else:
+                value = alpha * x + (1 - alpha) * value
+        out.append(value)
+    return out
+
+
+def ema(xs, period):
+    return smooth(xs, period, 2 / (period + 1))
+
+
+def rma(xs, period):
+    return smooth(xs, period, 1 / period)
+
+
+def reference(high, low, close, volume):
+    # Return {field: [nilai per candle]} untuk satu simbol
+    n = len(close)
+    fast, slow = ema(close, 12), ema(close, 26)
+    macd = [None if a is None or b is None else a - b for a, b in zip(fast, slow)]
+    up = [None] + [max(close[i] - close[i - 1], 0) for i in range(1, n)]
+    down = [None] + [max(close[i - 1] - close[i], 0) for i in range(1, n)]
+    rsi = []
+    for u, d in zip(rma(up, 14), rma(down, 14)):
+        if u is None or d is None:
+            rsi.append(None)
+        else:
+            rsi.append(100.0 if d == 0 else 0.0 if u == 0 else 100 - 100 / (1 + u / d))
+    tr = [high[0] - low[0]] + [max(high[i] - low[i], abs(high[i] - close[i - 1]), abs(low[i] - close[i - 1]))
+                               for i in range(1, n)]
+    plus_dm, minus_dm = [None], [None]
+    for i in range(1, n):
+        up_move, down_move = high[i] - high[i - 1], low[i - 1] - low[i]
+        plus_dm.append(up_move if up_move > down_move and up_move > 0 else 0.0)
+        minus_dm.append(down_move if down_move > up_move and down_move > 0 else 0.0)
+    dx = []
+    for t, p, m in zip(rma([None] + tr[1:], 14), rma(plus_dm, 14), rma(minus_dm, 14)):
+        if t is None or t == 0:
+            # Pine: pembagian dengan nol = na, dan na dilewati oleh rma
+            dx.append(None)
+            continue
+        plus_di, minus_di = 100 * p / t, 100 * m / t
+        di_sum = plus_di + minus_di
+        dx.append(abs(plus_di - minus_di) / (1 if di_sum == 0 else di_sum))
+    average_volume = [sum(volume[max(0, i + 1 - VOLUME_AVG_PERIOD):i + 1]) / min(i + 1, VOLUME_AVG_PERIOD)
+                      for i in range(n)]
+    return {
+        'close': list(close), 'ema10': ema(close, 10), 'ema20': ema(close, 20),
+        'ema50': ema(close, 50), 'ema200': ema(close, 200), 'macd': macd, 'macd_signal': ema(macd, 9),
+        'rsi': rsi, 'adx': [None if a is None else 100 * a for a in rma(dx, 14)], 'atr': rma(tr, 14),
+        'volume': list(volume), 'average_volume': average_volume,
+    }
+
+
+# ==========================================
+# FIXTURE KLINE (DETERMINISTIK)
+# ==========================================
+@pytest.fixture(scope='module')
+def klines():
+    # 4 simbol random walk; simbol ke-3 punya 30 candle datar, simbol terakhir baru listing di LISTED_AT
+    rng = random.Random(20240101)
+    high, low, close, volume = (np.full((4, N_CANDLES), np.nan) for _ in range(4))
+    for s in range(4):
+        price = 100.0 * (s + 1)
+        for t in range(LISTED_AT if s == 3 else 0, N_CANDLES):
+            if s == 2 and 60 <= t < 90:
+                hi = lo = price
+            else:
+                price *= math.exp(rng.gauss(0, 0.02))
+                hi, lo = price * (1 + abs(rng.gauss(0, 0.01))), price * (1 - abs(rng.gauss(0, 0.01)))
+            high[s, t], low[s, t], close[s, t], volume[s, t] = hi, lo, price, rng.uniform(1, 1000)
+    return ['AAAUSDT', 'BBBUSDT', 'FLATUSDT', 'NEWUSDT'], high, low, close, volume
+
+
+def series(array, s):
+    return [float(x) for x in array[s] if not np.isnan(x)]
+
+
+def assert_matches_reference(history, s, klines):
+    # history[field][s, t] vs referensi skalar atas candle milik simbol s saja
+    _, high, low, close, volume = klines
+    expected = reference(*(series(a, s) for a in (high, low, close, volume)))
+    offset = int(np.argmax(~np.isnan(close[s])))
+    for field in INDICATOR_FIELDS:
+        for i, want in enumerate(expected[field]):
+            got = history[field][s, offset + i]
+            if want is None:
+                assert math.isnan(got), (field, i)
+            else:
+                assert got == pytest.approx(want, rel=1e-9, abs=1e-9), (field, i)
+
+
+def test_full_run_matches_scalar_reference(klines):
+    symbols, high, low, close, volume = klines
+    history = IndicatorEngine(symbols).run(high, low, close, volume, keep_history=True)
+    for s in range(len(symbols)):
+        assert_matches_reference(history, s, klines)
+    # Sebelum listing tidak ada nilai sama sekali
+    assert np.isnan(history['ema10'][3, :LISTED_AT]).all()
+
+
+def test_monotonic_and_constant_series_edge_values():
+    # Naik terus: RSI 100; turun terus: RSI 0; konstan: RSI 100, ATR 0, DI tidak terdefinisi
+    steps = np.arange(40, dtype=float)
+    close = np.vstack([100 + steps, 100 - steps, np.full(40, 100.0)])
+    high, low, volume = close + 0.5, close - 0.5, np.ones_like(close)
+    high[2], low[2] = close[2], close[2]
+    klines = (['UPUSDT', 'DOWNUSDT', 'FLATUSDT'], high, low, close, volume)
+    history = IndicatorEngine(klines[0]).run(high, low, close, volume, keep_history=True)
+    assert list(history['rsi'][:, -1]) == [100.0, 0.0, 100.0]
+    assert history['atr'][2, -1] == 0.0
+    assert np.isnan(history['adx'][2]).all()
+    for s in range(2):
+        assert_matches_reference(history, s, klines)
+
+
+def test_incremental_updates_equal_batch(klines):
+    symbols, high, low, close, volume = klines
+    batch = IndicatorEngine(symbols)
+    batch.run(high, low, close, volume)
+    engine = IndicatorEngine(symbols)
+    for t in range(N_CANDLES):
+        engine.update(high[:, t], low[:, t], close[:, t], volume[:, t], open_time=t)
+    for field, value in batch.values().items():
+        np.testing.assert_array_equal(engine.values()[field], value, err_msg=field)
+    assert list(engine.last_time) == [N_CANDLES - 1] * len(symbols)
+
+
+def test_save_load_resume_equals_full_recompute(klines, tmp_path):
+    symbols, high, low, close, volume = klines
+    full = IndicatorEngine(symbols)
+    full.run(high, low, close, volume, open_times=list(range(N_CANDLES)))
+
+    path = str(tmp_path / 'engine.npz')
+    split = 300
+    first = IndicatorEngine(symbols[:3])
+    first.run(high[:3, :split], low[:3, :split], close[:3, :split], volume[:3, :split],
+              open_times=list(range(split)))
+    first.save(path)
+
+    # Urutan simbol berubah, NEWUSDT belum ada di state tersimpan -> mulai kosong
+    order = [3, 1, 0, 2]
+    resumed = IndicatorEngine.load(path, [symbols[s] for s in order])
+    for t in range(split, N_CANDLES):
+        column = np.array(order)
+        resumed.update(high[column, t], low[column, t], close[column, t], volume[column, t], open_time=t)
+
+    fresh = IndicatorEngine(symbols[3:])
+    fresh.run(high[3:, split:], low[3:, split:], close[3:, split:], volume[3:, split:])
+    expected = {field: value[order] for field, value in full.values().items()}
+    for field in INDICATOR_FIELDS:
+        np.testing.assert_array_equal(resumed.values()[field][1:], expected[field][1:], err_msg=field)
+        np.testing.assert_array_equal(resumed.values()[field][:1], fresh.values()[field], err_msg=field)
+    assert snapshot_dicts(resumed.symbols[1:], {f: v[1:] for f, v in resumed.values().items()}) == \
+        snapshot_dicts([symbols[s] for s in order[1:]], {f: v[1:] for f, v in expected.items()})
+
+
+def test_load_adds_and_drops_symbols(klines, tmp_path):
+    symbols, high, low, close, volume = klines
+    engine = IndicatorEngine(symbols)
+    engine.run(high, low, close, volume, open_times=list(range(N_CANDLES)))
+    path = str(tmp_path / 'engine.npz')
+    engine.save(path)
+
+    # AAA & NEW dibuang, urutan BBB/FLAT dibalik, XXX & YYY baru
+    loaded = IndicatorEngine.load(path, ['XXXUSDT', 'FLATUSDT', 'BBBUSDT', 'YYYUSDT'])
+    saved, blank = engine.state(), IndicatorEngine(['XXXUSDT']).state()
+    for key, value in loaded.state().items():
+        if key == 'symbols':
+            continue
+        np.testing.assert_array_equal(value[[2, 1]], saved[key][[1, 2]], err_msg=key)
+        for row in (0, 3):
+            np.testing.assert_array_equal(value[row], blank[key][0], err_msg=key)
+    assert list(loaded.symbols) == ['XXXUSDT', 'FLATUSDT', 'BBBUSDT', 'YYYUSDT']
+    assert list(loaded.last_time) == [-1, N_CANDLES - 1, N_CANDLES - 1, -1]
+
+
+def test_load_from_empty_state(tmp_path):
+    path = str(tmp_path / 'engine.npz')
+    IndicatorEngine([]).save(path)
+    loaded = IndicatorEngine.load(path, ['AAAUSDT'])
+    for key, value in loaded.state().items():
+        np.testing.assert_array_equal(value, IndicatorEngine(['AAAUSDT']).state()[key], err_msg=key)
+
+
+def test_preview_does_not_change_state(klines):
+    symbols, high, low, close, volume = klines
+    engine = IndicatorEngine(symbols)
+    engine.run(high[:, :-1], low[:, :-1], close[:, :-1], volume[:, :-1])
+    before = engine.state()
+    preview = engine.preview(high[:, -1], low[:, -1], close[:, -1], volume[:, -1])
+    for key, value in engine.state().items():
+        np.testing.assert_array_equal(value, before[key], err_msg=key)
+    engine.update(high[:, -1], low[:, -1], close[:, -1], volume[:, -1])
+    for field, value in engine.values().items():
+        np.testing.assert_array_equal(preview[field], value, err_msg=field)
@@ -0,0 +1,15 @@
+from metrics import METRICS_PREFIX, Metrics
+
+
+def test_counter_and_gauge_types():
+    metrics = Metrics()
+    metrics.set('telegram_sent_total', 3)
+    metrics.incr('upstream_errors', 2)
+    metrics.observe('fetch_1h', 0.5, 'BTCUSDT')
+    lines = metrics.to_prometheus().splitlines()
+    assert f"# TYPE {METRICS_PREFIX}_telegram_sent_total counter" in lines
+    assert f"# TYPE {METRICS_PREFIX}_upstream_errors gauge" in lines
+    assert f"{METRICS_PREFIX}_upstream_errors 2" in lines
+    # Setiap metrik punya tepat satu baris TYPE
+    types = [line.split()[2] for line in lines if line.startswith('# TYPE')]
+    assert len(types) == len(set(types))
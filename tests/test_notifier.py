@@ -0,0 +1,125 @@
+import json
+import threading
+import time
+
+import pytest
+
+from notifier import TelegramOutbox
+
+
+class Response:
+    def __init__(self, status_code, body=None):
+        self.status_code = status_code
+        self.body = body or {}
+
+    def json(self):
+        return self.body
+
+
+class FakeSession:
+    # Jawaban diambil berurutan dari `responses`; jika habis, selalu 200
+    def __init__(self, responses=(), gate=None):
+        self.responses = list(responses)
+        self.gate = gate
+        self.sent = []
+        self.times = []
+
+    def post(self, url, json, timeout):
+        if self.gate is not None:
+            self.gate.wait()
+        self.times.append(time.monotonic())
+        response = self.responses.pop(0) if self.responses else Response(200)
+        if response.status_code == 200:
+            self.sent.append(json['text'])
+        return response
+
+
+def outbox(tmp_path, session, **kwargs):
+    kwargs = {'backoff_base': 0.01, 'backoff_max': 0.05, **kwargs}
+    return TelegramOutbox(str(tmp_path / 'telegram_outbox.json'), 'TOKEN', 'CHAT', session=session, **kwargs)
+
+
+def read_disk(tmp_path):
+    with open(tmp_path / 'telegram_outbox.json') as f:
+        return json.load(f)
+
+
+def test_rate_limit_waits_retry_after(tmp_path):
+    session = FakeSession([Response(429, {'parameters': {'retry_after': 0.2}})])
+    box = outbox(tmp_path, session)
+    box.start()
+    box.enqueue('satu')
+    box.enqueue('dua')
+    assert box.close(timeout=5) == 0
+    assert session.sent == ['satu', 'dua']
+    # Percobaan ulang baru dilakukan setelah retry_after, pesan tidak dihitung gagal
+    assert session.times[1] - session.times[0] >= 0.2
+    assert box.stats == {'sent': 2, 'failed': 0, 'dropped': 0, 'rate_limited': 1}
+    assert read_disk(tmp_path) == []
+
+
+def test_retry_after_beyond_deadline_keeps_message(tmp_path):
+    session = FakeSession([Response(429, {'parameters': {'retry_after': 60}})])
+    box = outbox(tmp_path, session)
+    box.enqueue('tertahan')
+    assert box.close(timeout=0.2) == 1
+    assert [m['text'] for m in read_disk(tmp_path)] == ['tertahan']
+    assert read_disk(tmp_path)[0]['attempts'] == 0
+
+
+def test_pending_messages_survive_restart(tmp_path):
+    # Run pertama: Telegram error terus, pesan tetap di disk sampai close
+    box = outbox(tmp_path, FakeSession([Response(502)] * 100))
+    box.enqueue('alert', 'BUY')
+    box.enqueue('rekap', 'REKAP_MINGGUAN')
+    assert box.close(timeout=0.2) == 2
+    saved = read_disk(tmp_path)
+    assert [m['text'] for m in saved] == ['alert', 'rekap'] and saved[0]['attempts'] >= 1
+
+    # Run berikutnya (proses baru) mengirim ulang dengan id & jumlah percobaan yang sama
+    session = FakeSession()
+    restarted = outbox(tmp_path, session)
+    restarted.load()
+    assert restarted.pending == saved
+    restarted.start()
+    assert restarted.close(timeout=5) == 0
+    assert session.sent == ['alert', 'rekap']
+    assert read_disk(tmp_path) == []
+
+
+def test_rejected_message_is_dropped(tmp_path):
+    session = FakeSession([Response(400, {'description': "can't parse entities"})])
+    box = outbox(tmp_path, session)
+    box.enqueue('*rusak')
+    box.enqueue('baik')
+    assert box.close(timeout=5) == 0
+    assert session.sent == ['baik'] and box.stats['dropped'] == 1
+
+
+def test_enqueue_does_not_write_per_message(tmp_path, monkeypatch):
+    writes = []
+    box = outbox(tmp_path, FakeSession())
+    monkeypatch.setattr(box, '_persist', lambda: writes.append(len(box.pending)))
+    for i in range(50):
+        box.enqueue(f'pesan {i}')
+    # Belum ada thread pengirim: tidak ada satu pun tulis ke disk di loop scan
+    assert writes == []
+
+
+def test_close_timeout_keeps_single_sender(tmp_path):
+    gate = threading.Event()
+    session = FakeSession(gate=gate)
+    box = outbox(tmp_path, session, timeout=0)
+    box.enqueue('lambat')
+    # POST tertahan melewati batas join: referensi thread dipertahankan
+    assert box.close(timeout=0.1) == 1
+    assert box._thread is not None and box._thread.is_alive()
+    box.start()
+    box.enqueue('berikutnya')
+    assert [t.name for t in threading.enumerate()].count('telegram-outbox') == 1
+
+    gate.set()
+    assert box.close(timeout=5) == 0
+    assert session.sent == ['lambat', 'berikutnya']
+    assert box._thread is None
+    assert read_disk(tmp_path) == []
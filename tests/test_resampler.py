@@ -0,0 +1,94 @@
+import numpy as np
+
+from resampler import CandleBuffer, first_full_bucket, resample
+
+HOUR = 3600 * 1000
+H4 = 4 * HOUR
+DAY = 24 * HOUR
+START = 1_700_000_000_000 // DAY * DAY      # Awal hari UTC
+
+
+def hourly(first, count, price=100.0):
+    # Kline 1H format Binance: [open_time, open, high, low, close, volume, close_time]
+    rows = []
+    for j in range(count):
+        t = first + j * HOUR
+        p = price + j
+        rows.append([t, str(p), str(p + 2), str(p - 1), str(p + 0.5), str(10 + j), t + HOUR - 1])
+    return rows
+
+
+def test_resample_aggregates_aligned_buckets():
+    klines = hourly(START, 8)
+    closed, forming = resample(klines, H4, now_ms=START + 8 * HOUR)
+    assert forming is None
+    assert [bar[0] for bar in closed] == [START, START + H4]
+    first = closed[0]
+    assert first == [START, 100.0, 105.0, 99.0, 103.5, 10 + 11 + 12 + 13, START + H4 - 1]
+    assert closed[1][1] == 104.0 and closed[1][4] == 107.5
+
+
+def test_resample_bucket_boundaries_follow_epoch():
+    # Data dimulai di tengah bucket 4H: bucket pertama tetap di floor(open_time / 4H)
+    klines = hourly(START + 2 * HOUR, 6)
+    closed, forming = resample(klines, H4, now_ms=START + 8 * HOUR)
+    assert [bar[0] for bar in closed] == [START, START + H4]
+    assert closed[0][5] == 10 + 11                       # Hanya 2 candle dasar di bucket pertama
+    assert first_full_bucket(START + 2 * HOUR, H4) == START + H4
+    assert first_full_bucket(START, H4) == START
+
+
+def test_resample_forming_candle_and_after():
+    klines = hourly(START, 7)                            # Candle ke-8 bucket kedua belum ada
+    closed, forming = resample(klines, H4, now_ms=START + 6 * HOUR + 30 * 60 * 1000)
+    assert [bar[0] for bar in closed] == [START]
+    assert forming[0] == START + H4 and forming[4] == 106.5 and forming[5] == 14 + 15 + 16
+    # Tepat di close_time bucket kedua candle masih berjalan, 1 ms sesudahnya sudah tertutup
+    assert resample(klines, H4, now_ms=START + 2 * H4 - 1)[1] is not None
+    assert resample(klines, H4, now_ms=START + 2 * H4)[1] is None
+    closed, _ = resample(klines, H4, now_ms=START + 2 * H4, after=START)
+    assert [bar[0] for bar in closed] == [START + H4]
+
+
+def test_candle_buffer_ring_and_rows():
+    buffer = CandleBuffer(['AAAUSDT'], capacity=4)
+    buffer.extend(0, hourly(START, 3))
+    buffer.extend(0, hourly(START, 6))                   # 3 candle pertama sudah ada, dilewati
+    rows = buffer.rows(0, HOUR)
+    assert [row[0] for row in rows] == [START + j * HOUR for j in range(2, 6)]
+    assert rows[0] == [START + 2 * HOUR, 102.0, 104.0, 101.0, 102.5, 12.0, START + 3 * HOUR - 1]
+    assert buffer.count[0] == 4 and buffer.last_time[0] == START + 5 * HOUR
+
+
+def test_candle_buffer_save_load_round_trip(tmp_path):
+    path = str(tmp_path / 'buffer.npz')
+    buffer = CandleBuffer(['AAAUSDT', 'BBBUSDT', 'CCCUSDT'], capacity=4)
+    buffer.extend(0, hourly(START, 6))
+    buffer.extend(1, hourly(START, 2, price=50.0))
+    buffer.extend(2, hourly(START, 3, price=10.0))
+    buffer.save(path)
+
+    # CCC dibuang, urutan dibalik, DDD baru
+    loaded = CandleBuffer.load(path, ['DDDUSDT', 'BBBUSDT', 'AAAUSDT'])
+    assert loaded.capacity == 4
+    assert loaded.rows(2, HOUR) == buffer.rows(0, HOUR)
+    assert loaded.rows(1, HOUR) == buffer.rows(1, HOUR)
+    assert loaded.rows(0, HOUR) == [] and loaded.last_time[0] == -1
+    # Sesudah dimuat, extend melanjutkan ring buffer persis seperti aslinya
+    buffer.extend(0, hourly(START, 8))
+    loaded.extend(2, hourly(START, 8))
+    assert loaded.rows(2, HOUR) == buffer.rows(0, HOUR)
+
+    empty = CandleBuffer.load(path, ['XXXUSDT'])
+    np.testing.assert_array_equal(empty.times, CandleBuffer(['XXXUSDT'], 4).times)
+
+
+def test_candle_buffer_capacity_change_discards_state(tmp_path):
+    path = str(tmp_path / 'buffer.npz')
+    buffer = CandleBuffer(['AAAUSDT'], capacity=4)
+    buffer.extend(0, hourly(START, 4))
+    buffer.save(path)
+    resized = CandleBuffer.load(path, ['AAAUSDT'], capacity=8)
+    assert resized.capacity == 8 and resized.rows(0, HOUR) == []
+    same = CandleBuffer.load(path, ['AAAUSDT'], capacity=4)
+    assert same.rows(0, HOUR) == buffer.rows(0, HOUR)
@@ -0,0 +1,24 @@
+import numpy as np
+import pytest
+
+from risk import portfolio_correlation
+
+
+def test_portfolio_correlation_equals_inverse_vol_weighted_portfolio():
+    # Korelasi langsung kandidat vs return portofolio berbobot 1/vol == rumus dari matriks korelasi
+    rng = np.random.default_rng(3)
+    mixing = rng.normal(size=(5, 5))
+    returns = (rng.normal(size=(2000, 5)) @ mixing) * np.array([0.01, 0.05, 0.002, 0.03, 0.2])
+    vol = returns.std(axis=0)
+    corr = np.corrcoef(returns, rowvar=False)
+    held = [1, 2, 4]
+    portfolio = returns[:, held] @ (1 / vol[held])
+    expected = np.corrcoef(returns[:, 0], portfolio)[0, 1]
+    assert portfolio_correlation(corr, 0, held) == pytest.approx(expected, rel=1e-9)
+
+
+def test_portfolio_correlation_unknown_pairs_count_as_zero():
+    corr = np.array([[1.0, np.nan, 0.5], [np.nan, 1.0, np.nan], [0.5, np.nan, 1.0]])
+    assert portfolio_correlation(corr, 0, []) == 0.0
+    assert portfolio_correlation(corr, 0, [1]) == 0.0
+    assert portfolio_correlation(corr, 0, [1, 2]) == pytest.approx(0.5 / np.sqrt(2))
@@ -0,0 +1,92 @@
+from datetime import datetime
+
+import crypto_signal_bot as bot
+from records import Position
+from scheduler import TIER_POSITIONS, TIER_UNIVERSE, TIER_WATCH, ScanSchedule, waves
+
+OPENED = datetime(2024, 1, 1, 8, tzinfo=bot.UTC7)
+NOW = 1_700_000_000.0
+UNIVERSE = [f'P{i:02d}USDT' for i in range(20)]
+SHARD = '0/1'
+
+
+def position(stop_loss):
+    return Position(price=100.0, time=OPENED, stop_loss=stop_loss, entry_atr=2.0, highest_price=100.0)
+
+
+def run_cycle(schedule, positions, budget, wave_size=4):
+    # Tiruan loop gelombang run_analysis: budget dalam jumlah pair, gelombang pertama selalu jalan
+    tiers = schedule.plan(UNIVERSE, positions, SHARD, now=NOW)
+    universe_tier = set(dict(tiers)[TIER_UNIVERSE])
+    done, deferred = [], []
+    for index, wave in enumerate(waves(tiers, wave_size)):
+        if index > 0 and (len(done) + len(wave) > budget or deferred):
+            deferred.extend(wave)
+            continue
+        done.extend(wave)
+    schedule.defer(SHARD, [pair for pair in deferred if pair in universe_tier])
+    return done, deferred
+
+
+def test_held_and_watched_pairs_come_first(tmp_path):
+    schedule = ScanSchedule(str(tmp_path / 'scan_schedule.json'))
+    positions = {'P10USDT': position(90.0), 'P15USDT': position(99.0), 'P03USDT': position(80.0)}
+    schedule.record_price('P10USDT', 100.0)
+    schedule.record_price('P15USDT', 100.0)           # Paling dekat ke SL
+    schedule.record_watch('P07USDT', 55, now=NOW - 60)
+    schedule.record_watch('P12USDT', 65, now=NOW - 120)
+    schedule.record_watch('P01USDT', 60, now=NOW - 48 * 3600)   # Sudah kedaluwarsa
+
+    tiers = dict(schedule.plan(UNIVERSE, positions, SHARD, now=NOW))
+    # Harga belum diketahui (P03) = paling mendesak
+    assert tiers[TIER_POSITIONS] == ['P03USDT', 'P15USDT', 'P10USDT']
+    assert tiers[TIER_WATCH] == ['P12USDT', 'P07USDT']
+    assert 'P01USDT' in tiers[TIER_UNIVERSE] and len(tiers[TIER_UNIVERSE]) == 15
+
+    done, deferred = run_cycle(schedule, positions, budget=8)
+    assert done[:5] == ['P03USDT', 'P15USDT', 'P10USDT', 'P12USDT', 'P07USDT']
+    assert len(done) == 8 and set(done) | set(deferred) == set(UNIVERSE)
+
+
+def test_positions_never_deferred(tmp_path):
+    schedule = ScanSchedule(str(tmp_path / 'scan_schedule.json'))
+    positions = {pair: position(90.0) for pair in UNIVERSE[:6]}
+    done, deferred = run_cycle(schedule, positions, budget=0, wave_size=4)
+    # Gelombang pertama memuat semua posisi walaupun melebihi ukuran gelombang
+    assert done == UNIVERSE[:6]
+    assert deferred == UNIVERSE[6:]
+
+
+def test_deferred_pairs_carry_over(tmp_path):
+    path = str(tmp_path / 'scan_schedule.json')
+    schedule = ScanSchedule(path)
+    done, deferred = run_cycle(schedule, {}, budget=8)
+    assert done == UNIVERSE[:8] and deferred[0] == 'P08USDT'
+    schedule.save({}, now=NOW)
+
+    # Run berikutnya (proses baru) melanjutkan dari pair pertama yang ditunda
+    resumed = ScanSchedule(path)
+    resumed.load()
+    done, _ = run_cycle(resumed, {}, budget=8)
+    assert done == UNIVERSE[8:16]
+    done, _ = run_cycle(resumed, {}, budget=8)
+    assert done == UNIVERSE[16:] + UNIVERSE[:4]
+
+    # Semua pair selesai dalam satu run: kursor dihapus, mulai lagi dari awal
+    done, deferred = run_cycle(resumed, {}, budget=len(UNIVERSE))
+    assert deferred == [] and SHARD not in resumed.cursor
+    assert run_cycle(resumed, {}, budget=4)[0] == UNIVERSE[:4]
+
+
+def test_save_drops_stale_prices_and_watch(tmp_path):
+    path = str(tmp_path / 'scan_schedule.json')
+    schedule = ScanSchedule(path, watch_hours=1)
+    schedule.record_price('P01USDT', 10.0)
+    schedule.record_price('P02USDT', 20.0)
+    schedule.record_watch('P03USDT', 50, now=NOW - 7200)
+    schedule.record_watch('P04USDT', 50, now=NOW - 60)
+    schedule.save({'P02USDT': position(15.0)}, now=NOW)
+    loaded = ScanSchedule(path, watch_hours=1)
+    loaded.load()
+    assert loaded.last_price == {'P02USDT': 20.0}
+    assert list(loaded.watch) == ['P04USDT']
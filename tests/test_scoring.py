@@ -0,0 +1,190 @@
+import math
+from dataclasses import replace
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+import crypto_signal_bot as bot
+from eval_cache import EvaluationCache
+from records import INDICATOR_FIELDS, IndicatorSnapshot
+from scoring import SIGNAL_NAMES, render_reasons, render_vetoes
+
+# ==========================================
+# SCORING BATCH == calculate_entry_score (SKALAR)
+# ==========================================
+# Default STRATEGY selalu kena veto RR (3x ATR / 2.5x ATR < 2), jadi varian
+# dengan SL lebih sempit ikut diuji supaya jalur skor & alasan benar-benar terpakai.
+CONFIGS = {
+    'default': bot.STRATEGY,
+    'tight_sl': replace(bot.STRATEGY, atr_sl_multiplier=1.0),
+    'rr_boundary': replace(bot.STRATEGY, atr_sl_multiplier=1.5),
+    'loose': replace(bot.STRATEGY, atr_sl_multiplier=1.0, rsi_overbought_veto=100, min_atr_pct=0.0,
+                     max_distance_from_ema20_pct=100, score_watch=20, score_buy=40, score_buy_strong=60),
+}
+TIMEFRAMES = bot.TIMEFRAMES
+TF_TREND, TF_SETUP, TF_ENTRY = TIMEFRAMES
+
+BASE = {
+    TF_TREND: dict(close=110.0, ema10=108.0, ema20=106.0, ema50=100.0, ema200=90.0, macd=1.0, macd_signal=0.5,
+                   rsi=60.0, adx=30.0, atr=4.0, volume=1000.0, average_volume=800.0),
+    TF_SETUP: dict(close=101.0, ema10=100.5, ema20=100.0, ema50=98.0, ema200=95.0, macd=0.3, macd_signal=0.2,
+                   rsi=52.0, adx=22.0, atr=2.0, volume=500.0, average_volume=400.0),
+    TF_ENTRY: dict(close=101.0, ema10=100.8, ema20=100.5, ema50=100.0, ema200=99.0, macd=0.15, macd_signal=0.1,
+                   rsi=58.0, adx=20.0, atr=1.5, volume=900.0, average_volume=400.0),
+}
+
+
+def market(overrides=None):
+    # {tf: {field: nilai}} -> {tf: IndicatorSnapshot} di atas baseline yang skornya tinggi
+    overrides = overrides or {}
+    return {tf: IndicatorSnapshot(**{**BASE[tf], **overrides.get(tf, {})}) for tf in TIMEFRAMES}
+
+
+def assert_equivalent(cases, cfg):
+    # cases: {pair: {tf: IndicatorSnapshot}}. Candidate filter sama dengan analyze_pairs.
+    pairs = [pair for pair, data in cases.items() if data[TF_ENTRY].close != 0]
+    rows, batch = bot.score_entries(pairs, cases, cfg)
+    for pair in pairs:
+        row = rows[pair]
+        data_1d, data_4h, data_1h = (cases[pair][tf] for tf in TIMEFRAMES)
+        price, atr = data_1h.close, data_1h.atr
+        sl_price = price - (cfg.atr_sl_multiplier * atr) if atr > 0 else price * 0.95
+        assert batch['price'][row] == price or (math.isnan(price) and math.isnan(batch['price'][row]))
+        assert batch['sl_price'][row] == sl_price or (math.isnan(sl_price) and math.isnan(batch['sl_price'][row]))
+
+        signal, score, reasons, _, vetoes = bot.check_entry(pair, data_1d, data_4h, data_1h, price, sl_price, cfg)
+        assert SIGNAL_NAMES[batch['signal'][row]] == signal, pair
+        assert int(batch['score'][row]) == score, pair
+        mask, rules = batch['vetoes'][row], batch['rules'][row]
+        assert render_vetoes(mask, data_1d, data_4h, data_1h, price, sl_price, cfg) == vetoes, pair
+        if vetoes:
+            assert rules == 0, pair
+        else:
+            assert mask == 0, pair
+            assert render_reasons(rules, data_1d, data_4h, data_1h, price) == reasons, pair
+    return rows, batch
+
+
+# ------------------------------------------
+# Kasus tepi
+# ------------------------------------------
+def edge_cases(cfg):
+    cases = {'BASE': {}}
+    for tf in TIMEFRAMES:
+        name = tf.replace(' ', '')
+        for field in INDICATOR_FIELDS:
+            cases[f'NAN_{name}_{field}'] = {tf: {field: math.nan}}
+            cases[f'ZERO_{name}_{field}'] = {tf: {field: 0.0}}
+    price = BASE[TF_ENTRY]['close']
+    ema20_4h = BASE[TF_SETUP]['ema20']
+    cases.update({
+        # Veto tepat di batas dan sedikit di atasnya
+        'RSI_OB_EQ': {TF_ENTRY: {'rsi': cfg.rsi_overbought_veto}},
+        'RSI_OB_UP': {TF_ENTRY: {'rsi': math.nextafter(cfg.rsi_overbought_veto, math.inf)}},
+        'DIST_EQ': {TF_SETUP: {'ema20': price / (1 + cfg.max_distance_from_ema20_pct / 100)}},
+        'DIST_UP': {TF_SETUP: {'ema20': price / (1 + cfg.max_distance_from_ema20_pct / 100) * 0.999}},
+        'ATR_PCT_EQ': {TF_ENTRY: {'atr': price * cfg.min_atr_pct}},
+        'ATR_PCT_DOWN': {TF_ENTRY: {'atr': math.nextafter(price * cfg.min_atr_pct, 0)}},
+        'DOWNTREND': {TF_TREND: {'close': 80.0, 'ema50': 90.0, 'ema200': 100.0}},
+        'DOWNTREND_EQ': {TF_TREND: {'close': 90.0, 'ema50': 90.0, 'ema200': 100.0}},
+        # Batas aturan skor
+        'ADX_EQ': {TF_TREND: {'adx': 25.0}},
+        'RSI_4H_LOW': {TF_SETUP: {'rsi': 45.0}},
+        'RSI_4H_HIGH': {TF_SETUP: {'rsi': 60.0}},
+        'RSI_1H_LOW': {TF_ENTRY: {'rsi': 50.0}},
+        'RSI_1H_HIGH': {TF_ENTRY: {'rsi': 65.0}},
+        'PULLBACK_EQ': {TF_SETUP: {'ema20': price / 1.02}},
+        'PULLBACK_FAR': {TF_SETUP: {'ema20': price / 1.05}},
+        'MACD_4H_FRESH_EQ': {TF_SETUP: {'macd': 0.2 + price * 0.002}},
+        'MACD_1H_FRESH_EQ': {TF_ENTRY: {'macd': 0.1 + price * 0.002}},
+        'MACD_FLAT': {TF_SETUP: {'macd': 0.2}, TF_ENTRY: {'macd': 0.1}},
+        'VOLUME_EQ': {TF_ENTRY: {'volume': 1.5 * 400.0}},
+        'STRONG_EQ': {TF_TREND: {'ema20': 100.0}},
+        'EMA20_4H_ZERO_EMA50_ZERO': {TF_SETUP: {'ema20': 0.0, 'ema50': 0.0}},
+        'EMA20_4H_NEAR': {TF_SETUP: {'ema20': ema20_4h, 'ema50': ema20_4h}},
+        'ATR_ZERO_RSI_OB': {TF_ENTRY: {'atr': 0.0, 'rsi': 90.0}},
+        'ALL_VETOES': {TF_ENTRY: {'rsi': 99.0, 'atr': 0.01}, TF_SETUP: {'ema20': 50.0}},
+    })
+    return {pair: market(overrides) for pair, overrides in cases.items()}
+
+
+@pytest.mark.parametrize('name', sorted(CONFIGS))
+def test_edge_cases_match_scalar(name):
+    assert_equivalent(edge_cases(CONFIGS[name]), CONFIGS[name])
+
+
+@pytest.mark.parametrize('field', INDICATOR_FIELDS)
+def test_missing_tradingview_values_match_scalar(field):
+    # None / nilai non-numerik dari scanner diubah extract_indicators ke default-nya
+    cases = {}
+    for tf in TIMEFRAMES:
+        indicators = {'close': BASE[tf]['close'], 'EMA10': BASE[tf]['ema10'], 'EMA20': BASE[tf]['ema20'],
+                      'EMA50': BASE[tf]['ema50'], 'EMA200': BASE[tf]['ema200'], 'MACD.macd': BASE[tf]['macd'],
+                      'MACD.signal': BASE[tf]['macd_signal'], 'RSI': BASE[tf]['rsi'], 'ADX': BASE[tf]['adx'],
+                      'ATR': BASE[tf]['atr'], 'Volume': BASE[tf]['volume'],
+                      'average_volume': BASE[tf]['average_volume']}
+        key = dict(zip(INDICATOR_FIELDS, indicators))[field]
+        for pair, value in ((f'NONE_{tf}', None), (f'TEXT_{tf}', 'n/a')):
+            data = market()
+            data[tf] = bot.extract_indicators(SimpleNamespace(indicators={**indicators, key: value}))
+            cases[pair] = data
+    for cfg in CONFIGS.values():
+        assert_equivalent(cases, cfg)
+
+
+# ------------------------------------------
+# Acak
+# ------------------------------------------
+SNAP = {'rsi': (45.0, 50.0, 60.0, 65.0, 75.0), 'adx': (25.0,)}
+
+
+def random_cases(rng, n):
+    cases = {}
+    for i in range(n):
+        base = 100 * math.exp(rng.normal(0, 1))
+        data = {}
+        for tf in TIMEFRAMES:
+            values = {field: base * rng.uniform(0.9, 1.1) for field in ('close', 'ema10', 'ema20', 'ema50', 'ema200')}
+            values['macd'] = base * rng.normal(0, 0.005)
+            values['macd_signal'] = values['macd'] + base * rng.normal(0, 0.003)
+            values['rsi'] = rng.uniform(20, 90)
+            values['adx'] = rng.uniform(10, 40)
+            values['atr'] = base * rng.uniform(0, 0.04)
+            values['average_volume'] = rng.uniform(0, 1000)
+            values['volume'] = values['average_volume'] * rng.uniform(0, 3)
+            for field, choices in SNAP.items():
+                if rng.random() < 0.2:
+                    values[field] = float(rng.choice(choices))
+            for field in INDICATOR_FIELDS:
+                roll = rng.random()
+                if roll < 0.02:
+                    values[field] = math.nan
+                elif roll < 0.04 and not (tf == TF_ENTRY and field == 'close'):
+                    values[field] = 0.0
+            data[tf] = IndicatorSnapshot(**values)
+        cases[f'R{i:05d}'] = data
+    return cases
+
+
+@pytest.mark.parametrize('name', sorted(CONFIGS))
+def test_random_inputs_match_scalar(name):
+    rng = np.random.default_rng(sorted(CONFIGS).index(name))
+    _, batch = assert_equivalent(random_cases(rng, 2000), CONFIGS[name])
+    if name == 'loose':
+        # Jalur skor benar-benar teruji, bukan hanya veto
+        assert (batch['vetoes'] == 0).sum() > 500
+        assert (batch['score'] >= CONFIGS[name].score_buy).any()
+
+
+def test_cached_scores_match_batch(tmp_path):
+    cfg = CONFIGS['loose']
+    cases = random_cases(np.random.default_rng(7), 300)
+    pairs = list(cases)
+    _, expected = bot.score_entries(pairs, cases, cfg)
+    cache = EvaluationCache(str(tmp_path / 'eval_cache.json'))
+    for _ in range(2):
+        _, batch = bot.score_entries(pairs, cases, cfg, cache=cache)
+        for name in ('score', 'signal', 'vetoes', 'rules'):
+            assert np.array_equal(batch[name], expected[name]), name
+    assert batch['reused'].all()
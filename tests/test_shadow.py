@@ -0,0 +1,61 @@
+from datetime import datetime
+
+import pytest
+
+import crypto_signal_bot as bot
+from records import IndicatorSnapshot, Position
+from shadow import ShadowStrategy
+
+NOW = datetime(2024, 1, 10, 8, tzinfo=bot.UTC7)
+DOWNTREND = IndicatorSnapshot(close=80.0, ema10=82.0, ema20=85.0, ema50=90.0, ema200=100.0, rsi=35.0, atr=2.0)
+UPTREND = IndicatorSnapshot(close=120.0, ema10=118.0, ema20=115.0, ema50=110.0, ema200=100.0, rsi=55.0, atr=2.0)
+
+
+@pytest.fixture
+def shadow(tmp_path, monkeypatch):
+    strategy = ShadowStrategy('test', bot.STRATEGY, bot.TIMEFRAMES, bot.UTC7, root=str(tmp_path))
+    monkeypatch.setattr(bot, 'SHADOWS', [strategy])
+    monkeypatch.setattr(bot, 'ACTIVE_BUYS', {})
+    monkeypatch.setattr(bot, 'DATA_SOURCE', 'tradingview')
+    return strategy
+
+
+@pytest.fixture
+def fetches(monkeypatch):
+    # Fetch palsu: tiap timeframe mengembalikan snapshot per pair, request dicatat
+    calls = []
+    market = {'AAAUSDT': DOWNTREND, 'BBBUSDT': UPTREND, 'CCCUSDT': DOWNTREND}
+
+    def fetch(pairs, intervals):
+        calls.append((list(pairs), tuple(intervals)))
+        return {pair: {tf: market[pair] for tf in intervals} for pair in pairs}, {}
+
+    monkeypatch.setattr(bot, 'fetch_all_timeframes', fetch)
+    return calls
+
+
+def test_shadow_position_survives_live_daily_prefilter(shadow, fetches):
+    shadow.positions['AAAUSDT'] = Position(price=100.0, time=NOW, stop_loss=95.0, entry_atr=2.0,
+                                           highest_price=100.0)
+    pairs = ['AAAUSDT', 'BBBUSDT', 'CCCUSDT']
+    data, filtered, stages = bot.fetch_staged(pairs)
+
+    # Live tetap memveto kedua pair downtrend, tapi 4H/1H pair milik shadow tetap diambil
+    assert filtered == {'AAAUSDT', 'CCCUSDT'}
+    assert fetches[1] == (['BBBUSDT', 'AAAUSDT'], (bot.TF_SETUP, bot.TF_ENTRY))
+    assert data['AAAUSDT'][bot.TF_ENTRY] is DOWNTREND
+    assert bot.TF_ENTRY not in data['CCCUSDT']
+    assert stages['prefilter'] == 1
+
+    shadow.evaluate(pairs, data, filtered, now=NOW)
+    assert 'AAAUSDT' not in shadow.positions
+    assert shadow.cycle['EXIT'] == 1
+    assert shadow.cooldowns['AAAUSDT'].active(NOW)
+
+
+def test_wave_of_shadow_positions_uses_single_fetch(shadow, fetches):
+    shadow.positions['AAAUSDT'] = Position(price=100.0, time=NOW, stop_loss=95.0, entry_atr=2.0)
+    data, filtered, _ = bot.fetch_staged(['AAAUSDT'])
+    assert fetches == [(['AAAUSDT'], bot.TIMEFRAMES)]
+    assert filtered == {'AAAUSDT'}
+    assert data['AAAUSDT'][bot.TF_ENTRY] is DOWNTREND
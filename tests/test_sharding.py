@@ -0,0 +1,136 @@
+import itertools
+import json
+import os
+from datetime import datetime
+
+import pytest
+
+import crypto_signal_bot as bot
+import shard_merge
+from records import Position
+from sharding import owns, parse_shard, shard_of
+from state_store import TradeLog
+from trade_stats import TradeStats
+
+PAIRS = ['BTCUSDT', 'ETHUSDT', 'SOLUSDT', 'ADAUSDT', 'XRPUSDT', 'DOGEUSDT', 'AVAXUSDT', 'LINKUSDT']
+OPENED = datetime(2024, 1, 1, 8, tzinfo=bot.UTC7)
+
+
+def test_crc32_assignment_is_stable():
+    # Nilai tetap: berubah = posisi pindah shard di tengah jalan
+    assert [shard_of(pair, 4) for pair in PAIRS] == [3, 0, 0, 1, 0, 2, 1, 0]
+    assert [shard_of(pair, 3) for pair in PAIRS] == [0, 0, 2, 2, 1, 2, 2, 0]
+    assert shard_of('btcusdt', 4) == shard_of('BTCUSDT', 4)
+    for pair in PAIRS:
+        assert [owns(pair, index, 4) for index in range(4)].count(True) == 1
+        assert owns(pair, 0, 1)
+
+
+def test_parse_shard():
+    assert parse_shard('2/4') == (2, 4)
+    for text in ('4/4', '-1/4', '0/0', 'a/b', '1'):
+        with pytest.raises(ValueError):
+            parse_shard(text)
+
+
+# ------------------------------------------
+# Merge
+# ------------------------------------------
+def position(price):
+    return Position(price=price, time=OPENED, stop_loss=price * 0.9, entry_atr=price * 0.02, highest_price=price)
+
+
+def trade(pair, day):
+    return {'pair': pair, 'entry_price': 100.0, 'exit_price': 105.0, 'profit_pct': 5.0,
+            'exit_reason': 'TRAILING_STOP', 'entry_date': '2024-01-01T08:00:00+07:00',
+            'exit_date': f'2024-01-{day:02d}T08:00:00+07:00'}
+
+
+def use_workdir(directory, monkeypatch):
+    os.makedirs(directory, exist_ok=True)
+    monkeypatch.chdir(directory)
+    monkeypatch.setattr(bot, 'TRADE_LOG', TradeLog(bot.TRADE_HISTORY_FILE))
+    monkeypatch.setattr(bot, 'TRADE_STATS', TradeStats(bot.TRADE_STATS_FILE, bot.UTC7))
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    use_workdir(tmp_path, monkeypatch)
+    return tmp_path
+
+
+def write_shard(index, positions, trades=()):
+    directory = shard_merge.shard_path(index)
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, bot.ACTIVE_BUYS_FILE), 'w') as f:
+        json.dump({pair: p.to_json() for pair, p in positions.items()}, f)
+    log = TradeLog(os.path.join(directory, bot.TRADE_HISTORY_FILE))
+    for t in trades:
+        log.append(t)
+
+
+def shard_outputs():
+    # Tiap shard menyalin state utama penuh (seperti checkout job matrix) lalu hanya
+    # mengubah pair miliknya sendiri
+    main = {pair: position(100.0 + i) for i, pair in enumerate(PAIRS)}
+    outputs = {}
+    for index in range(4):
+        positions = dict(main)
+        trades = []
+        for pair in PAIRS:
+            if shard_of(pair, 4) != index:
+                continue
+            if pair in ('ETHUSDT', 'ADAUSDT'):
+                del positions[pair]                          # Ditutup di shard ini
+                trades.append(trade(pair, 9 - index))        # Urutan waktu != urutan shard
+            else:
+                positions[pair] = position(200.0 + PAIRS.index(pair))
+        outputs[index] = (positions, trades)
+    return main, outputs
+
+
+def run_merge(order):
+    main, outputs = shard_outputs()
+    for index in order:
+        write_shard(index, *outputs[index])
+    present = set(order)
+    merged = shard_merge.merge_records(main, 4, present, bot.ACTIVE_BUYS_FILE, Position.from_json)
+    shard_merge.merge_trades(present)
+    return merged, bot.TRADE_LOG.load()
+
+
+def test_merge_is_independent_of_shard_order(tmp_path, monkeypatch):
+    results = []
+    for n, order in enumerate(itertools.permutations(range(4))):
+        use_workdir(tmp_path / f'run{n}', monkeypatch)
+        merged, trades = run_merge(order)
+        with open(bot.TRADE_STATS_FILE) as f:
+            results.append((merged, trades, json.load(f)))
+    for other in results[1:]:
+        assert other == results[0]
+    merged, trades, _ = results[0]
+    assert list(merged) == sorted(merged)
+    assert [t['exit_date'] for t in trades] == sorted(t['exit_date'] for t in trades)
+
+
+def test_closed_position_not_resurrected_by_stale_copy(workdir):
+    merged, trades = run_merge(range(4))
+    # ETH (shard 0) & ADA (shard 1) ditutup pemiliknya; salinan lama di shard lain diabaikan
+    assert 'ETHUSDT' not in merged and 'ADAUSDT' not in merged
+    assert sorted(t['pair'] for t in trades) == ['ADAUSDT', 'ETHUSDT']
+    for pair in merged:
+        assert merged[pair].price == 200.0 + PAIRS.index(pair)
+
+    # Merge ulang atas output yang sama tidak menggandakan trade
+    shard_merge.merge_trades({0, 1, 2, 3})
+    assert len(bot.TRADE_LOG.load()) == 2
+
+
+def test_missing_shard_keeps_previous_records(workdir):
+    main, outputs = shard_outputs()
+    for index in (0, 2, 3):
+        write_shard(index, *outputs[index])
+    merged = shard_merge.merge_records(main, 4, {0, 2, 3}, bot.ACTIVE_BUYS_FILE, Position.from_json)
+    # Shard 1 gagal: ADA & AVAX tetap dari state utama, termasuk ADA yang belum sempat ditutup
+    assert merged['ADAUSDT'] == main['ADAUSDT'] and merged['AVAXUSDT'] == main['AVAXUSDT']
+    assert 'ETHUSDT' not in merged
@@ -0,0 +1,81 @@
+import json
+import os
+
+import pytest
+
+import crypto_signal_bot as bot
+import state_store
+from state_store import JsonStateFile, TradeLog, atomic_write_json
+
+
+def trade(i):
+    return {'pair': f'P{i}USDT', 'entry_price': 100.0 + i, 'exit_price': 101.0 + i, 'profit_pct': 1.0,
+            'exit_reason': 'TRAILING_STOP', 'entry_date': '2024-01-01T08:00:00+07:00',
+            'exit_date': f'2024-01-0{i + 1}T08:00:00+07:00'}
+
+
+def test_trade_log_round_trip_with_truncated_final_line(tmp_path):
+    log = TradeLog(str(tmp_path / 'trade_history.jsonl'))
+    for i in range(3):
+        log.append(trade(i))
+    assert log.load() == [trade(i) for i in range(3)]
+
+    # Proses dihentikan di tengah menulis baris terakhir
+    with open(log.path, 'rb+') as f:
+        f.truncate(os.path.getsize(log.path) - 20)
+    assert log.read() == ([trade(0), trade(1)], 1)
+
+    # Append berikutnya tidak tersambung ke baris terpotong
+    log.append(trade(3))
+    assert log.read() == ([trade(0), trade(1), trade(3)], 1)
+    assert log.load() == [trade(0), trade(1), trade(3)]
+    assert log.read() == ([trade(0), trade(1), trade(3)], 0)
+    with open(log.path) as f:
+        assert f.read().endswith('\n')
+
+
+def test_migrate_legacy_history_once(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    legacy = [trade(0), trade(1)]
+    with open(bot.LEGACY_TRADE_HISTORY_FILE, 'w') as f:
+        json.dump(legacy, f)
+    log = TradeLog(bot.TRADE_HISTORY_FILE, legacy_path=bot.LEGACY_TRADE_HISTORY_FILE)
+    monkeypatch.setattr(bot, 'TRADE_LOG', log)
+
+    bot.migrate_trade_history()
+    assert not os.path.exists(bot.LEGACY_TRADE_HISTORY_FILE)
+    assert bot.load_trade_history() == legacy
+
+    # File lama muncul lagi (mis. dari checkout lama): log JSONL yang sudah ada tidak ditimpa
+    log.append(trade(2))
+    with open(bot.LEGACY_TRADE_HISTORY_FILE, 'w') as f:
+        json.dump(legacy, f)
+    assert log.migrate() == 0
+    assert bot.load_trade_history() == legacy + [trade(2)]
+
+
+def test_atomic_write_keeps_old_file_on_failure(tmp_path, monkeypatch):
+    path = str(tmp_path / 'state.json')
+    atomic_write_json(path, {'a': 1})
+
+    def fail(src, dst):
+        raise OSError('disk penuh')
+
+    monkeypatch.setattr(state_store.os, 'replace', fail)
+    with pytest.raises(OSError):
+        atomic_write_json(path, {'a': 2})
+    with open(path) as f:
+        assert json.load(f) == {'a': 1}
+    assert os.listdir(tmp_path) == ['state.json']
+
+
+def test_json_state_file_skips_identical_writes(tmp_path):
+    store = JsonStateFile(str(tmp_path / 'active_buys.json'))
+    assert store.save({'AAAUSDT': {'price': 1.0}}) is True
+    assert store.save({'AAAUSDT': {'price': 1.0}}) is False
+    assert not store.changed_on_disk()
+    other = JsonStateFile(store.path)
+    other.save({})
+    os.utime(store.path, ns=(0, os.stat(store.path).st_mtime_ns + 10**9))
+    assert store.changed_on_disk()
+    assert store.load() == {} and not store.changed_on_disk()
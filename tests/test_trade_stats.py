@@ -0,0 +1,113 @@
+import random
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import crypto_signal_bot as bot
+from trade_stats import TradeStats, summarize_counter
+
+UTC7 = bot.UTC7
+PAIRS = ['BTCUSDT', 'ETHUSDT', 'SOLUSDT', 'DOGEUSDT']
+REASONS = ['STOP_LOSS', 'TRAILING_STOP', 'SELL_EMA_MACD', 'SELL_CLOSE_EMA']
+START = datetime(2024, 1, 1, tzinfo=UTC7)
+
+
+def history(n=600, days=120, seed=1):
+    # Exit tersebar acak; sebagian ditulis dalam UTC / tanpa zona supaya konversi ke UTC+7 ikut teruji
+    rng = random.Random(seed)
+    trades = []
+    for _ in range(n):
+        exit_date = START + timedelta(seconds=rng.randrange(days * 86400))
+        style = rng.random()
+        if style < 0.3:
+            text = exit_date.astimezone(timezone.utc).isoformat()
+        elif style < 0.4:
+            text = exit_date.replace(tzinfo=None).isoformat()
+        else:
+            text = exit_date.isoformat()
+        trades.append({'pair': rng.choice(PAIRS), 'exit_reason': rng.choice(REASONS),
+                       'profit_pct': round(rng.uniform(-8, 12), 4), 'entry_price': 1.0, 'exit_price': 1.0,
+                       'entry_date': START.isoformat(), 'exit_date': text})
+    # Tepat di batas hari (UTC+7) dan tepat sebelum tengah malam
+    for day in (0, 6, 7, 30, 31, 59, 60):
+        for moment in (timedelta(0), timedelta(days=1) - timedelta(seconds=1)):
+            trades.append({'pair': 'BTCUSDT', 'exit_reason': 'STOP_LOSS', 'profit_pct': -1.0,
+                           'entry_price': 1.0, 'exit_price': 1.0, 'entry_date': START.isoformat(),
+                           'exit_date': (START + timedelta(days=day) + moment).isoformat()})
+    return trades
+
+
+def local_day(trade):
+    exit_date = datetime.fromisoformat(trade['exit_date'])
+    if exit_date.tzinfo is not None:
+        exit_date = exit_date.astimezone(UTC7)
+    return exit_date.strftime('%Y-%m-%d')
+
+
+def full_scan(trades, start_day, end_day):
+    # Referensi: pindai seluruh riwayat setiap kali (cara lama rekap mingguan)
+    selected = [t for t in trades if start_day <= local_day(t) <= end_day]
+    groups = {'pairs': {}, 'reasons': {}}
+    for t in selected:
+        groups['pairs'].setdefault(t['pair'], []).append(t)
+        groups['reasons'].setdefault(t['exit_reason'], []).append(t)
+    return bot.summarize_trades(selected), {
+        group: {key: bot.summarize_trades(items) for key, items in members.items()}
+        for group, members in groups.items()
+    }
+
+
+def assert_window(stats, trades, start_day, end_day):
+    window = stats.window(start_day, end_day)
+    expected, groups = full_scan(trades, start_day, end_day)
+    assert summarize_counter(window) == pytest.approx(expected), (start_day, end_day)
+    for group, members in groups.items():
+        assert sorted(window[group]) == sorted(members)
+        for key, summary in members.items():
+            assert summarize_counter(window[group][key]) == pytest.approx(summary), (group, key)
+
+
+@pytest.fixture
+def stats(tmp_path):
+    stats = TradeStats(str(tmp_path / 'trade_stats.json'), UTC7)
+    stats.rebuild(history())
+    return stats
+
+
+def test_daily_buckets_match_full_scan(stats):
+    trades = history()
+    assert sum(bucket['count'] for bucket in stats.days.values()) == len(trades)
+    for day in sorted({local_day(t) for t in trades}):
+        assert_window(stats, trades, day, day)
+
+
+def test_weekly_windows_match_full_scan(stats):
+    trades = history()
+    # Rekap mingguan: Minggu + 6 hari sebelumnya, kedua ujung inklusif
+    sunday = START + timedelta(days=(6 - START.weekday()) % 7)
+    while sunday < START + timedelta(days=125):
+        start = (sunday - timedelta(days=6)).strftime('%Y-%m-%d')
+        assert_window(stats, trades, start, sunday.strftime('%Y-%m-%d'))
+        sunday += timedelta(days=7)
+
+
+def test_monthly_windows_match_full_scan(stats):
+    trades = history()
+    for month in range(1, 6):
+        first = datetime(2024, month, 1, tzinfo=UTC7)
+        last = (first + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+        assert_window(stats, trades, first.strftime('%Y-%m-01'), last.strftime('%Y-%m-%d'))
+
+
+def test_incremental_add_equals_rebuild_and_survives_reload(stats):
+    trades = history()
+    incremental = TradeStats(stats.path, UTC7, retention_days=10_000)
+    for trade in trades:
+        incremental.add(trade)
+    assert incremental.days.keys() == stats.days.keys()
+    incremental.save()
+    loaded = TradeStats(stats.path, UTC7)
+    loaded.load()
+    for day in stats.days:
+        assert summarize_counter(loaded.days[day]) == pytest.approx(summarize_counter(stats.days[day]))
+        assert loaded.days[day]['pairs'].keys() == stats.days[day]['pairs'].keys()
@@ -0,0 +1,71 @@
+import json
+import os
+from dataclasses import replace
+
+import pytest
+
+from universe import (REJECT_LISTING_NEW, REJECT_LISTING_UNKNOWN, REJECT_STABLE, REJECT_STATUS,
+                      REJECT_VOLATILITY, REJECT_VOLUME, ExchangeSnapshot, UniverseFilter, diff_pairs,
+                      missing_listing, select_pairs)
+
+FIXTURE = os.path.join(os.path.dirname(__file__), os.pardir, 'fixtures', 'binance_universe.json')
+LIQUID = ['BTCUSDT', 'ETHUSDT', 'SOLUSDT', 'XRPUSDT', 'DOGEUSDT', 'SUIUSDT', 'LINKUSDT']
+
+
+@pytest.fixture
+def snapshot(tmp_path):
+    # Snapshot dari respons exchangeInfo + ticker/24hr, tanggal listing dari kline pertama
+    with open(FIXTURE) as f:
+        data = json.load(f)
+    now = data['exchangeInfo']['serverTime'] // 1000
+    snapshot = ExchangeSnapshot(str(tmp_path / 'exchange_snapshot.json'))
+    snapshot.update(data['exchangeInfo'], data['ticker24hr'], now=now)
+    for symbol, listed_ms in data['listedAt'].items():
+        snapshot.set_listed(symbol, listed_ms // 1000)
+    return snapshot, now
+
+
+def test_universe_from_fixture(snapshot):
+    snapshot, now = snapshot
+    # Hanya quote USDT yang disimpan
+    assert 'ETHBTC' not in snapshot.symbols
+    pairs, rejected, held = select_pairs(snapshot.symbols, UniverseFilter(), now=now)
+    assert pairs == LIQUID and held == []
+    assert rejected == {REJECT_STABLE: 1, REJECT_VOLATILITY: 2, REJECT_VOLUME: 1, REJECT_STATUS: 1,
+                        REJECT_LISTING_NEW: 1, REJECT_LISTING_UNKNOWN: 1}
+    assert missing_listing(snapshot.symbols, UniverseFilter(), limit=5) == ['NOLISTUSDT']
+
+
+def test_volume_filter_and_limit(snapshot):
+    snapshot, now = snapshot
+    # TINY (2.5 juta) lolos jika batas volume diturunkan; urutan tetap menurut quote volume
+    loose = UniverseFilter(min_quote_volume=1_000_000)
+    assert select_pairs(snapshot.symbols, loose, now=now)[0] == LIQUID + ['TINYUSDT']
+    strict = UniverseFilter(min_quote_volume=300_000_000)
+    assert select_pairs(snapshot.symbols, strict, now=now)[0] == ['BTCUSDT', 'ETHUSDT', 'SOLUSDT', 'XRPUSDT']
+    assert select_pairs(snapshot.symbols, replace(strict, max_pairs=2), now=now)[0] == ['BTCUSDT', 'ETHUSDT']
+
+
+def test_status_and_listing_filters(snapshot):
+    snapshot, now = snapshot
+    flt = UniverseFilter(min_quote_volume=0, min_volatility_pct=0, max_volatility_pct=1000)
+    pairs = select_pairs(snapshot.symbols, flt, now=now)[0]
+    # HALT (status BREAK) & stablecoin tetap ditolak walaupun filter pasar dilonggarkan
+    assert 'HALTUSDT' not in pairs and 'USDCUSDT' not in pairs
+    assert {'PAXGUSDT', 'PUMPUSDT', 'TINYUSDT'} <= set(pairs)
+    assert 'FRESHUSDT' not in pairs
+    assert 'FRESHUSDT' in select_pairs(snapshot.symbols, replace(flt, min_listing_days=1), now=now)[0]
+
+
+def test_pinned_positions_and_snapshot_round_trip(snapshot):
+    snapshot, now = snapshot
+    pairs, _, held = select_pairs(snapshot.symbols, UniverseFilter(max_pairs=3), now=now,
+                                  pinned=['LINKUSDT', 'BTCUSDT'])
+    assert pairs == ['BTCUSDT', 'ETHUSDT', 'SOLUSDT', 'LINKUSDT'] and held == ['LINKUSDT']
+    assert diff_pairs(LIQUID, pairs) == ([], ['DOGEUSDT', 'SUIUSDT', 'XRPUSDT'])
+
+    snapshot.save()
+    loaded = ExchangeSnapshot(snapshot.path)
+    loaded.load()
+    assert loaded.symbols == snapshot.symbols and loaded.fetched_at == now
+    assert not loaded.is_stale(now=now + 3600) and loaded.is_stale(now=now + 86400)
@@ -0,0 +1,100 @@
+import json
+import os
+from datetime import datetime, timedelta
+
+from state_store import atomic_write_json
+
+# ==========================================
+# AGREGAT TRADE HARIAN (UNTUK REKAP)
+# ==========================================
+# Setiap trade yang ditutup langsung ditambahkan ke bucket harian
+# (tanggal exit) beserta rincian per pair dan per alasan exit. Rekap mingguan /
+# bulanan cukup menjumlahkan beberapa bucket, tanpa memindai seluruh riwayat.
+STATS_RETENTION_DAYS = 400
+
+
+def empty_counter():
+    return {'count': 0, 'wins': 0, 'pnl': 0.0}
+
+def _add(counter, profit_pct):
+    counter['count'] += 1
+    counter['wins'] += 1 if profit_pct > 0 else 0
+    counter['pnl'] += profit_pct
+
+def _merge(target, source):
+    target['count'] += source['count']
+    target['wins'] += source['wins']
+    target['pnl'] += source['pnl']
+
+
+class TradeStats:
+    def __init__(self, path, tz, retention_days=STATS_RETENTION_DAYS):
+        self.path = path
+        self.tz = tz
+        self.retention_days = retention_days
+        self.days = {}
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def load(self):
+        self.days = {}
+        if not self.exists():
+            return
+        try:
+            with open(self.path, 'r') as f:
+                self.days = json.load(f).get('days', {})
+        except Exception as e:
+            print(f"⚠️ Statistik trade tidak bisa dibaca: {e}")
+            self.days = {}
+
+    def save(self):
+        cutoff = (datetime.now(self.tz) - timedelta(days=self.retention_days)).strftime('%Y-%m-%d')
+        self.days = {day: bucket for day, bucket in self.days.items() if day >= cutoff}
+        atomic_write_json(self.path, {'days': dict(sorted(self.days.items()))}, indent=1)
+
+    def day_key(self, iso_date):
+        exit_date = datetime.fromisoformat(iso_date)
+        if exit_date.tzinfo is not None:
+            exit_date = exit_date.astimezone(self.tz)
+        return exit_date.strftime('%Y-%m-%d')
+
+    def add(self, trade):
+        day = self.day_key(trade['exit_date'])
+        bucket = self.days.setdefault(day, {**empty_counter(), 'pairs': {}, 'reasons': {}})
+        profit_pct = trade['profit_pct']
+        _add(bucket, profit_pct)
+        _add(bucket['pairs'].setdefault(trade['pair'], empty_counter()), profit_pct)
+        _add(bucket['reasons'].setdefault(trade['exit_reason'], empty_counter()), profit_pct)
+
+    def rebuild(self, trades):
+        self.days = {}
+        for trade in trades:
+            try:
+                self.add(trade)
+            except (KeyError, ValueError, TypeError):
+                pass
+
+    def window(self, start_day, end_day):
+        # Gabungan bucket untuk rentang tanggal [start_day, end_day] (string YYYY-MM-DD)
+        total = {**empty_counter(), 'pairs': {}, 'reasons': {}}
+        for day, bucket in self.days.items():
+            if start_day <= day <= end_day:
+                _merge(total, bucket)
+                for group in ('pairs', 'reasons'):
+                    for key, counter in bucket[group].items():
+                        _merge(total[group].setdefault(key, empty_counter()), counter)
+        return total
+
+
+def summarize_counter(counter):
+    # Bentuk sama dengan summarize_trades() di crypto_signal_bot
+    total = counter['count']
+    return {
+        'total_trades': total,
+        'wins': counter['wins'],
+        'losses': total - counter['wins'],
+        'win_rate': (counter['wins'] / total * 100) if total > 0 else 0,
+        'total_profit': counter['pnl'],
+        'avg_profit': (counter['pnl'] / total) if total > 0 else 0,
+    }
@@ -0,0 +1,157 @@
+import json
+import os
+import time
+from dataclasses import dataclass
+
+from state_store import atomic_write_json
+
+# ==========================================
+# UNIVERSE PAIR OTOMATIS (EXCHANGE INFO + TICKER 24 JAM)
+# ==========================================
+# Snapshot exchange (daftar simbol + ticker 24 jam) di-cache ke file dan hanya
+# diambil ulang setelah interval refresh, jadi siklus biasa tidak menambah
+# request. Dari snapshot itu dipilih pair spot USDT yang likuid (quote volume),
+# cukup bergerak (range 24 jam) dan sudah cukup lama listing, diurutkan menurut
+# quote volume. Tanggal listing disimpan per simbol begitu diketahui.
+QUOTE_ASSET = 'USDT'
+STABLE_ASSETS = frozenset({'USDC', 'FDUSD', 'TUSD', 'BUSD', 'DAI', 'USDP', 'USDE', 'PYUSD', 'USD1',
+                           'XUSD', 'BFUSD', 'RLUSD', 'EUR', 'EURI', 'AEUR'})
+
+# Alasan pair tidak masuk universe (untuk ringkasan)
+REJECT_STATUS = 'tidak trading'
+REJECT_STABLE = 'stablecoin'
+REJECT_VOLUME = 'volume kecil'
+REJECT_VOLATILITY = 'volatilitas di luar batas'
+REJECT_LISTING_NEW = 'listing baru'
+REJECT_LISTING_UNKNOWN = 'tanggal listing belum diketahui'
+
+
+@dataclass(frozen=True)
+class UniverseFilter:
+    min_quote_volume: float = 10_000_000    # USDT per 24 jam
+    min_volatility_pct: float = 1.5         # (high - low) / last 24 jam
+    max_volatility_pct: float = 60.0
+    min_listing_days: int = 30
+    max_pairs: int = 50
+
+
+def compact_symbols(exchange_info, tickers, previous=None):
+    # Hanya simbol spot USDT yang disimpan, dengan field yang dipakai filter.
+    # listed_at (epoch detik) dibawa dari snapshot sebelumnya atau onboardDate jika ada.
+    previous = previous or {}
+    tickers = {t['symbol']: t for t in tickers}
+    symbols = {}
+    for info in exchange_info.get('symbols', []):
+        symbol = info['symbol']
+        if info.get('quoteAsset') != QUOTE_ASSET or not info.get('isSpotTradingAllowed', True):
+            continue
+        ticker = tickers.get(symbol, {})
+        listed_at = previous.get(symbol, {}).get('listed_at')
+        if listed_at is None and info.get('onboardDate'):
+            listed_at = int(info['onboardDate']) // 1000
+        symbols[symbol] = {
+            'base': info.get('baseAsset', symbol[:-len(QUOTE_ASSET)]),
+            'status': info.get('status', 'TRADING'),
+            'quote_volume': float(ticker.get('quoteVolume', 0) or 0),
+            'high': float(ticker.get('highPrice', 0) or 0),
+            'low': float(ticker.get('lowPrice', 0) or 0),
+            'last': float(ticker.get('lastPrice', 0) or 0),
+            'listed_at': listed_at,
+        }
+    return symbols
+
+def volatility_pct(info):
+    return (info['high'] - info['low']) / info['last'] * 100 if info['last'] > 0 else 0.0
+
+def market_reject(info, flt):
+    # Filter yang tidak butuh tanggal listing; None = lolos
+    if info['status'] != 'TRADING':
+        return REJECT_STATUS
+    if info['base'] in STABLE_ASSETS:
+        return REJECT_STABLE
+    if info['quote_volume'] < flt.min_quote_volume:
+        return REJECT_VOLUME
+    if not flt.min_volatility_pct <= volatility_pct(info) <= flt.max_volatility_pct:
+        return REJECT_VOLATILITY
+    return None
+
+def by_volume(symbols):
+    return sorted(symbols, key=lambda symbol: (-symbols[symbol]['quote_volume'], symbol))
+
+def select_pairs(symbols, flt, now=None, pinned=()):
+    # Return (pairs terurut quote volume, {alasan: jumlah}, pair pinned yang ditambahkan).
+    # Pair pinned (posisi aktif) selalu ikut supaya exit check-nya tidak berhenti.
+    now = time.time() if now is None else now
+    rejected = {}
+    selected = []
+    for symbol in by_volume(symbols):
+        info = symbols[symbol]
+        reason = market_reject(info, flt)
+        if reason is None:
+            if info['listed_at'] is None:
+                reason = REJECT_LISTING_UNKNOWN
+            elif now - info['listed_at'] < flt.min_listing_days * 86400:
+                reason = REJECT_LISTING_NEW
+        if reason is not None:
+            rejected[reason] = rejected.get(reason, 0) + 1
+            continue
+        selected.append(symbol)
+    pairs = selected[:flt.max_pairs]
+    held = sorted(pair for pair in pinned if pair not in pairs)
+    return pairs + held, rejected, held
+
+def missing_listing(symbols, flt, limit):
+    # Kandidat (lolos filter pasar) yang tanggal listing-nya belum diketahui, volume terbesar dulu
+    return [symbol for symbol in by_volume(symbols)
+            if symbols[symbol]['listed_at'] is None and market_reject(symbols[symbol], flt) is None][:limit]
+
+def diff_pairs(old, new):
+    old, new = set(old), set(new)
+    return sorted(new - old), sorted(old - new)
+
+
+class ExchangeSnapshot:
+    def __init__(self, path, refresh_hours=24, retry_minutes=60):
+        self.path = path
+        self.refresh_seconds = refresh_hours * 3600
+        self.retry_seconds = retry_minutes * 60
+        self.fetched_at = 0
+        self.attempted_at = 0
+        self.symbols = {}
+
+    def load(self):
+        self.fetched_at, self.attempted_at, self.symbols = 0, 0, {}
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"⚠️ Snapshot exchange tidak bisa dibaca, akan diambil ulang: {e}")
+            return
+        self.fetched_at = data.get('fetched_at', 0)
+        self.attempted_at = data.get('attempted_at', 0)
+        self.symbols = data.get('symbols', {})
+
+    def is_stale(self, now=None):
+        # Gagal ambil baru dicoba lagi setelah retry_minutes, bukan tiap siklus
+        now = time.time() if now is None else now
+        return now - self.fetched_at >= self.refresh_seconds and now - self.attempted_at >= self.retry_seconds
+
+    def update(self, exchange_info, tickers, now=None):
+        self.fetched_at = self.attempted_at = int(time.time() if now is None else now)
+        self.symbols = compact_symbols(exchange_info, tickers, self.symbols)
+
+    def mark_attempt(self, now=None):
+        self.attempted_at = int(time.time() if now is None else now)
+
+    def set_listed(self, symbol, listed_at):
+        if symbol in self.symbols:
+            self.symbols[symbol]['listed_at'] = int(listed_at)
+
+    def save(self):
+        atomic_write_json(self.path, {
+            'fetched_at': self.fetched_at,
+            'attempted_at': self.attempted_at,
+            'symbols': dict(sorted(self.symbols.items())),
+        }, indent=1)